@@ -0,0 +1,54 @@
+"""
+Tiện ích của bài đăng dưới dạng bitmask.
+
+Bảng Convinience lưu 12 cột boolean; Posts.amenity_mask gói cùng thông tin đó vào một số
+nguyên (bit i <=> AMENITY_FIELDS[i]) để lọc theo bất kỳ tổ hợp tiện ích nào bằng một điều
+kiện duy nhất (amenity_mask & required) = required, không cần JOIN sang Convinience.
+Thứ tự trong AMENITY_FIELDS là cố định: thêm tiện ích mới thì chỉ được thêm vào cuối.
+"""
+from sqlalchemy import text
+
+AMENITY_FIELDS = [
+    "wifi", "air_conditioner", "fridge", "washing_machine", "parking_lot", "security",
+    "kitchen", "private_bathroom", "furniture", "bacony", "elevator", "pet_allowed",
+]
+
+AMENITY_BITS = {name: 1 << i for i, name in enumerate(AMENITY_FIELDS)}
+
+
+def unknown_amenities(names):
+    return [name for name in names if name not in AMENITY_BITS]
+
+
+def mask_for(names):
+    mask = 0
+    for name in names:
+        mask |= AMENITY_BITS[name]
+    return mask
+
+
+def mask_of(convenience):
+    """Bitmask của một dòng Convinience (hoặc None -> 0)."""
+    if convenience is None:
+        return 0
+    return mask_for(name for name in AMENITY_FIELDS if getattr(convenience, name))
+
+
+def names_of(mask):
+    return [name for name in AMENITY_FIELDS if mask & AMENITY_BITS[name]]
+
+
+def has_amenities(mask_column, required):
+    return mask_column.op("&")(required) == required
+
+
+def backfill_masks(connection, after=None, until=None):
+    """Tính lại amenity_mask từ bảng Convinience, của mọi bài đăng hoặc các id trong (after, until]."""
+    bits = " | ".join(
+        f"(CASE WHEN c.{name} THEN {bit} ELSE 0 END)" for name, bit in AMENITY_BITS.items()
+    )
+    where = ' WHERE "Posts".id > :after AND "Posts".id <= :until' if after is not None else ""
+    connection.execute(text(
+        'UPDATE "Posts" SET amenity_mask = COALESCE('
+        f'(SELECT {bits} FROM "Convinience" c WHERE c.post_id = "Posts".id LIMIT 1), 0)' + where
+    ), {"after": after, "until": until})
@@ -1,9 +1,42 @@
 from fastapi import FastAPI, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import desc, func, delete, update
-from database import get_db
-from typing import Optional, List
+from sqlalchemy import func, delete, update
+from sqlalchemy.exc import IntegrityError
+from database import AsyncSessionLocal, get_db, get_read_db, engine, insert, is_foreign_key_error
+import migrations
+from migrations import backfiller
+from pagination import next_cursor, InvalidCursor
+from fulltext import ranked_matches, index_post, remove_post, remove_user_posts
+from cache import cache, post_tag, all_post_tags, POSTS_LIST_TAG
+from http_cache import make_etag, http_date, is_fresh, not_modified, set_validators
+from amenities import AMENITY_FIELDS, mask_of
+from images import (
+    MAX_FILES, MAX_REQUEST_BYTES, PENDING_DIR, UploadRejected, save_upload, pending_path, process_pending, variant_url
+)
+from jobs import queue, PermanentJobError
+from ratings import rating_change, is_counted, summary as rating_summary
+from views import view_buffer
+from auth import Principal, principals, hash_password, verify_password, create_token, decode_token, InvalidToken, TOKEN_TTL
+from facets import FACETS, facet_counts
+from limits import LimitMiddleware, limiter
+from filters import SearchFilters, search_filters, invalid_filters, invalid_sort, apply_filters, sort_order
+from queries import (
+    POST_ID_ORDER, FAVOURITE_ORDER, HISTORY_ORDER, USER_ORDER, USER_COLUMNS, PRINCIPAL_COLUMNS,
+    post_columns, card_query, search_page, cover_images_query, list_posts_query, user_posts_query, post_query,
+    post_detail_query, post_images_query, post_convenience_query, post_comments_query, comment_thread_query,
+    list_users_query, user_by_email_query, favourites_query, favourite_ids_query, history_query,
+    admin_posts_query, admin_comments_query,
+)
+from geo import MAX_RADIUS_KM, geocode, invalid_point, invalid_box, in_box, near, distance_km
+from schemas import (
+    post_fields, unknown_fields, UserOut, OwnerOut, CommentOut,
+    ConvenienceOut, Message, Fail, Success, UserResult, UserSaved, UserPage, PostResult,
+    LoginResult, PostSaved, PostDetail, PostList, PostPage, SearchPage, FilterPage, PostCardPage, ImageSaved, ImagesQueued,
+    ImageList, CommentSaved, CommentList, RatingResult, FavouriteList, FavouriteIds, HistoryList, ConvenienceResult,
+    ConvenienceSaved, StatsResult, AdminPostList, AdminCommentList, CacheStatsResult, JobsResult,
+)
+from typing import Optional, List, Union
 from datetime import date
 from models.users import Users
 from models.posts import Posts
@@ -20,13 +53,18 @@ from fastapi import FastAPI, File, UploadFile, Form
 from typing import List
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.encoders import jsonable_encoder
+import asyncio
 import uuid
 import os
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi import Request
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from PIL import UnidentifiedImageError
 
 
 app = FastAPI(title="Nhatro.vn API", description="API for Nhatro.vn")
+# Thêm trước CORS để CORS bọc ngoài: phản hồi 429 / 413 vẫn có header CORS và trình duyệt đọc được
+app.add_middleware(LimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # Thêm domain của frontend
@@ -37,46 +75,122 @@ app.add_middleware(
 
 security = HTTPBearer()
 
-async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
+
+@app.on_event("startup")
+async def upgrade_schema():
+    # Chạy DDL của các migration còn thiếu; backfill dữ liệu chạy nền theo từng lô
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(migrations.upgrade)
+    except migrations.MigrationBlocked as e:
+        print(f"❌ Cannot migrate the database: {e}")
+        raise
+    await backfiller.start(engine)
+    await queue.start()
+    await view_buffer.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await backfiller.stop()
+    await view_buffer.stop()
+    await queue.stop()
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """
+    Người dùng của access token trong header "Authorization: Bearer <token>" (xem auth.py).
+    Token được kiểm tra bằng chữ ký; thông tin người dùng lấy từ cache, chỉ truy vấn khi chưa có.
+    """
     auth_header = request.headers.get("Authorization")
     if not auth_header:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
+    scheme, _, token = auth_header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
     try:
-        user_id = int(auth_header)
-        result = await db.execute(select(Users).where(Users.id == user_id))
-        user = result.scalars().first()
-        if not user:
+        user_id = decode_token(token.strip())
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+    principal = principals.get(user_id)
+    if principal is None:
+        result = await db.execute(select(*PRINCIPAL_COLUMNS).where(Users.id == user_id))
+        row = result.first()
+        if not row:
             raise HTTPException(status_code=401, detail="User not found")
-        return user
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
+        principal = Principal(row.id, row.email, row.full_name, bool(row.is_admin))
+        principals.put(principal)
+    return principal
 
-async def get_current_admin(request: Request, db: AsyncSession = Depends(get_db)):
-    user = await get_current_user(request, db)
+async def get_current_admin(user: Principal = Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     return user
 
+async def _conditional(request, response, policy, validate, load, cache_key=None, tags=()):
+    """
+    Trả phản hồi kèm ETag/Last-Modified, hoặc 304 nếu client đã có bản mới nhất.
+    validate() chỉ đọc các cột id/updated_at, trả về (etag, last_modified) hoặc None nếu không có dữ liệu.
+    load() tải nội dung phản hồi. Khi có cache_key, nội dung được cache cùng validator
+    nên lần gọi sau trả lời (kể cả 304) mà không truy vấn cơ sở dữ liệu.
+    """
+    if cache_key:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            if is_fresh(request, cached["etag"], cached["last_modified"]):
+                return not_modified(cached["etag"], cached["last_modified"], policy)
+            set_validators(response, cached["etag"], cached["last_modified"], policy)
+            return cached["body"]
+
+    validators = await validate()
+    if validators is None:
+        return await load()
+    etag, last_modified = validators
+    if is_fresh(request, etag, last_modified):
+        return not_modified(etag, last_modified, policy)
+
+    body = await load()
+    set_validators(response, etag, last_modified, policy)
+    if cache_key:
+        stored = await cache.set(cache_key, {"etag": etag, "last_modified": last_modified, "body": body}, tags)
+        return stored["body"]
+    return body
+
 class ImageInput(BaseModel):
     post_id: int
     image_urls: List[str]
 # ----- USER ENDPOINTS -----
-@app.get("/login", tags=["Tài khoản"])
-async def login(email: str, password: str, db: AsyncSession = Depends(get_db)):
+@app.get("/login", tags=["Tài khoản"], response_model=Union[LoginResult, Fail])
+async def login(email: str, password: str, db: AsyncSession = Depends(get_read_db)):
     """
     Truyền vào email và password để đăng nhập. 
-    Trả về thông tin người dùng nếu đăng nhập thành công hoặc thông báo lỗi nếu không thành công.
+    Trả về thông tin người dùng và access_token (gửi lại trong header "Authorization: Bearer <token>")
+    nếu đăng nhập thành công hoặc thông báo lỗi nếu không thành công.
     """
-    result = await db.execute(select(Users).where(Users.email == email, Users.password == password))
+    result = await db.execute(user_by_email_query(email))
     user = result.scalars().first()
-    if user:
-        return {"status": "success", "user": user}
-    else:
+    # Băm mật khẩu tốn CPU: chạy trong thread pool để không chặn các request khác. Chỉ đọc
+    # nên không giữ kết nối ghi (duy nhất với SQLite) trong lúc băm
+    ok, needs_rehash = await run_in_threadpool(verify_password, password, user.password if user else None)
+    if not ok:
         return {"status": "fail", "message": "Invalid username or password"}
+    if needs_rehash:
+        # Mật khẩu cũ lưu dạng văn bản thường hoặc băm với số vòng cũ: băm xong mới mở phiên ghi
+        # ngắn, và chỉ ghi nếu mật khẩu chưa bị đổi trong lúc băm
+        hashed = await run_in_threadpool(hash_password, password)
+        async with AsyncSessionLocal() as write_db:
+            await write_db.execute(
+                update(Users).where(Users.id == user.id).where(Users.password == user.password).values(password=hashed)
+            )
+            await write_db.commit()
+    return {
+        "status": "success", "user": user,
+        "access_token": create_token(user.id), "token_type": "bearer", "expires_in": TOKEN_TTL,
+    }
 
 
-@app.post("/signup", tags=["Tài khoản"])
+@app.post("/signup", tags=["Tài khoản"], response_model=Union[UserSaved, Fail])
 async def signup(email: str, password: str, contact_number: Optional[str] = None, full_name: Optional[str] = None, db: AsyncSession = Depends(get_db)):
     """
     Truyền vào email, password để đăng ký tài khoản mới.
@@ -84,17 +198,22 @@ async def signup(email: str, password: str, contact_number: Optional[str] = None
     Nếu email đã tồn tại, trả về thông báo lỗi.
     Nếu không, tạo tài khoản mới và lưu vào cơ sở dữ liệu.
     """
-    existing_user = await db.execute(select(Users).where(Users.email == email))
-    if existing_user.scalars().first():
+    hashed = await run_in_threadpool(hash_password, password)
+    # Ràng buộc UNIQUE của email thay cho SELECT kiểm tra trước
+    new_user = (await db.scalars(
+        insert(Users)
+        .values(email=email, password=hashed, contact_number=contact_number, full_name=full_name)
+        .on_conflict_do_nothing(index_elements=[Users.email])
+        .returning(Users)
+    )).first()
+    if new_user is None:
         return {"status": "fail", "message": "Email already exists"}
-
-    new_user = Users(email=email, password=password, contact_number=contact_number, full_name=full_name)
-    db.add(new_user)
+    # Đọc dữ liệu trước khi commit làm các thuộc tính của đối tượng hết hạn
+    user = UserOut.model_validate(new_user)
     await db.commit()
-    await db.refresh(new_user)
-    return {"status": "success", "message": "User created successfully", "user": new_user}
+    return {"status": "success", "message": "User created successfully", "user": user}
 
-@app.put("/update-user", tags=["Tài khoản"])
+@app.put("/update-user", tags=["Tài khoản"], response_model=Union[UserSaved, Fail])
 async def update_user(
     user_id: int, 
     password: str,
@@ -111,10 +230,12 @@ async def update_user(
     Nếu tìm thấy người dùng, cập nhật thông tin của người dùng đó.
     Nếu không tìm thấy, trả về thông báo lỗi. 
     """
+    # Băm trước khi truy vấn: phiên ghi chỉ lấy kết nối ở câu lệnh đầu tiên
+    hashed = await run_in_threadpool(hash_password, password)
     user = await db.execute(select(Users).where(Users.id == user_id))
     user_to_update = user.scalars().first()
     if user_to_update:
-        user_to_update.password = password
+        user_to_update.password = hashed
         user_to_update.avatar_url = avatar_url
         user_to_update.contact_number = contact_number
         user_to_update.address = address
@@ -122,14 +243,15 @@ async def update_user(
         user_to_update.birthday = birthday
         user_to_update.full_name = full_name
         await db.commit()
+        principals.invalidate(user_id)
         await db.refresh(user_to_update)
         return {"status": "success", "message": "User updated successfully", "user": user_to_update}
     else:
         return {"status": "fail", "message": "User not found"}
     
 
-@app.get("/get-user-info", tags=["Tài khoản"])
-async def get_user_info(user_id: int, db: AsyncSession = Depends(get_db)):
+@app.get("/get-user-info", tags=["Tài khoản"], response_model=Union[UserResult, Fail])
+async def get_user_info(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Truyền vào user_id để lấy thông tin người dùng.
     Nếu tìm thấy người dùng, trả về thông tin của người dùng đó.
@@ -137,23 +259,29 @@ async def get_user_info(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     if user_id <= 0:
         return {"status": "fail", "message": "Invalid user ID"}
-    result = await db.execute(select(Users).where(Users.id == user_id))
-    user = result.scalars().first()
+    result = await db.execute(select(*USER_COLUMNS).where(Users.id == user_id))
+    user = result.first()
     if user:
         return {"status": "success", "user": user}
     else:
         return {"status": "fail", "message": "User not found"}
 
-@app.get("/list-users", tags=["Tài khoản"])
-async def list_users(limit: int = 10, offset: int = 0, db: AsyncSession = Depends(get_db)):
+@app.get("/list-users", tags=["Tài khoản"], response_model=Union[UserPage, Fail])
+async def list_users(limit: int = 10, offset: int = 0, cursor: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
     """
     Lấy danh sách người dùng với phân trang.
+    Truyền next_cursor của trang trước vào cursor để lấy trang tiếp theo (offset chỉ dùng khi không có cursor).
     """
-    result = await db.execute(select(Users).limit(limit).offset(offset))
-    users = result.scalars().all()
-    return {"status": "success", "users": users, "count": len(users)}
+    try:
+        query = list_users_query(limit, cursor, offset)
+    except InvalidCursor:
+        return {"status": "fail", "message": "Invalid cursor"}
+    result = await db.execute(query)
+    users = result.all()
+    return {"status": "success", "users": users, "count": len(users),
+            "next_cursor": next_cursor(users, USER_ORDER, limit)}
 
-@app.delete("/delete-user/{user_id}", tags=["Tài khoản"])
+@app.delete("/delete-user/{user_id}", tags=["Tài khoản"], response_model=Message)
 async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Xóa người dùng theo ID.
@@ -161,46 +289,87 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     user = await db.execute(select(Users).where(Users.id == user_id))
     user_to_delete = user.scalars().first()
     if user_to_delete:
+        await remove_user_posts(db, user_id)
+        # Bỏ các đánh giá của người dùng khỏi điểm của những bài đăng họ đã bình luận
+        rated = await db.execute(
+            select(PostComments.post_id, PostComments.rating)
+            .where(PostComments.user_id == user_id)
+            .where(PostComments.status == 'approved')
+        )
+        removed = {}
+        for post_id, rating in rated.all():
+            removed.setdefault(post_id, []).append(rating)
+        for post_id, ratings in removed.items():
+            await _update_rating(db, post_id, removed=ratings)
         await db.delete(user_to_delete)
         await db.commit()
+        principals.invalidate(user_id)
+        await cache.clear()
         return {"status": "success", "message": "User deleted successfully"}
     else:
         return {"status": "fail", "message": "User not found"}
 
 
 # ----- POST ENDPOINTS -----
-@app.get("/get-list-of-posts", tags=["Bài đăng"])
-async def get_list_of_posts(limit: int, offset: int = 0, db: AsyncSession = Depends(get_db)):
+@app.get("/get-list-of-posts", tags=["Bài đăng"], response_model=Union[PostPage, Fail],
+         response_model_exclude_unset=True)
+async def get_list_of_posts(
+    request: Request,
+    response: Response,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
     """
     Truyền vào limit và offset để phân trang danh sách bài viết.
+    Nên dùng cursor (next_cursor của trang trước) thay cho offset khi cuộn trang sâu.
+    fields chọn các trường trả về: card (mặc định), full hoặc danh sách tên trường (vd: card,description).
     """
     if limit <= 0:
         return {"status": "fail", "message": "Limit must be greater than 0"}
-    
-    result = await db.execute(
-        select(Posts)
-        .where(Posts.status == 'approved')
-        .where(Posts.is_report == False)
-        .order_by(desc(Posts.id))
-        .offset(offset)
-        .limit(limit)
-    )
-    posts = result.scalars().all()
-    return {"status": "success", "posts": posts}
+    invalid = _unknown_fields_message(fields)
+    if invalid:
+        return invalid
+
+    try:
+        query = list_posts_query(post_fields(fields), limit, cursor, offset)
+    except InvalidCursor:
+        return {"status": "fail", "message": "Invalid cursor"}
+
+    async def validate():
+        result = await db.execute(query.with_only_columns(Posts.id, Posts.updated_at))
+        rows = result.all()
+        modified = max((row.updated_at for row in rows if row.updated_at), default=None)
+        return make_etag("list", limit, offset, cursor, fields, *rows), http_date(modified)
+
+    async def load():
+        result = await db.execute(query)
+        posts = result.all()
+        return PostPage(status="success", posts=posts, next_cursor=next_cursor(posts, POST_ID_ORDER, limit))
 
+    # Chỉ cache các trang đầu (xem nhiều nhất), trang sâu đọc thẳng từ cơ sở dữ liệu
+    cache_key = None
+    if cursor is None and offset + limit <= CACHED_LIST_ROWS:
+        cache_key = cache.key("get-list-of-posts", limit=limit, offset=offset, fields=fields)
+    return await _conditional(request, response, "list", validate, load, cache_key, [POSTS_LIST_TAG])
 
-@app.get("/get-posts-by-user", tags=["Bài đăng"])
-async def get_posts_by_user(user_id: int, db: AsyncSession = Depends(get_db)):
+
+@app.get("/get-posts-by-user", tags=["Bài đăng"], response_model=Union[PostList, Fail],
+         response_model_exclude_unset=True)
+async def get_posts_by_user(user_id: int, fields: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
     """
     Truyền vào user_id để lấy danh sách bài viết của người dùng.
     Nếu tìm thấy bài viết, trả về danh sách bài viết đó.
     Nếu không tìm thấy, trả về thông báo lỗi.
+    fields chọn các trường trả về như ở /get-list-of-posts.
     """
-    result = await db.execute(
-        select(Posts)
-        .where(Posts.user_id == user_id)
-    )
-    posts = result.scalars().all()
+    invalid = _unknown_fields_message(fields)
+    if invalid:
+        return invalid
+    result = await db.execute(user_posts_query(user_id, post_fields(fields)))
+    posts = result.all()
     if posts:
         return {"status": "success", "posts": posts}
     else:
@@ -214,28 +383,64 @@ from fastapi.encoders import jsonable_encoder
 from database import get_db
 from models.posts import Posts
 
-@app.get("/get-post-by-id", tags=["Bài đăng"])
-async def get_post_by_id(post_id: int, db: AsyncSession = Depends(get_db)):
+@app.get("/get-post-by-id", tags=["Bài đăng"], response_model=Union[PostResult, Fail])
+async def get_post_by_id(request: Request, response: Response, post_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Truyền vào post_id để lấy thông tin bài viết.
     Nếu tìm thấy bài viết, trả về thông tin của bài viết đó.
     Nếu không tìm thấy, trả về thông báo lỗi.
     """
-    result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = result.scalars().first()
-    if post:
-        return {
-            "status": "success",
-            "post": jsonable_encoder(post) 
-        }
-    else:
-        return {
-            "status": "fail",
-            "message": "Post not found"
-        }
+    async def validate():
+        result = await db.execute(select(Posts.updated_at).where(Posts.id == post_id))
+        row = result.first()
+        if row is None:
+            return None
+        return make_etag("post", post_id, row.updated_at), http_date(row.updated_at)
+
+    async def load():
+        result = await db.execute(post_query(post_id))
+        post = result.first()
+        if post:
+            return PostResult(status="success", post=post)
+        else:
+            return {
+                "status": "fail",
+                "message": "Post not found"
+            }
+
+    return await _conditional(
+        request, response, "detail", validate, load,
+        cache.key("get-post-by-id", post_id=post_id), [post_tag(post_id)]
+    )
+
+@app.get("/posts/{post_id}/full", tags=["Bài đăng"], response_model=Union[PostDetail, Fail])
+async def get_post_full(post_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Toàn bộ dữ liệu của trang chi tiết bài đăng trong một lần gọi: bài đăng, thông tin liên hệ
+    của chủ nhà, hình ảnh, tiện ích, các bình luận đã duyệt (kèm tên người viết) và điểm đánh giá.
+    Luôn dùng đúng 4 truy vấn, không phụ thuộc số ảnh hay số bình luận.
+    """
+    result = await db.execute(post_detail_query(post_id))
+    row = result.first()
+    if row is None:
+        return {"status": "fail", "message": "Post not found"}
 
+    images = await db.execute(post_images_query(post_id))
+    convenience = await db.execute(post_convenience_query(post_id))
+    comments = await db.execute(comment_thread_query(post_id))
 
-@app.post("/create-post", tags=["Bài đăng"])
+    return {
+        "status": "success",
+        "post": row,
+        "owner": _owner(row),
+        "images": images.all(),
+        "convenience": convenience.first(),
+        "comments": comments.all(),
+        "rating": rating_summary(row),
+    }
+
+
+@app.post("/create-post", tags=["Bài đăng"], response_model=Union[PostSaved, Fail])
 async def create_post(
     user_id: int = Form(...),
     title: str = Form(...),
@@ -255,17 +460,19 @@ async def create_post(
     area: int = Form(...),
     detailed_address: str = Form(...),
     floor_num: Optional[str] = Form(None),
+    latitude: Optional[float] = Form(None),
+    longitude: Optional[float] = Form(None),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Tạo một bài đăng mới với thông tin cơ bản.
+    latitude / longitude là vị trí chọn trên bản đồ; không có thì lấy tâm của quận / huyện.
     """
-    # Check if user exists
-    user_result = await db.execute(select(Users).where(Users.id == user_id))
-    user = user_result.scalars().first()
-    if not user:
-        return {"status": "fail", "message": "User not found"}
-    
+    invalid = invalid_point(latitude, longitude)
+    if invalid:
+        return {"status": "fail", "message": invalid}
+    if latitude is None:
+        latitude, longitude = geocode(province, district)
     new_post = Posts(
         user_id=user_id,
         title=title,
@@ -285,15 +492,25 @@ async def create_post(
         street=street,
         detailed_address=detailed_address,
         area=area,
+        latitude=latitude,
+        longitude=longitude,
         status='pending',  # New posts start as pending
         is_report=False
     )
     db.add(new_post)
+    try:
+        await db.flush()
+    except IntegrityError as e:
+        if not is_foreign_key_error(e):
+            raise
+        await db.rollback()
+        return {"status": "fail", "message": "User not found"}
+    await index_post(db, new_post)
     await db.commit()
     await db.refresh(new_post)
     return {"status": "success", "message": "Post created successfully", "post": new_post}
 
-@app.put("/update-post/{post_id}", tags=["Bài đăng"])
+@app.put("/update-post/{post_id}", tags=["Bài đăng"], response_model=Union[PostSaved, Fail])
 async def update_post(
     post_id: int,
     title: str,
@@ -312,11 +529,17 @@ async def update_post(
     street: str,
     detailed_address: str,  # Required field
     floor_num: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Cập nhật thông tin bài đăng.
+    Không gửi latitude / longitude thì tọa độ chỉ được tính lại khi đổi tỉnh / thành phố hoặc quận / huyện.
     """
+    invalid = invalid_point(latitude, longitude)
+    if invalid:
+        return {"status": "fail", "message": invalid}
     result = await db.execute(select(Posts).where(Posts.id == post_id))
     post = result.scalars().first()
     if not post:
@@ -333,17 +556,23 @@ async def update_post(
     post.internet_fee = internet_fee
     post.vehicle_fee = vehicle_fee
     post.floor_num = floor_num
+    if latitude is not None:
+        post.latitude, post.longitude = latitude, longitude
+    elif post.latitude is None or (province, district) != (post.province, post.district):
+        post.latitude, post.longitude = geocode(province, district)
     post.province = province
     post.district = district
     post.rural = rural
     post.street = street
     post.detailed_address = detailed_address
+    await index_post(db, post)
     
     await db.commit()
+    await cache.invalidate(post_tag(post_id), POSTS_LIST_TAG)
     await db.refresh(post)
     return {"status": "success", "message": "Post updated successfully", "post": post}
 
-@app.delete("/delete-post/{post_id}", tags=["Bài đăng"])
+@app.delete("/delete-post/{post_id}", tags=["Bài đăng"], response_model=Message)
 async def delete_post(post_id: int, db: AsyncSession = Depends(get_db)):
     """
     Xóa bài đăng theo ID.
@@ -351,182 +580,353 @@ async def delete_post(post_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Posts).where(Posts.id == post_id))
     post = result.scalars().first()
     if post:
+        await remove_post(db, post.id)
         await db.delete(post)
         await db.commit()
+        await cache.invalidate(*all_post_tags(post_id), POSTS_LIST_TAG)
         return {"status": "success", "message": "Post deleted successfully"}
     else:
         return {"status": "fail", "message": "Post not found"}
 
-@app.get("/search-posts", tags=["Bài đăng"])
+# Số dòng đầu tiên của /get-list-of-posts được cache
+CACHED_LIST_ROWS = 100
+
+def _unknown_fields_message(fields):
+    unknown = unknown_fields(fields)
+    if unknown:
+        return {"status": "fail", "message": f"Unknown fields: {', '.join(unknown)}"}
+    return None
+
+def _invalid_location(lat, lng, radius_km, south, west, north, east):
+    invalid = invalid_point(lat, lng) or invalid_box(south, west, north, east)
+    if invalid:
+        return {"status": "fail", "message": invalid}
+    if lat is not None and not 0 < radius_km <= MAX_RADIUS_KM:
+        return {"status": "fail", "message": f"radius_km must be between 0 and {MAX_RADIUS_KM:g}"}
+    return None
+
+
+def _location_conditions(lat, lng, radius_km, south, west, north, east):
+    """
+    Điều kiện theo khung bản đồ (south, west, north, east) và / hoặc bán kính quanh (lat, lng).
+    Trả về (các điều kiện, biểu thức khoảng cách hoặc None khi không tìm theo bán kính).
+    """
+    conditions = []
+    if south is not None:
+        conditions.append(in_box(south, west, north, east))
+    if lat is None:
+        return conditions, None
+    condition, distance = near(lat, lng, radius_km)
+    return conditions + [condition], distance
+
+
+def _invalid_search(filters, sort):
+    invalid = invalid_filters(filters) or invalid_sort(sort)
+    if invalid:
+        return {"status": "fail", "message": invalid}
+    return None
+
+
+def _facet_conditions(q, location):
+    """Các điều kiện tìm kiếm ngoài SearchFilters (từ khóa, vị trí) cho facet_counts."""
+    conditions = list(location)
+    ranked = ranked_matches(q) if q else None
+    if ranked is not None:
+        conditions.append(Posts.id.in_(select(ranked.c.post_id)))
+    return conditions
+
+
+def _first_page(cursor, offset):
+    return cursor is None and offset == 0
+
+
+async def _fetch_search_page(db, query, q, limit, cursor, offset, distance=None, sort=None):
+    """Chạy truy vấn tìm kiếm đã lọc, phân trang như queries.search_page. Trả về (các dòng, next_cursor)."""
+    query, order = search_page(query, q, limit, cursor, offset, distance, sort)
+    result = await db.execute(query)
+    rows = result.all()
+    return rows, next_cursor(rows, order, limit)
+
+
+async def _cover_images(db, post_ids):
+    """Ảnh đại diện (ảnh có id nhỏ nhất) của các bài đăng, lấy trong một truy vấn: post_id -> url."""
+    if not post_ids:
+        return {}
+    result = await db.execute(cover_images_query(post_ids))
+    # Thẻ bài đăng chỉ cần ảnh thumb thay vì ảnh gốc
+    return {post_id: variant_url(url, variants) for post_id, url, variants in result.all()}
+
+
+def _owner(row):
+    """Chủ nhà từ các cột OWNER_COLUMNS của một dòng, None nếu bài đăng không có chủ."""
+    values = row._mapping
+    if values["owner_id"] is None:
+        return None
+    return {name: values[f"owner_{name}"] for name in OwnerOut.model_fields}
+
+
+def _post_card(row, names, cover_image):
+    """Thẻ bài đăng từ một dòng gồm các cột names, OWNER_COLUMNS và CARD_CONVENIENCE_COLUMNS."""
+    values = row._mapping
+    card = {name: values[name] for name in names}
+    if "distance_sq" in values:
+        card["distance_km"] = distance_km(values["distance_sq"])
+    card["convenience"] = (
+        {key: bool(values[key]) for key in AMENITY_FIELDS} if values["convenience_id"] is not None else None
+    )
+    card["cover_image"] = cover_image
+    card["owner"] = _owner(row)
+    return card
+
+@app.get("/search-posts", tags=["Bài đăng"], response_model=Union[SearchPage, Fail],
+         response_model_exclude_unset=True)
 async def search_posts(
-    province: Optional[str] = None,
-    district: Optional[str] = None,
-    rural: Optional[str] = None,
-    min_price: Optional[int] = None,
-    max_price: Optional[int] = None,
-    type: Optional[str] = None,
-    room_num: Optional[int] = None,
+    filters: SearchFilters = Depends(search_filters),
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: float = 5,
+    south: Optional[float] = None,
+    west: Optional[float] = None,
+    north: Optional[float] = None,
+    east: Optional[float] = None,
+    facets: bool = False,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Tìm kiếm bài đăng theo các tiêu chí.
-    """
-    query = select(Posts).where(Posts.status == 'approved').where(Posts.is_report == False)
-    
-    if province:
-        query = query.where(Posts.province == province)
-    if district:
-        query = query.where(Posts.district == district)
-    if rural:
-        query = query.where(Posts.rural == rural)
-    if min_price is not None:
-        query = query.where(Posts.price >= min_price)
-    if max_price is not None:
-        query = query.where(Posts.price <= max_price)
-    if type:
-        query = query.where(Posts.type == type)
-    if room_num:
-        query = query.where(Posts.room_num == room_num)
+    Bộ lọc: province, district, rural, type, room_num, khoảng min_/max_ của price, area, room_num
+    và các khoản phí, amenities là danh sách tiện ích bắt buộc phải có (vd: amenities=wifi&amenities=fridge).
+    q là từ khóa tìm trong tiêu đề, mô tả và địa chỉ (không phân biệt dấu), kết quả xếp theo độ liên quan.
+    sort: newest (mặc định), oldest, price_asc, price_desc, area_asc, area_desc, rating; khi có
+    sort thì q và bán kính chỉ dùng để lọc.
+    fields chọn các trường trả về: card (mặc định), full hoặc danh sách tên trường.
+    lat, lng, radius_km: chỉ lấy bài đăng cách điểm (lat, lng) không quá radius_km km (tối đa
+    GEO_MAX_RADIUS_KM), xếp theo khoảng cách gần nhất và trả thêm distance_km.
+    south, west, north, east: chỉ lấy bài đăng nằm trong khung bản đồ đang xem.
+    facets=true trả thêm số bài đăng theo từng tỉnh, quận, loại phòng, số phòng, khoảng giá và
+    tiện ích; số đếm của mỗi bộ lọc tính theo các bộ lọc còn lại.
+    """
+    invalid = (
+        _invalid_search(filters, sort) or _unknown_fields_message(fields)
+        or _invalid_location(lat, lng, radius_km, south, west, north, east)
+    )
+    if invalid:
+        return invalid
+
+    query = apply_filters(select(*post_columns(post_fields(fields), sort_order(sort)[0])), filters, sort)
+    location, distance = _location_conditions(lat, lng, radius_km, south, west, north, east)
+    query = query.where(*location)
         
     # Add pagination
-    query = query.order_by(desc(Posts.post_date)).limit(limit).offset(offset)
-    
-    result = await db.execute(query)
-    posts = result.scalars().all()
-    return {"status": "success", "posts": posts, "count": len(posts)}
+    try:
+        posts, cursor_value = await _fetch_search_page(db, query, q, limit, cursor, offset, distance, sort)
+    except InvalidCursor:
+        return {"status": "fail", "message": "Invalid cursor"}
+    if distance is not None:
+        posts = [{**post._mapping, "distance_km": distance_km(post.distance_sq)} for post in posts]
+    page = {"status": "success", "posts": posts, "count": len(posts), "next_cursor": cursor_value}
+    if facets:
+        page["facets"] = await facet_counts(db, filters, _facet_conditions(q, location))
+    return page
+
+@app.get("/search-posts-with-details", tags=["Bài đăng"], response_model=Union[PostCardPage, Fail],
+         response_model_exclude_unset=True)
+async def search_posts_with_details(
+    filters: SearchFilters = Depends(search_filters),
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: float = 5,
+    south: Optional[float] = None,
+    west: Optional[float] = None,
+    north: Optional[float] = None,
+    east: Optional[float] = None,
+    facets: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Tìm kiếm bài đăng kèm tiện ích, ảnh đại diện, thông tin chủ nhà và đánh giá.
+    Bộ lọc, q và sort như ở /search-posts.
+    amenity_counts là số bài đăng có từng tiện ích trong toàn bộ kết quả (không chỉ trang hiện tại),
+    chỉ có ở trang đầu (không có cursor, offset = 0) hoặc khi facets=true.
+    Toàn bộ dữ liệu được tải bằng một số lượng truy vấn cố định, không phụ thuộc số bài đăng.
+    fields chọn các trường của bài đăng như ở /search-posts.
+    lat, lng, radius_km và south, west, north, east lọc theo vị trí như ở /search-posts.
+    facets=true trả thêm số bài đăng theo từng bộ lọc như ở /search-posts.
+    """
+    invalid = (
+        _invalid_search(filters, sort) or _unknown_fields_message(fields)
+        or _invalid_location(lat, lng, radius_km, south, west, north, east)
+    )
+    if invalid:
+        return invalid
+    names = post_fields(fields)
+
+    # Chủ nhà và tiện ích lấy cùng truy vấn với bài đăng
+    query = apply_filters(card_query(names, sort_order(sort)[0]), filters, sort)
+    location, distance = _location_conditions(lat, lng, radius_km, south, west, north, east)
+    query = query.where(*location)
+
+    try:
+        posts, cursor_value = await _fetch_search_page(db, query, q, limit, cursor, offset, distance, sort)
+    except InvalidCursor:
+        return {"status": "fail", "message": "Invalid cursor"}
+
+    covers = await _cover_images(db, [post.id for post in posts])
+    page = {
+        "status": "success",
+        "posts": [_post_card(post, names, covers.get(post.id)) for post in posts],
+        "count": len(posts),
+        "next_cursor": cursor_value,
+    }
+    # Các trang sau có cùng kết quả lọc với trang đầu nên không đếm lại
+    if facets or _first_page(cursor, offset):
+        counts = await facet_counts(
+            db, filters, _facet_conditions(q, location), dimensions=FACETS if facets else ("amenities",)
+        )
+        page["amenity_counts"] = counts["amenities"]
+        if facets:
+            page["facets"] = counts
+    return page
 
-@app.get("/get-posts-by-filter", tags=["Bài đăng"])
+@app.get("/get-posts-by-filter", tags=["Bài đăng"], response_model=Union[FilterPage, Fail],
+         response_model_exclude_unset=True)
 async def get_posts_by_filter(
     limit: int = 100, 
     offset: int = 0,
-    province: Optional[str] = None,
-    district: Optional[str] = None, 
-    min_price: Optional[int] = None,
-    max_price: Optional[int] = None,
-    room_num: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: SearchFilters = Depends(search_filters),
     has_wifi: Optional[bool] = None,
     has_ac: Optional[bool] = None,
     has_parking: Optional[bool] = None,
-    db: AsyncSession = Depends(get_db)
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Lấy danh sách bài đăng với bộ lọc phức tạp bao gồm cả tiện ích.
+    Bộ lọc và sort như ở /search-posts; has_wifi, has_ac, has_parking vẫn được hỗ trợ.
+    amenity_counts là số bài đăng có từng tiện ích trong toàn bộ kết quả lọc, chỉ có ở trang đầu
+    (không có cursor, offset = 0).
+    fields chọn các trường trả về như ở /search-posts.
     """
-    query = select(Posts).where(Posts.status == 'approved').where(Posts.is_report == False)
-    
-    # Apply basic filters
-    if province:
-        query = query.where(Posts.province == province)
-    if district:
-        query = query.where(Posts.district == district)
-    if min_price is not None:
-        query = query.where(Posts.price >= min_price)
-    if max_price is not None:
-        query = query.where(Posts.price <= max_price)
-    if room_num is not None:
-        query = query.where(Posts.room_num == room_num)
-    
+    invalid = _invalid_search(filters, sort) or _unknown_fields_message(fields)
+    if invalid:
+        return invalid
+
     # Apply convenience filters if specified
-    if any([has_wifi, has_ac, has_parking]):
-        query = query.join(Convinience, Posts.id == Convinience.post_id)
-        
-        if has_wifi:
-            query = query.where(Convinience.wifi == True)
-        if has_ac:
-            query = query.where(Convinience.air_conditioner == True)
-        if has_parking:
-            query = query.where(Convinience.parking_lot == True)
+    required = list(filters.amenities)
+    if has_wifi:
+        required.append("wifi")
+    if has_ac:
+        required.append("air_conditioner")
+    if has_parking:
+        required.append("parking_lot")
+    filters = filters.model_copy(update={"amenities": required})
+
+    query = apply_filters(select(*post_columns(post_fields(fields), sort_order(sort)[0])), filters, sort)
     
     # Apply pagination
-    query = query.order_by(desc(Posts.post_date)).offset(offset).limit(limit)
-    
-    result = await db.execute(query)
-    posts = result.scalars().all()
+    try:
+        posts, cursor_value = await _fetch_search_page(db, query, None, limit, cursor, offset, sort=sort)
+    except InvalidCursor:
+        return {"status": "fail", "message": "Invalid cursor"}
     
-    return {"status": "success", "posts": posts, "count": len(posts)}
+    page = {"status": "success", "posts": posts, "count": len(posts), "next_cursor": cursor_value}
+    if _first_page(cursor, offset):
+        counts = await facet_counts(db, filters, dimensions=("amenities",))
+        page["amenity_counts"] = counts["amenities"]
+    return page
 
 
 # ----- POST IMAGES ENDPOINTS -----
-@app.post("/add-post-image", tags=["Hình ảnh"])
+@app.post("/add-post-image", tags=["Hình ảnh"], response_model=Union[ImageSaved, Fail])
 async def add_post_image(post_id: int, image_url: str, db: AsyncSession = Depends(get_db)):
     """
     Thêm hình ảnh cho bài đăng.
     """
-    # Verify post exists
-    post_result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = post_result.scalars().first()
-    if not post:
-        return {"status": "fail", "message": "Post not found"}
-    
     new_image = PostImages(post_id=post_id, image_url=image_url)
     db.add(new_image)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        if not is_foreign_key_error(e):
+            raise
+        await db.rollback()
+        return {"status": "fail", "message": "Post not found"}
+    await cache.invalidate(post_tag(post_id, "images"))
     await db.refresh(new_image)
     return {"status": "success", "message": "Image added successfully", "image": new_image}
 
 
-@app.post("/add-post-images", tags=["Hình ảnh"])
+@app.post("/add-post-images", tags=["Hình ảnh"], response_model=Union[ImagesQueued, Fail])
 async def add_post_images(
+    request: Request,
     post_id: int = Form(...),
     images: List[UploadFile] = File(...),
     db: AsyncSession = Depends(get_db)
 ):
+    """
+    Tải lên nhiều hình ảnh cho bài đăng.
+    Mỗi ảnh được ghi xuống đĩa theo từng khối rồi đưa vào hàng đợi xử lý; ảnh không hợp lệ hoặc quá lớn bị bỏ qua.
+    """
     print(f"📥 Received request to add images for post {post_id}")
     print(f"📸 Number of images received: {len(images)}")
-    
-    post_result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = post_result.scalars().first()
-    if not post:
+
+    if len(images) > MAX_FILES:
+        return {"status": "fail", "message": f"Too many images (max {MAX_FILES})"}
+    # Starlette đã đưa file vào bộ đệm tạm trên đĩa; kiểm tra tổng dung lượng trước khi xử lý
+    declared = int(request.headers.get("content-length") or 0)
+    if max(declared, sum(img.size or 0 for img in images)) > MAX_REQUEST_BYTES:
+        return {"status": "fail", "message": f"Upload too large (max {MAX_REQUEST_BYTES} bytes)"}
+
+    # Kiểm tra trước khi ghi file xuống đĩa; khóa ngoại vẫn chặn bài đăng bị xóa trong lúc chờ xử lý
+    if (await db.execute(select(Posts.id).where(Posts.id == post_id))).first() is None:
         return {"status": "fail", "message": "Post not found"}
+    # Trả kết nối ghi về pool trong lúc nhận file để không chặn các request ghi khác
+    await db.rollback()
 
-    new_images = []
     try:
-        for img in images:
-            print(f"🖼️ Processing image: {img.filename}")
-            
-            # Tạo tên file duy nhất
-            unique_filename = f"{post_id}_{uuid.uuid4()}_{img.filename}"
-            file_path = f"/uploads/{unique_filename}"
-            
-            # Lưu file vào thư mục public/uploads của frontend
-            # chạy thường
-            # BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-            # frontend_uploads_dir = os.path.join(BASE_DIR, "frontend", "public", "uploads")
-            # chạy docker
-            frontend_uploads_dir = os.path.join("/app", "frontend", "public", "uploads")
-            
-
-            print(f"📁 Upload directory: {os.path.abspath(frontend_uploads_dir)}")
-            os.makedirs(frontend_uploads_dir, exist_ok=True)
-            
-            file_location = os.path.join(frontend_uploads_dir, unique_filename)
-            print(f"💾 Saving file to: {file_location}")
-            
+        await run_in_threadpool(os.makedirs, PENDING_DIR, exist_ok=True)
+
+        async def store(img):
+            # Tên file duy nhất; các biến thể có dạng {base_name}_{kích thước}.{định dạng}
+            base_name = f"{post_id}_{uuid.uuid4().hex}"
             try:
-                content = await img.read()
-                print(f"📊 Read {len(content)} bytes from uploaded file")
-                
-                with open(file_location, "wb+") as buffer:
-                    buffer.write(content)
-                print(f"✅ Successfully saved file: {unique_filename}")
+                await save_upload(img, pending_path(base_name))
+            except UploadRejected as e:
+                print(f"⚠️ Skipped image {e}")
+                return None
             except Exception as e:
-                print(f"❌ Error saving file {unique_filename}: {str(e)}")
-                continue
-            
-            # Lưu đường dẫn vào database
-            new_image = PostImages(post_id=post_id, image_url=file_path)
-            db.add(new_image)
-            new_images.append(new_image)
-            print(f"✅ Added image record to database: {file_path}")
+                print(f"❌ Error saving image {img.filename}: {str(e)}")
+                return None
+            return base_name
 
+        results = await asyncio.gather(*[store(img) for img in images])
+        queued = [base_name for base_name in results if base_name is not None]
+
+        # Resize / mã hóa lại chạy ở hàng đợi nền; ảnh xuất hiện trong get-post-images khi xử lý xong
+        for base_name in queued:
+            queue.enqueue(db, "process_post_image", post_id=post_id, base_name=base_name)
         await db.commit()
-        print(f"✅ Successfully committed {len(new_images)} images to database")
+        queue.wake()
+        print(f"✅ Queued {len(queued)} images for processing")
         return {
             "status": "success",
-            "message": f"Added {len(new_images)} images successfully",
-            "images": new_images
+            "message": f"Added {len(queued)} images successfully",
+            "queued": len(queued),
+            "skipped": len(images) - len(queued)
         }
     except Exception as e:
         print(f"❌ Error in add_post_images: {str(e)}")
@@ -535,16 +935,61 @@ async def add_post_images(
             "message": f"Error uploading images: {str(e)}"
         }
 
-@app.get("/get-post-images/{post_id}", tags=["Hình ảnh"])
-async def get_post_images(post_id: int, db: AsyncSession = Depends(get_db)):
+
+@queue.task("process_post_image")
+async def process_post_image(db: AsyncSession, post_id: int, base_name: str):
+    source = pending_path(base_name)
+    if not os.path.exists(source):
+        raise PermanentJobError(f"Missing upload {source}")
+    try:
+        width, height, variants = await process_pending(base_name)
+    except UnidentifiedImageError as e:
+        os.remove(source)
+        raise PermanentJobError(str(e))
+
+    # image_url là bản lớn nhất để client cũ vẫn hiển thị được
+    db.add(PostImages(
+        post_id=post_id,
+        image_url=variant_url(None, variants, "full"),
+        width=width,
+        height=height,
+        variants=variants,
+    ))
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        if not is_foreign_key_error(e):
+            raise
+        # Bài đăng đã bị xóa trong lúc ảnh chờ xử lý
+        await db.rollback()
+    else:
+        await cache.invalidate(post_tag(post_id, "images"))
+    # Chỉ xóa file gốc sau khi đã lưu: công việc bị gián đoạn có thể chạy lại từ đầu
+    os.remove(source)
+
+@app.get("/get-post-images/{post_id}", tags=["Hình ảnh"], response_model=ImageList)
+async def get_post_images(request: Request, response: Response, post_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Lấy tất cả hình ảnh của một bài đăng.
     """
-    result = await db.execute(select(PostImages).where(PostImages.post_id == post_id))
-    images = result.scalars().all()
-    return {"status": "success", "images": images}
+    async def validate():
+        result = await db.execute(
+            select(func.count(PostImages.id), func.max(PostImages.id), func.max(PostImages.updated_at))
+            .where(PostImages.post_id == post_id)
+        )
+        count, last_id, modified = result.one()
+        return make_etag("images", post_id, count, last_id, modified), http_date(modified)
+
+    async def load():
+        result = await db.execute(post_images_query(post_id))
+        return ImageList(status="success", images=result.all())
+
+    return await _conditional(
+        request, response, "detail", validate, load,
+        cache.key("get-post-images", post_id=post_id), [post_tag(post_id, "images")]
+    )
 
-@app.delete("/delete-post-image/{image_id}", tags=["Hình ảnh"])
+@app.delete("/delete-post-image/{image_id}", tags=["Hình ảnh"], response_model=Message)
 async def delete_post_image(image_id: int, db: AsyncSession = Depends(get_db)):
     """
     Xóa hình ảnh theo ID.
@@ -553,14 +998,16 @@ async def delete_post_image(image_id: int, db: AsyncSession = Depends(get_db)):
     image = result.scalars().first()
     if image:
         await db.delete(image)
+        post_id = image.post_id
         await db.commit()
+        await cache.invalidate(post_tag(post_id, "images"))
         return {"status": "success", "message": "Image deleted successfully"}
     else:
         return {"status": "fail", "message": "Image not found"}
 
 
 # ----- COMMENTS AND RATINGS ENDPOINTS -----
-@app.post("/add-comment", tags=["Bình luận"])
+@app.post("/add-comment", tags=["Bình luận"], response_model=Union[CommentSaved, Fail])
 async def add_comment(
     post_id: int, 
     user_id: int, 
@@ -571,59 +1018,54 @@ async def add_comment(
     """
     Thêm bình luận và đánh giá cho bài đăng.
     """
-    # Check if post and user exist
-    post_result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = post_result.scalars().first()
-    if not post:
-        return {"status": "fail", "message": "Post not found"}
-    
-    user_result = await db.execute(select(Users).where(Users.id == user_id))
-    user = user_result.scalars().first()
-    if not user:
-        return {"status": "fail", "message": "User not found"}
-    
-    # Check if user already commented on this post
-    existing_comment = await db.execute(
-        select(PostComments).where(
-            PostComments.post_id == post_id,
-            PostComments.user_id == user_id
-        )
-    )
-    if existing_comment.scalars().first():
+    # Một câu lệnh: khóa ngoại báo bài đăng / người dùng không tồn tại, ràng buộc duy nhất
+    # (post_id, user_id) báo người dùng đã bình luận
+    try:
+        new_comment = (await db.scalars(
+            insert(PostComments)
+            .values(
+                post_id=post_id,
+                user_id=user_id,
+                rating=rating,
+                comment=comment,
+                status='pending',  # New comments start as pending
+                is_report=False
+            )
+            .on_conflict_do_nothing(index_elements=[PostComments.post_id, PostComments.user_id])
+            .returning(PostComments)
+        )).first()
+    except IntegrityError as e:
+        if not is_foreign_key_error(e):
+            raise
+        return await _missing_reference(db, post_id)
+    if new_comment is None:
         return {"status": "fail", "message": "Bạn đã bình luận cho bài viết này rồi"}
-    
-    new_comment = PostComments(
-        post_id=post_id,
-        user_id=user_id,
-        rating=rating,
-        comment=comment,
-        status='pending',  # New comments start as pending
-        is_report=False
-    )
-    db.add(new_comment)
+
+    # Bình luận mới chờ duyệt nên chưa được tính vào điểm của bài đăng
+    await _update_rating(db, post_id, added=[rating] if is_counted(new_comment) else [])
+    created = CommentOut.model_validate(new_comment)
     await db.commit()
-    await db.refresh(new_comment)
     return {
         "status": "success", 
         "message": "Bình luận của bạn đã được gửi và đang chờ duyệt",
-        "comment": new_comment
+        "comment": created
     }
 
-@app.get("/get-post-comments/{post_id}", tags=["Bình luận"])
-async def get_post_comments(post_id: int, db: AsyncSession = Depends(get_db)):
+@app.get("/get-post-comments/{post_id}", tags=["Bình luận"], response_model=CommentList)
+async def get_post_comments(post_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Lấy tất cả bình luận của một bài đăng.
     """
-    result = await db.execute(
-        select(PostComments)
-        .where(PostComments.post_id == post_id)
-        .where(PostComments.status == 'approved')
-        .where(PostComments.is_report == False)
-    )
-    comments = result.scalars().all()
-    return {"status": "success", "comments": comments}
+    cache_key = cache.key("get-post-comments", post_id=post_id)
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(post_comments_query(post_id))
+    comments = CommentList(status="success", comments=result.all())
+    return await cache.set(cache_key, comments, [post_tag(post_id, "comments")])
 
-@app.put("/update-comment/{comment_id}", tags=["Bình luận"])
+@app.put("/update-comment/{comment_id}", tags=["Bình luận"], response_model=Union[CommentSaved, Fail])
 async def update_comment(
     comment_id: int,
     rating: float,
@@ -638,24 +1080,19 @@ async def update_comment(
     if not comment_obj:
         return {"status": "fail", "message": "Comment not found"}
     
+    post_id = comment_obj.post_id
+    if is_counted(comment_obj):
+        await _update_rating(db, post_id, removed=[comment_obj.rating], added=[rating])
+
     comment_obj.rating = rating
     comment_obj.comment = comment
     
-    # Update post average rating
-    post_id = comment_obj.post_id
-    avg_rating_query = select(func.avg(PostComments.rating)).where(PostComments.post_id == post_id)
-    avg_rating_result = await db.execute(avg_rating_query)
-    avg_rating = avg_rating_result.scalar()
-    
-    post_result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = post_result.scalars().first()
-    post.avg_rating = avg_rating
-    
     await db.commit()
+    await cache.invalidate(post_tag(post_id), post_tag(post_id, "comments"), POSTS_LIST_TAG)
     await db.refresh(comment_obj)
     return {"status": "success", "message": "Comment updated successfully", "comment": comment_obj}
 
-@app.delete("/delete-comment/{comment_id}", tags=["Bình luận"])
+@app.delete("/delete-comment/{comment_id}", tags=["Bình luận"], response_model=Message)
 async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_db)):
     """
     Xóa bình luận theo ID.
@@ -666,56 +1103,68 @@ async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_db)):
         return {"status": "fail", "message": "Comment not found"}
     
     post_id = comment.post_id
+    if is_counted(comment):
+        await _update_rating(db, post_id, removed=[comment.rating])
     await db.delete(comment)
     await db.commit()
-    
-    # Update post average rating
-    avg_rating_query = select(func.avg(PostComments.rating)).where(PostComments.post_id == post_id)
-    avg_rating_result = await db.execute(avg_rating_query)
-    avg_rating = avg_rating_result.scalar() or 0
-    
-    post_result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = post_result.scalars().first()
-    if post:
-        post.avg_rating = avg_rating
-        await db.commit()
+    await cache.invalidate(post_tag(post_id), post_tag(post_id, "comments"), POSTS_LIST_TAG)
     
     return {"status": "success", "message": "Comment deleted successfully"}
 
 
-# ----- FAVOURITES ENDPOINTS -----
-@app.post("/add-favourite", tags=["Yêu thích"])
-async def add_favourite(user_id: int, post_id: int, db: AsyncSession = Depends(get_db)):
-    # Kiểm tra bài viết tồn tại
-    post_result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = post_result.scalars().first()
+async def _missing_reference(db, post_id):
+    """
+    Thông báo lỗi khi INSERT vi phạm khóa ngoại tới bài đăng hoặc người dùng. Chỉ chạy khi
+    ghi thất bại, nên lần ghi thành công không phải SELECT kiểm tra trước.
+    """
+    await db.rollback()
+    if (await db.execute(select(Posts.id).where(Posts.id == post_id))).first() is None:
+        return {"status": "fail", "message": "Post not found"}
+    return {"status": "fail", "message": "User not found"}
+
+
+async def _update_rating(db, post_id, removed=(), added=()):
+    """Cộng / trừ điểm của bài đăng trong transaction hiện tại (xem ratings.py)."""
+    change = rating_change(post_id, removed, added)
+    if change is not None:
+        await db.execute(change)
+
+@app.get("/get-post-rating/{post_id}", tags=["Bình luận"], response_model=Union[RatingResult, Fail])
+async def get_post_rating(post_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Điểm trung bình, số lượt đánh giá và phân bố số sao (1-5) của bài đăng.
+    """
+    post = await db.get(Posts, post_id)
     if not post:
         return {"status": "fail", "message": "Post not found"}
+    return {"status": "success", "rating": rating_summary(post)}
 
-    # Kiểm tra người dùng tồn tại
-    user_result = await db.execute(select(Users).where(Users.id == user_id))
-    user = user_result.scalars().first()
-    if not user:
-        return {"status": "fail", "message": "User not found"}
+
+# ----- FAVOURITES ENDPOINTS -----
+@app.post("/add-favourite", tags=["Yêu thích"], response_model=Message)
+async def add_favourite(user_id: int, post_id: int, db: AsyncSession = Depends(get_db)):
+    # Khóa ngoại kiểm tra bài viết / người dùng tồn tại, khóa chính (user_id, post_id) chặn trùng
+    try:
+        added = (await db.execute(
+            insert(Favourites)
+            .values(user_id=user_id, post_id=post_id)
+            .on_conflict_do_nothing(index_elements=[Favourites.user_id, Favourites.post_id])
+            .returning(Favourites.post_id)
+        )).first()
+    except IntegrityError as e:
+        if not is_foreign_key_error(e):
+            raise
+        return await _missing_reference(db, post_id)
 
     # Nếu đã tồn tại thì vẫn trả về success để tránh lỗi phía client
-    existing_fav = await db.execute(
-        select(Favourites).where(
-            Favourites.post_id == post_id,
-            Favourites.user_id == user_id
-        )
-    )
-    if existing_fav.scalars().first():
+    if added is None:
         return {"status": "success", "message": "Đã tồn tại trong danh sách yêu thích"}
-
-    new_favourite = Favourites(user_id=user_id, post_id=post_id)
-    db.add(new_favourite)
     await db.commit()
     return {"status": "success", "message": "Đã thêm vào danh sách yêu thích"}
 
 
 
-@app.delete("/remove-favourite", tags=["Yêu thích"])
+@app.delete("/remove-favourite", tags=["Yêu thích"], response_model=Message)
 async def remove_favourite(user_id: int, post_id: int, db: AsyncSession = Depends(get_db)):
     """
     Xóa bài đăng khỏi danh sách yêu thích.
@@ -736,71 +1185,59 @@ async def remove_favourite(user_id: int, post_id: int, db: AsyncSession = Depend
 
 
 # ----- HISTORY ENDPOINTS -----
-@app.post("/add-history", tags=["Lịch sử"])
-async def add_history(user_id: int, post_id: int, db: AsyncSession = Depends(get_db)):
+@app.post("/add-history", tags=["Lịch sử"], response_model=Message)
+async def add_history(user_id: int, post_id: int):
     """
-    Thêm bài đăng vào lịch sử xem của người dùng.
+    Thêm bài đăng vào lịch sử xem của người dùng (đồng thời tính một lượt xem).
+    Lượt xem được gom trong bộ nhớ và ghi theo lô (xem views.py).
     """
-    # Check if post and user exist
-    post_result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = post_result.scalars().first()
-    if not post:
-        return {"status": "fail", "message": "Post not found"}
-    
-    user_result = await db.execute(select(Users).where(Users.id == user_id))
-    user = user_result.scalars().first()
-    if not user:
-        return {"status": "fail", "message": "User not found"}
-    
-    # Check if already in history and update timestamp if it is
-    existing_history = await db.execute(
-        select(History).where(
-            History.post_id == post_id,
-            History.user_id == user_id
-        )
-    )
-    history_entry = existing_history.scalars().first()
-    
-    if history_entry:
-        # Update timestamp
-        history_entry.viewed_at = func.now()
-    else:
-        # Create new entry
-        new_history = History(user_id=user_id, post_id=post_id)
-        db.add(new_history)
-    
-    await db.commit()
+    view_buffer.record(post_id, user_id)
     return {"status": "success", "message": "History updated successfully"}
 
-@app.get("/get-user-history/{user_id}", tags=["Lịch sử"])
-async def get_user_history(user_id: int, limit: int = 10, db: AsyncSession = Depends(get_db)):
+@app.post("/add-view/{post_id}", tags=["Lịch sử"], response_model=Success)
+async def add_view(post_id: int):
+    """
+    Tính một lượt xem bài đăng cho người dùng chưa đăng nhập.
+    """
+    view_buffer.record(post_id)
+    return {"status": "success"}
+
+@app.get("/get-user-history/{user_id}", tags=["Lịch sử"], response_model=Union[HistoryList, Fail],
+         response_model_exclude_unset=True)
+async def get_user_history(user_id: int, limit: int = 10, offset: int = 0, cursor: Optional[str] = None,
+                           fields: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
     """
-    Lấy lịch sử xem của người dùng.
+    Lấy lịch sử xem của người dùng, mới xem nhất trước, mỗi bài đăng ở dạng thẻ như ở
+    /search-posts-with-details (ảnh đại diện, tiện ích, chủ nhà).
+    Phân trang bằng cursor (lấy từ next_cursor của trang trước) hoặc offset.
+    fields chọn các trường của bài đăng như ở /get-list-of-posts.
     """
+    invalid = _unknown_fields_message(fields)
+    if invalid:
+        return invalid
+    names = post_fields(fields)
     # Join History with Posts to get full post information and sort by viewed_at descending
-    query = select(Posts, History.viewed_at).join(
-        History, Posts.id == History.post_id
-    ).where(
-        History.user_id == user_id
-    ).order_by(
-        desc(History.viewed_at)
-    ).limit(limit)
-    
+    try:
+        query = history_query(user_id, names, limit, cursor, offset)
+    except InvalidCursor:
+        return {"status": "fail", "message": "Invalid cursor"}
+
     result = await db.execute(query)
-    history_items = [(post, viewed_at) for post, viewed_at in result]
-    
+    rows = result.all()
+    covers = await _cover_images(db, [row.id for row in rows])
+
     # Format response
     history = [
         {
-            "post": post,
-            "viewed_at": viewed_at
+            "post": _post_card(row, names, covers.get(row.id)),
+            "viewed_at": row.viewed_at
         }
-        for post, viewed_at in history_items
+        for row in rows
     ]
     
-    return {"status": "success", "history": history}
+    return {"status": "success", "history": history, "next_cursor": next_cursor(rows, HISTORY_ORDER, limit)}
 
-@app.delete("/clear-user-history/{user_id}", tags=["Lịch sử"])
+@app.delete("/clear-user-history/{user_id}", tags=["Lịch sử"], response_model=Message)
 async def clear_user_history(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Xóa toàn bộ lịch sử xem của người dùng.
@@ -812,7 +1249,7 @@ async def clear_user_history(user_id: int, db: AsyncSession = Depends(get_db)):
 
 
 # ----- CONVENIENCE ENDPOINTS -----
-@app.post("/add-convenience", tags=["Tiện ích"])
+@app.post("/add-convenience", tags=["Tiện ích"], response_model=Union[ConvenienceSaved, Fail])
 async def add_convenience(
     post_id: int,
     wifi: bool = False,
@@ -832,56 +1269,74 @@ async def add_convenience(
     """
     Thêm thông tin tiện ích cho bài đăng.
     """
-    # Check if post exists
-    post_result = await db.execute(select(Posts).where(Posts.id == post_id))
-    post = post_result.scalars().first()
-    if not post:
-        return {"status": "fail", "message": "Post not found"}
-    
-    # Check if convenience already exists for this post
-    convenience_result = await db.execute(select(Convinience).where(Convinience.post_id == post_id))
-    existing_convenience = convenience_result.scalars().first()
-    
-    if existing_convenience:
-        return {"status": "fail", "message": "Convenience information already exists for this post, use update endpoint instead"}
-    
     try:
-        new_convenience = Convinience(
-            post_id=post_id,
-            wifi=wifi,
-            air_conditioner=air_conditioner,
-            fridge=fridge,
-            washing_machine=washing_machine,
-            parking_lot=parking_lot,
-            security=security,
-            kitchen=kitchen,
-            private_bathroom=private_bathroom,
-            furniture=furniture,
-            bacony=bacony,
-            elevator=elevator,
-            pet_allowed=pet_allowed
+        # Khóa ngoại báo bài đăng không tồn tại, ràng buộc duy nhất post_id báo đã có tiện ích
+        new_convenience = (await db.scalars(
+            insert(Convinience)
+            .values(
+                post_id=post_id,
+                wifi=wifi,
+                air_conditioner=air_conditioner,
+                fridge=fridge,
+                washing_machine=washing_machine,
+                parking_lot=parking_lot,
+                security=security,
+                kitchen=kitchen,
+                private_bathroom=private_bathroom,
+                furniture=furniture,
+                bacony=bacony,
+                elevator=elevator,
+                pet_allowed=pet_allowed
+            )
+            .on_conflict_do_nothing(index_elements=[Convinience.post_id])
+            .returning(Convinience)
+        )).first()
+        if new_convenience is None:
+            return {"status": "fail", "message": "Convenience information already exists for this post, use update endpoint instead"}
+
+        await db.execute(
+            update(Posts).where(Posts.id == post_id).values(amenity_mask=mask_of(new_convenience))
         )
-        
-        db.add(new_convenience)
+        created = ConvenienceOut.model_validate(new_convenience)
         await db.commit()
-        await db.refresh(new_convenience)
-        return {"status": "success", "message": "Convenience information added successfully", "convenience": new_convenience}
+        await cache.invalidate(post_tag(post_id), post_tag(post_id, "convenience"), POSTS_LIST_TAG)
+        return {"status": "success", "message": "Convenience information added successfully", "convenience": created}
+    except IntegrityError as e:
+        if is_foreign_key_error(e):
+            await db.rollback()
+            return {"status": "fail", "message": "Post not found"}
+        return {"status": "fail", "message": f"Error creating convenience: {str(e)}"}
     except Exception as e:
         return {"status": "fail", "message": f"Error creating convenience: {str(e)}"}
 
-@app.get("/get-post-convenience/{post_id}", tags=["Tiện ích"])
-async def get_post_convenience(post_id: int, db: AsyncSession = Depends(get_db)):
+@app.get("/get-post-convenience/{post_id}", tags=["Tiện ích"], response_model=Union[ConvenienceResult, Fail])
+async def get_post_convenience(request: Request, response: Response, post_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Lấy thông tin tiện ích của bài đăng.
     """
-    result = await db.execute(select(Convinience).where(Convinience.post_id == post_id))
-    convenience = result.scalars().first()
-    if convenience:
-        return {"status": "success", "convenience": convenience}
-    else:
-        return {"status": "fail", "message": "Convenience information not found for this post"}
+    async def validate():
+        result = await db.execute(
+            select(Convinience.id, Convinience.updated_at).where(Convinience.post_id == post_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        return make_etag("convenience", post_id, row.id, row.updated_at), http_date(row.updated_at)
+
+    async def load():
+        result = await db.execute(post_convenience_query(post_id))
+        convenience = result.first()
+        if convenience:
+            return ConvenienceResult(status="success", convenience=convenience)
+        else:
+            return {"status": "fail", "message": "Convenience information not found for this post"}
+
+    return await _conditional(
+        request, response, "detail", validate, load,
+        cache.key("get-post-convenience", post_id=post_id), [post_tag(post_id, "convenience")]
+    )
 
-@app.put("/update-convenience/{post_id}", tags=["Tiện ích"])
+@app.put("/update-convenience/{post_id}", tags=["Tiện ích"], response_model=Union[ConvenienceSaved, Fail])
 async def update_convenience(
     post_id: int,
     wifi: bool = False,
@@ -918,12 +1373,16 @@ async def update_convenience(
     convenience.bacony = bacony
     convenience.elevator = elevator
     convenience.pet_allowed = pet_allowed
+    await db.execute(
+        update(Posts).where(Posts.id == post_id).values(amenity_mask=mask_of(convenience))
+    )
     
     await db.commit()
+    await cache.invalidate(post_tag(post_id), post_tag(post_id, "convenience"), POSTS_LIST_TAG)
     await db.refresh(convenience)
     return {"status": "success", "message": "Convenience information updated successfully", "convenience": convenience}
 
-@app.delete("/delete-convenience/{post_id}", tags=["Tiện ích"])
+@app.delete("/delete-convenience/{post_id}", tags=["Tiện ích"], response_model=Message)
 async def delete_convenience(post_id: int, db: AsyncSession = Depends(get_db)):
     """
     Xóa thông tin tiện ích của bài đăng.
@@ -932,28 +1391,64 @@ async def delete_convenience(post_id: int, db: AsyncSession = Depends(get_db)):
     convenience = result.scalars().first()
     if convenience:
         await db.delete(convenience)
+        await db.execute(update(Posts).where(Posts.id == post_id).values(amenity_mask=0))
         await db.commit()
+        await cache.invalidate(post_tag(post_id), post_tag(post_id, "convenience"), POSTS_LIST_TAG)
         return {"status": "success", "message": "Convenience information deleted successfully"}
     else:
         return {"status": "fail", "message": "Convenience information not found for this post"}
 
-@app.get("/get-user-favourites/{user_id}", tags=["Yêu thích"])
-async def get_user_favourites(user_id: int, db: AsyncSession = Depends(get_db)):
-    query = select(Favourites).where(Favourites.user_id == user_id)
+@app.get("/get-user-favourites/{user_id}", tags=["Yêu thích"], response_model=Union[FavouriteList, Fail],
+         response_model_exclude_unset=True)
+async def get_user_favourites(user_id: int, limit: int = 20, offset: int = 0, cursor: Optional[str] = None,
+                              fields: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    """
+    Lấy danh sách yêu thích của người dùng, mới thêm nhất trước, kèm thẻ bài đăng như ở
+    /search-posts-with-details (ảnh đại diện, tiện ích, chủ nhà).
+    Phân trang bằng cursor (lấy từ next_cursor của trang trước) hoặc offset.
+    fields chọn các trường của bài đăng như ở /get-list-of-posts.
+    Chỉ cần biết bài nào đã được yêu thích thì dùng /get-user-favourite-ids.
+    """
+    invalid = _unknown_fields_message(fields)
+    if invalid:
+        return invalid
+    names = post_fields(fields)
+    try:
+        query = favourites_query(user_id, names, limit, cursor, offset)
+    except InvalidCursor:
+        return {"status": "fail", "message": "Invalid cursor"}
+
     result = await db.execute(query)
-    posts_id = result.scalars().all()
-    return {"status": "success", "favourites": posts_id}
+    rows = result.all()
+    covers = await _cover_images(db, [row.id for row in rows])
+    favourites = [
+        {
+            "user_id": user_id,
+            "post_id": row.post_id,
+            "added_at": row.added_at,
+            "post": _post_card(row, names, covers.get(row.id)),
+        }
+        for row in rows
+    ]
+    return {"status": "success", "favourites": favourites, "next_cursor": next_cursor(rows, FAVOURITE_ORDER, limit)}
+
+@app.get("/get-user-favourite-ids/{user_id}", tags=["Yêu thích"], response_model=FavouriteIds)
+async def get_user_favourite_ids(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Id của mọi bài đăng người dùng đã yêu thích, để đánh dấu nút yêu thích trong danh sách.
+    """
+    result = await db.execute(favourite_ids_query(user_id))
+    return {"status": "success", "post_ids": result.scalars().all()}
 
 # ----- STATISTICS ENDPOINTS -----
-@app.get("/get-user-stats/{user_id}", tags=["Thống kê"])
-async def get_user_stats(user_id: int, db: AsyncSession = Depends(get_db)):
+@app.get("/get-user-stats/{user_id}", tags=["Thống kê"], response_model=Union[StatsResult, Fail])
+async def get_user_stats(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Lấy thống kê về hoạt động của người dùng.
     """
     # Check if user exists
-    user_result = await db.execute(select(Users).where(Users.id == user_id))
-    user = user_result.scalars().first()
-    if not user:
+    user_result = await db.execute(select(Users.id).where(Users.id == user_id))
+    if user_result.first() is None:
         return {"status": "fail", "message": "User not found"}
     
     # Get posts count
@@ -987,120 +1482,48 @@ async def get_user_stats(user_id: int, db: AsyncSession = Depends(get_db)):
     }
 
 # ----- ADMIN ENDPOINTS -----
-@app.get("/admin/pending-posts", tags=["Admin"])
-async def get_pending_posts(db: AsyncSession = Depends(get_db), admin: Users = Depends(get_current_admin)):
+@app.get("/admin/pending-posts", tags=["Admin"], response_model=AdminPostList)
+async def get_pending_posts(db: AsyncSession = Depends(get_read_db), admin: Principal = Depends(get_current_admin)):
     """
     Lấy danh sách bài đăng đang chờ duyệt.
     """
-    # Join Posts with Users to get user email
-    query = select(Posts, Users.email).join(
-        Users, Posts.user_id == Users.id
-    ).where(
-        Posts.status == 'pending'
-    ).order_by(
-        desc(Posts.post_date)
-    )
-    
-    result = await db.execute(query)
-    posts_with_emails = result.all()
-    
-    # Format response to include user email
-    posts = [
-        {
-            **post.__dict__,
-            "user_email": email
-        }
-        for post, email in posts_with_emails
-    ]
+    result = await db.execute(admin_posts_query(Posts.status == 'pending'))
+    posts = result.all()
     
     return {"status": "success", "posts": posts}
 
-@app.get("/admin/pending-comments", tags=["Admin"])
-async def get_pending_comments(db: AsyncSession = Depends(get_db), admin: Users = Depends(get_current_admin)):
+@app.get("/admin/pending-comments", tags=["Admin"], response_model=AdminCommentList)
+async def get_pending_comments(db: AsyncSession = Depends(get_read_db), admin: Principal = Depends(get_current_admin)):
     """
     Lấy danh sách bình luận đang chờ duyệt.
     """
-    # Join PostComments with Users to get user email
-    query = select(PostComments, Users.email).join(
-        Users, PostComments.user_id == Users.id
-    ).where(
-        PostComments.status == 'pending'
-    ).order_by(
-        desc(PostComments.comment_date)
-    )
-    
-    result = await db.execute(query)
-    comments_with_emails = result.all()
-    
-    # Format response to include user email
-    comments = [
-        {
-            **comment.__dict__,
-            "user_email": email
-        }
-        for comment, email in comments_with_emails
-    ]
+    result = await db.execute(admin_comments_query(PostComments.status == 'pending'))
+    comments = result.all()
     
     return {"status": "success", "comments": comments}
 
-@app.get("/admin/reported-posts", tags=["Admin"])
-async def get_reported_posts(db: AsyncSession = Depends(get_db), admin: Users = Depends(get_current_admin)):
+@app.get("/admin/reported-posts", tags=["Admin"], response_model=AdminPostList)
+async def get_reported_posts(db: AsyncSession = Depends(get_read_db), admin: Principal = Depends(get_current_admin)):
     """
     Lấy danh sách bài đăng bị báo cáo.
     """
-    # Join Posts with Users to get user email
-    query = select(Posts, Users.email).join(
-        Users, Posts.user_id == Users.id
-    ).where(
-        Posts.is_report == True
-    ).order_by(
-        desc(Posts.post_date)
-    )
-    
-    result = await db.execute(query)
-    posts_with_emails = result.all()
-    
-    # Format response to include user email
-    posts = [
-        {
-            **post.__dict__,
-            "user_email": email
-        }
-        for post, email in posts_with_emails
-    ]
+    result = await db.execute(admin_posts_query(Posts.is_report == True))
+    posts = result.all()
     
     return {"status": "success", "posts": posts}
 
-@app.get("/admin/reported-comments", tags=["Admin"])
-async def get_reported_comments(db: AsyncSession = Depends(get_db), admin: Users = Depends(get_current_admin)):
+@app.get("/admin/reported-comments", tags=["Admin"], response_model=AdminCommentList)
+async def get_reported_comments(db: AsyncSession = Depends(get_read_db), admin: Principal = Depends(get_current_admin)):
     """
     Lấy danh sách bình luận bị báo cáo.
     """
-    # Join PostComments with Users to get user email
-    query = select(PostComments, Users.email).join(
-        Users, PostComments.user_id == Users.id
-    ).where(
-        PostComments.is_report == True
-    ).order_by(
-        desc(PostComments.comment_date)
-    )
-    
-    result = await db.execute(query)
-    comments_with_emails = result.all()
-    
-    # Format response to include user email
-    comments = [
-        {
-            **comment.__dict__,
-            "user_email": email
-        }
-        for comment, email in comments_with_emails
-    ]
+    result = await db.execute(admin_comments_query(PostComments.is_report == True))
+    comments = result.all()
     
     return {"status": "success", "comments": comments}
 
-@app.put("/admin/approve-post/{post_id}", tags=["Admin"])
-async def approve_post(post_id: int, db: AsyncSession = Depends(get_db), admin: Users = Depends(get_current_admin)):
+@app.put("/admin/approve-post/{post_id}", tags=["Admin"], response_model=Message)
+async def approve_post(post_id: int, db: AsyncSession = Depends(get_db), admin: Principal = Depends(get_current_admin)):
     """
     Duyệt bài đăng.
     """
@@ -1112,10 +1535,11 @@ async def approve_post(post_id: int, db: AsyncSession = Depends(get_db), admin:
     post.status = 'approved'
     post.is_report = False
     await db.commit()
+    await cache.invalidate(post_tag(post_id), POSTS_LIST_TAG)
     return {"status": "success", "message": "Post approved successfully"}
 
-@app.put("/admin/reject-post/{post_id}", tags=["Admin"])
-async def reject_post(post_id: int, db: AsyncSession = Depends(get_db), admin: Users = Depends(get_current_admin)):
+@app.put("/admin/reject-post/{post_id}", tags=["Admin"], response_model=Message)
+async def reject_post(post_id: int, db: AsyncSession = Depends(get_db), admin: Principal = Depends(get_current_admin)):
     """
     Từ chối bài đăng.
     """
@@ -1126,10 +1550,11 @@ async def reject_post(post_id: int, db: AsyncSession = Depends(get_db), admin: U
     
     post.status = 'rejected'
     await db.commit()
+    await cache.invalidate(post_tag(post_id), POSTS_LIST_TAG)
     return {"status": "success", "message": "Post rejected successfully"}
 
-@app.put("/admin/approve-comment/{comment_id}", tags=["Admin"])
-async def approve_comment(comment_id: int, db: AsyncSession = Depends(get_db), admin: Users = Depends(get_current_admin)):
+@app.put("/admin/approve-comment/{comment_id}", tags=["Admin"], response_model=Message)
+async def approve_comment(comment_id: int, db: AsyncSession = Depends(get_db), admin: Principal = Depends(get_current_admin)):
     """
     Duyệt bình luận.
     """
@@ -1138,13 +1563,17 @@ async def approve_comment(comment_id: int, db: AsyncSession = Depends(get_db), a
     if not comment:
         return {"status": "fail", "message": "Comment not found"}
     
+    post_id = comment.post_id
+    if not is_counted(comment):
+        await _update_rating(db, post_id, added=[comment.rating])
     comment.status = 'approved'
     comment.is_report = False
     await db.commit()
+    await cache.invalidate(post_tag(post_id), post_tag(post_id, "comments"), POSTS_LIST_TAG)
     return {"status": "success", "message": "Comment approved successfully"}
 
-@app.put("/admin/reject-comment/{comment_id}", tags=["Admin"])
-async def reject_comment(comment_id: int, db: AsyncSession = Depends(get_db), admin: Users = Depends(get_current_admin)):
+@app.put("/admin/reject-comment/{comment_id}", tags=["Admin"], response_model=Message)
+async def reject_comment(comment_id: int, db: AsyncSession = Depends(get_db), admin: Principal = Depends(get_current_admin)):
     """
     Từ chối bình luận.
     """
@@ -1153,11 +1582,15 @@ async def reject_comment(comment_id: int, db: AsyncSession = Depends(get_db), ad
     if not comment:
         return {"status": "fail", "message": "Comment not found"}
     
+    post_id = comment.post_id
+    if is_counted(comment):
+        await _update_rating(db, post_id, removed=[comment.rating])
     comment.status = 'rejected'
     await db.commit()
+    await cache.invalidate(post_tag(post_id), post_tag(post_id, "comments"), POSTS_LIST_TAG)
     return {"status": "success", "message": "Comment rejected successfully"}
 
-@app.post("/report-post/{post_id}", tags=["Bài đăng"])
+@app.post("/report-post/{post_id}", tags=["Bài đăng"], response_model=Message)
 async def report_post(post_id: int, db: AsyncSession = Depends(get_db)):
     """
     Báo cáo bài đăng.
@@ -1169,9 +1602,10 @@ async def report_post(post_id: int, db: AsyncSession = Depends(get_db)):
     
     post.is_report = True
     await db.commit()
+    await cache.invalidate(post_tag(post_id), POSTS_LIST_TAG)
     return {"status": "success", "message": "Post reported successfully"}
 
-@app.post("/report-comment/{comment_id}", tags=["Bình luận"])
+@app.post("/report-comment/{comment_id}", tags=["Bình luận"], response_model=Message)
 async def report_comment(comment_id: int, db: AsyncSession = Depends(get_db)):
     """
     Báo cáo bình luận.
@@ -1182,11 +1616,43 @@ async def report_comment(comment_id: int, db: AsyncSession = Depends(get_db)):
         return {"status": "fail", "message": "Comment not found"}
     
     comment.is_report = True
+    post_id = comment.post_id
     await db.commit()
+    await cache.invalidate(post_tag(post_id, "comments"))
     return {"status": "success", "message": "Comment reported successfully"}
 
-@app.put("/admin/make-admin/{user_id}", tags=["Admin"])
-async def make_admin(user_id: int, db: AsyncSession = Depends(get_db)):
+@app.get("/admin/cache-stats", tags=["Admin"], response_model=CacheStatsResult)
+async def get_cache_stats(admin: Principal = Depends(get_current_admin)):
+    """
+    Thống kê bộ nhớ đệm: số lần trúng/trượt, số mục bị loại bỏ và bị vô hiệu hóa.
+    principals là cache người dùng đã xác thực (xem auth.py), limits là trạng thái giới hạn
+    tần suất và số request bị từ chối (xem limits.py).
+    """
+    return {
+        "status": "success",
+        "cache": {**cache.info(), "principals": principals.info(), "limits": limiter.info()},
+    }
+
+@app.get("/admin/jobs", tags=["Admin"], response_model=JobsResult)
+async def get_job_stats(db: AsyncSession = Depends(get_read_db), admin: Principal = Depends(get_current_admin)):
+    """
+    Tình trạng hàng đợi công việc nền: số việc đang chờ / đang chạy / thất bại và lỗi gần nhất,
+    cùng số lượt xem đang chờ ghi và tiến độ backfill của migration.
+    """
+    return {"status": "success", "jobs": await queue.stats(db), "views": view_buffer.info(),
+            "backfill": backfiller.info()}
+
+@app.post("/admin/jobs/{job_id}/retry", tags=["Admin"], response_model=Message)
+async def retry_job(job_id: int, db: AsyncSession = Depends(get_db), admin: Principal = Depends(get_current_admin)):
+    """
+    Chạy lại một công việc đã thất bại.
+    """
+    if await queue.retry(db, job_id):
+        return {"status": "success", "message": "Job queued for retry"}
+    return {"status": "fail", "message": "Failed job not found"}
+
+@app.put("/admin/make-admin/{user_id}", tags=["Admin"], response_model=Message)
+async def make_admin(user_id: int, db: AsyncSession = Depends(get_db), admin: Principal = Depends(get_current_admin)):
     """
     Chuyển người dùng thành admin.
     """
@@ -1197,5 +1663,6 @@ async def make_admin(user_id: int, db: AsyncSession = Depends(get_db)):
     
     user.is_admin = True
     await db.commit()
+    principals.invalidate(user_id)
     return {"status": "success", "message": "User is now an admin"}
 
@@ -0,0 +1,181 @@
+"""
+Xác thực: mật khẩu băm, access token có chữ ký và cache người dùng đã xác thực.
+
+Mật khẩu được băm bằng PBKDF2-SHA256 (hashlib, không cần thư viện ngoài), lưu dạng
+"pbkdf2_sha256$<số vòng>$<salt>$<hash>". Việc băm tốn CPU có chủ ý nên các endpoint gọi
+hash_password / verify_password qua run_in_threadpool để không chặn event loop. Mật khẩu cũ
+còn lưu dạng văn bản thường vẫn đăng nhập được và được băm lại ngay lần đăng nhập đó (tương tự
+khi đổi PASSWORD_HASH_ITERATIONS); `python migrate.py hash-passwords` băm lại tất cả một lần.
+
+Access token là JWT HS256 (header.payload.signature, base64url) chứa id người dùng và thời
+điểm hết hạn; kiểm tra token chỉ cần tính lại HMAC, không truy vấn cơ sở dữ liệu. Client gửi
+token trong header "Authorization: Bearer <token>".
+
+PrincipalCache giữ thông tin (id, email, tên, quyền admin) của những người dùng vừa xác thực
+theo LRU có giới hạn; các endpoint sửa người dùng gọi principals.invalidate(user_id). Mỗi mục
+chỉ sống AUTH_PRINCIPAL_TTL giây để các tiến trình khác (không nhận được invalidate) không
+dùng dữ liệu cũ quá lâu.
+
+Cấu hình qua biến môi trường:
+    AUTH_SECRET                 khóa ký token; không đặt thì sinh ngẫu nhiên mỗi lần khởi động
+                                (token mất hiệu lực khi khởi động lại, không dùng được nhiều tiến trình)
+    AUTH_TOKEN_TTL              thời gian sống của token, giây (mặc định 604800 = 7 ngày)
+    PASSWORD_HASH_ITERATIONS    số vòng PBKDF2 (mặc định 600000)
+    AUTH_PRINCIPAL_CACHE_SIZE   số người dùng tối đa trong cache (mặc định 1024)
+    AUTH_PRINCIPAL_TTL          thời gian sống của mỗi mục cache, giây (mặc định 60)
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import text
+
+SECRET = os.environ.get("AUTH_SECRET")
+if not SECRET:
+    SECRET = secrets.token_hex(32)
+    print("⚠️ AUTH_SECRET is not set, using a random key: tokens are invalidated on restart")
+TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", 7 * 24 * 3600))
+HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", 600_000))
+
+HASH_ALGORITHM = "pbkdf2_sha256"
+
+
+# ----- Mật khẩu -----
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations).hex()
+
+
+def hash_password(password):
+    salt = secrets.token_hex(16)
+    return f"{HASH_ALGORITHM}${HASH_ITERATIONS}${salt}${_pbkdf2(password, salt, HASH_ITERATIONS)}"
+
+
+def is_hashed(stored):
+    return stored is not None and stored.startswith(HASH_ALGORITHM + "$")
+
+
+def verify_password(password, stored):
+    """(mật khẩu đúng, cần băm lại) so với giá trị đã lưu, kể cả mật khẩu cũ chưa được băm."""
+    if stored is None:
+        return False, False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+    try:
+        _, iterations, salt, expected = stored.split("$")
+        iterations = int(iterations)
+    except ValueError:
+        return False, False
+    ok = hmac.compare_digest(_pbkdf2(password, salt, iterations), expected)
+    return ok, ok and iterations != HASH_ITERATIONS
+
+
+def hash_plaintext_passwords(connection):
+    """Băm mọi mật khẩu còn lưu dạng văn bản thường (chạy offline, tốn CPU)."""
+    rows = connection.execute(
+        text('SELECT id, password FROM "Users" WHERE password IS NOT NULL AND password NOT LIKE :prefix'),
+        {"prefix": HASH_ALGORITHM + "$%"},
+    ).all()
+    if rows:
+        connection.execute(
+            text('UPDATE "Users" SET password = :password WHERE id = :id'),
+            [{"id": user_id, "password": hash_password(password)} for user_id, password in rows],
+        )
+    return len(rows)
+
+
+# ----- Access token -----
+class InvalidToken(Exception):
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(value):
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+_HEADER = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+
+
+def _sign(message):
+    return _b64encode(hmac.new(SECRET.encode(), message.encode(), hashlib.sha256).digest())
+
+
+def create_token(user_id, ttl=None):
+    now = int(time.time())
+    payload = {"sub": str(user_id), "iat": now, "exp": now + (ttl or TOKEN_TTL)}
+    message = f"{_HEADER}.{_b64encode(json.dumps(payload, separators=(',', ':')).encode())}"
+    return f"{message}.{_sign(message)}"
+
+
+def decode_token(token):
+    """Id người dùng trong token, hoặc InvalidToken nếu sai chữ ký, sai định dạng hay đã hết hạn."""
+    try:
+        header, payload, signature = token.split(".")
+    except ValueError:
+        raise InvalidToken("Malformed token")
+    if header != _HEADER or not hmac.compare_digest(signature, _sign(f"{header}.{payload}")):
+        raise InvalidToken("Invalid signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+        user_id, expires = int(claims["sub"]), claims["exp"]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise InvalidToken("Malformed token")
+    if expires < time.time():
+        raise InvalidToken("Token expired")
+    return user_id
+
+
+# ----- Người dùng đã xác thực -----
+class Principal(NamedTuple):
+    id: int
+    email: Optional[str]
+    full_name: Optional[str]
+    is_admin: bool
+
+
+class PrincipalCache:
+    """LRU trong tiến trình: user_id -> (hết hạn lúc, Principal)."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        entry = self.entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self.entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, principal):
+        self.entries[principal.id] = (time.monotonic() + self.ttl, principal)
+        self.entries.move_to_end(principal.id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self.entries.pop(user_id, None)
+
+    def info(self):
+        return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+principals = PrincipalCache(
+    max_size=int(os.environ.get("AUTH_PRINCIPAL_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("AUTH_PRINCIPAL_TTL", 60)),
+)
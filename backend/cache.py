@@ -0,0 +1,232 @@
+"""
+Bộ nhớ đệm (cache) cho kết quả của các endpoint đọc nhiều.
+
+Mỗi mục được lưu kèm danh sách tag (vd: "post:12", "posts:list"); các endpoint ghi gọi
+cache.invalidate(tag) để xóa đúng những mục bị ảnh hưởng thay vì xóa toàn bộ.
+Giá trị lưu là dữ liệu đã mã hóa JSON (model pydantic của schemas.py, hoặc qua jsonable_encoder)
+nên không giữ tham chiếu tới đối tượng ORM.
+
+Cấu hình qua biến môi trường:
+    CACHE_BACKEND    memory (mặc định) | redis | off
+    CACHE_TTL        thời gian sống mặc định, giây (mặc định 60)
+    CACHE_MAX_BYTES  giới hạn dung lượng của backend memory (mặc định 32 MB)
+    CACHE_REDIS_URL  địa chỉ Redis cho backend redis (mặc định redis://localhost:6379/0)
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+
+def _encode(value):
+    # Model pydantic (schemas.py) được dump trực tiếp; như response_model_exclude_unset, các
+    # trường không được chọn bằng fields= bị bỏ qua
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_unset=True)
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    return jsonable_encoder(value)
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class MemoryBackend:
+    """LRU trong tiến trình, giới hạn theo tổng dung lượng JSON của các mục."""
+
+    def __init__(self, max_bytes, stats):
+        self.max_bytes = max_bytes
+        self.stats = stats
+        self.entries = OrderedDict()  # key -> (expires_at, size, payload, tags)
+        self.tags = {}  # tag -> set(key)
+        self.size = 0
+
+    async def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return json.loads(entry[2])
+
+    async def set(self, key, value, tags, ttl):
+        payload = json.dumps(value, separators=(",", ":"))
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        while self.entries and self.size + size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.stats.evictions += 1
+        self.entries[key] = (time.monotonic() + ttl, size, payload, tags)
+        self.size += size
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+
+    async def invalidate(self, tag):
+        keys = self.tags.pop(tag, set())
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    async def clear(self):
+        self.entries.clear()
+        self.tags.clear()
+        self.size = 0
+
+    def info(self):
+        return {"backend": "memory", "entries": len(self.entries), "bytes": self.size, "max_bytes": self.max_bytes}
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry[1]
+        for tag in entry[3]:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+
+class RedisBackend:
+    """Backend dùng Redis (hoặc máy chủ tương thích) để nhiều worker dùng chung cache."""
+
+    prefix = "nhatro:cache:"
+
+    def __init__(self, url):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis cần cài gói 'redis' (pip install redis)")
+        self.client = redis.from_url(url)
+        self.url = url
+
+    async def get(self, key):
+        payload = await self.client.get(self.prefix + key)
+        return json.loads(payload) if payload is not None else None
+
+    async def set(self, key, value, tags, ttl):
+        payload = json.dumps(value, separators=(",", ":"))
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self.prefix + key, payload, ex=ttl)
+            for tag in tags:
+                pipe.sadd(self.prefix + "tag:" + tag, key)
+            await pipe.execute()
+
+    async def invalidate(self, tag):
+        tag_key = self.prefix + "tag:" + tag
+        keys = await self.client.smembers(tag_key)
+        if keys:
+            await self.client.delete(*[self.prefix + key.decode() for key in keys])
+        await self.client.delete(tag_key)
+        return len(keys)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+    def info(self):
+        return {"backend": "redis", "url": self.url}
+
+
+class NullBackend:
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, tags, ttl):
+        pass
+
+    async def invalidate(self, tag):
+        return 0
+
+    async def clear(self):
+        pass
+
+    def info(self):
+        return {"backend": "off"}
+
+
+class ResponseCache:
+    def __init__(self, backend, stats, default_ttl):
+        self.backend = backend
+        self.stats = stats
+        self.default_ttl = default_ttl
+
+    @staticmethod
+    def key(endpoint, **params):
+        parts = [f"{name}={params[name]}" for name in sorted(params) if params[name] is not None]
+        return endpoint + "?" + "&".join(parts)
+
+    async def get(self, key):
+        value = await self.backend.get(key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key, value, tags, ttl=None):
+        """Lưu value (phản hồi của endpoint) và trả về bản đã mã hóa JSON của nó."""
+        value = _encode(value)
+        await self.backend.set(key, value, list(tags), ttl or self.default_ttl)
+        return value
+
+    async def invalidate(self, *tags):
+        for tag in tags:
+            self.stats.invalidations += await self.backend.invalidate(tag)
+
+    async def clear(self):
+        await self.backend.clear()
+
+    def info(self):
+        return {**self.backend.info(), **self.stats.as_dict()}
+
+
+def post_tag(post_id, part=None):
+    """Tag của bài đăng (part=None) hoặc của một phần dữ liệu con: images, comments, convenience."""
+    return f"post:{post_id}:{part}" if part else f"post:{post_id}"
+
+
+def all_post_tags(post_id):
+    return [post_tag(post_id), *[post_tag(post_id, part) for part in ("images", "comments", "convenience")]]
+
+
+POSTS_LIST_TAG = "posts:list"
+
+
+def _create_cache():
+    stats = CacheStats()
+    kind = os.environ.get("CACHE_BACKEND", "memory").lower()
+    if kind == "redis":
+        backend = RedisBackend(os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    elif kind == "off":
+        backend = NullBackend()
+    else:
+        backend = MemoryBackend(int(os.environ.get("CACHE_MAX_BYTES", 32 * 1024 * 1024)), stats)
+    return ResponseCache(backend, stats, int(os.environ.get("CACHE_TTL", 60)))
+
+
+cache = _create_cache()
@@ -1,10 +1,80 @@
+from sqlalchemy import event, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.types import TypeDecorator
+from datetime import datetime, timezone
 
-DATABASE_URL = "sqlite+aiosqlite:///app.db"
+import config
 
-engine = create_async_engine(DATABASE_URL, connect_args={
-                             "check_same_thread": False})
+DATABASE_URL = config.DATABASE_URL
+
+
+def _sqlite_pragmas(readonly):
+    pragmas = [
+        f"PRAGMA busy_timeout = {config.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}",
+        # Số âm: kích thước tính bằng KB thay vì số trang
+        f"PRAGMA cache_size = -{config.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size = {config.SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store = MEMORY",
+        # SQLite mặc định không kiểm tra khóa ngoại; các endpoint ghi dựa vào lỗi khóa ngoại
+        # thay vì SELECT trước để biết bài đăng / người dùng có tồn tại không
+        "PRAGMA foreign_keys = ON",
+    ]
+    if readonly:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # journal_mode được lưu trong file database, chỉ cần đặt từ kết nối ghi
+        pragmas.insert(0, f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+
+def create_engine(url=DATABASE_URL, readonly=False, pool_size=1):
+    """
+    Tạo async engine. Với SQLite, mỗi kết nối mới được thiết lập bằng các PRAGMA trong config;
+    engine readonly từ chối mọi câu lệnh ghi (query_only). Với các cơ sở dữ liệu khác, kích thước
+    pool lấy từ config (DB_POOL_SIZE, DB_MAX_OVERFLOW).
+    """
+    if not url.startswith("sqlite"):
+        return create_async_engine(
+            url,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    engine = create_async_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    pragmas = _sqlite_pragmas(readonly)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+engine = create_engine(DATABASE_URL, pool_size=1)
+DIALECT = engine.dialect.name
+
+if DIALECT == "sqlite":
+    # SQLite chỉ cho phép một người ghi tại một thời điểm: dùng đúng một kết nối ghi để các
+    # transaction ghi xếp hàng trong pool thay vì tranh khóa file và báo "database is locked".
+    # Các endpoint GET dùng pool kết nối chỉ đọc riêng; với WAL chúng không phải chờ người ghi.
+    read_engine = create_engine(DATABASE_URL, readonly=True, pool_size=config.DB_READ_POOL_SIZE)
+else:
+    read_engine = engine
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -13,12 +83,70 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False
 )
 
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False
+)
+
 Base = declarative_base()
 
 
+def utcnow():
+    # Giờ UTC có micro giây, dùng làm giá trị mặc định của các cột thời điểm (func.now() của SQLite
+    # chỉ chính xác tới giây và ghi chuỗi khác dạng, xem migration 0002)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    Thời điểm theo UTC: TIMESTAMPTZ trên PostgreSQL, chuỗi không có múi giờ trên SQLite như
+    dữ liệu cũ. Phía Python luôn là datetime UTC không có tzinfo, giống utcnow().
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return datetime
+
+    def process_bind_param(self, value, dialect):
+        if not isinstance(value, datetime):
+            return value
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        value = value.astimezone(timezone.utc)
+        return value.replace(tzinfo=None) if dialect.name == "sqlite" else value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+def is_foreign_key_error(error):
+    """IntegrityError do tham chiếu tới bản ghi không tồn tại (sqlite3 hoặc asyncpg)."""
+    return "foreign key" in str(error.orig).lower()
+
+
+def insert(table):
+    """INSERT hỗ trợ on_conflict_do_update / on_conflict_do_nothing của cơ sở dữ liệu đang dùng."""
+    return (postgresql if DIALECT == "postgresql" else sqlite).insert(table)
+
+
 async def get_db():
     async with AsyncSessionLocal() as db:
         try:
             yield db
         finally:
             await db.close()
+
+
+async def get_read_db():
+    """Session chỉ đọc cho các endpoint GET."""
+    async with ReadSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            await db.close()
@@ -0,0 +1,75 @@
+"""
+Các dòng trùng khóa chặn việc tạo ràng buộc duy nhất của migration 0009: nhiều bình luận của
+cùng một người dùng cho một bài đăng, nhiều dòng tiện ích cho một bài đăng.
+
+Migration không tự xóa chúng. migrate.py verify báo số dòng trùng, migrate.py dedupe giữ lại một
+dòng cho mỗi khóa (theo KEEP) và chuyển các dòng còn lại sang bảng lưu trữ <bảng>Archive (cùng
+các cột, thêm archived_at) trước khi xóa, nên vẫn đọc lại hoặc khôi phục được. Điểm đánh giá
+của bài đăng được tính lại bởi backfill của 0009, chạy sau khi tạo ràng buộc.
+"""
+from sqlalchemy import Column, MetaData, Table, bindparam, inspect, text
+
+from database import UTCDateTime, utcnow
+
+# Bảng -> (các cột của khóa duy nhất, thứ tự ưu tiên dòng được giữ lại)
+KEEP = {
+    # Ưu tiên bình luận đã được duyệt, sau đó là bình luận mới nhất
+    "PostComments": (["post_id", "user_id"], "CASE WHEN status = 'approved' THEN 0 ELSE 1 END, id DESC"),
+    "Convinience": (["post_id"], "id DESC"),
+}
+
+
+def _losers(table):
+    """SELECT id của các dòng trùng không được giữ lại."""
+    columns, order = KEEP[table]
+    # Index UNIQUE coi các giá trị NULL là khác nhau nên chỉ xét các dòng có đủ khóa
+    present = " AND ".join(f"{column} IS NOT NULL" for column in columns)
+    return (
+        f"SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY {', '.join(columns)} ORDER BY {order}) "
+        f'AS position FROM "{table}" WHERE {present}) AS ranked WHERE position > 1'
+    )
+
+
+def count_duplicates(connection):
+    """Bảng -> số dòng trùng sẽ bị chuyển đi, chỉ gồm các bảng còn dòng trùng."""
+    inspector = inspect(connection)
+    counts = {}
+    for table in KEEP:
+        if not inspector.has_table(table):
+            continue
+        count = connection.execute(text(f"SELECT COUNT(*) FROM ({_losers(table)}) AS losers")).scalar()
+        if count:
+            counts[table] = count
+    return counts
+
+
+def _archive_table(connection, table):
+    source = Table(table, MetaData(), autoload_with=connection)
+    archive = Table(
+        f"{table}Archive", MetaData(),
+        *[Column(column.name, column.type) for column in source.columns],
+        Column("archived_at", UTCDateTime),
+    )
+    archive.create(connection, checkfirst=True)
+    # Bảng lưu trữ có thể được tạo từ lần chạy trước, khi bảng gốc còn ít cột hơn
+    archived = {column["name"] for column in inspect(connection).get_columns(archive.name)}
+    return archive.name, [column.name for column in source.columns if column.name in archived]
+
+
+def archive_duplicates(connection):
+    """Chuyển các dòng trùng sang <bảng>Archive rồi xóa chúng. Trả về bảng -> số dòng đã chuyển."""
+    moved = {}
+    for table, count in count_duplicates(connection).items():
+        archive, columns = _archive_table(connection, table)
+        names = ", ".join(f'"{column}"' for column in columns)
+        losers = _losers(table)
+        connection.execute(
+            text(
+                f'INSERT INTO "{archive}" ({names}, archived_at) '
+                f'SELECT {names}, :now FROM "{table}" WHERE id IN ({losers})'
+            ).bindparams(bindparam("now", type_=UTCDateTime)),
+            {"now": utcnow()},
+        )
+        connection.execute(text(f'DELETE FROM "{table}" WHERE id IN ({losers})'))
+        moved[table] = count
+    return moved
@@ -0,0 +1,246 @@
+"""
+Số bài đăng theo từng bộ lọc của trang tìm kiếm (faceted counts).
+
+Bảng PostFacets là một cube tổng hợp: mỗi dòng là một tổ hợp (tỉnh / thành phố, quận / huyện,
+loại phòng, số phòng, khoảng giá, amenity_mask) cùng số bài đăng đang hiển thị (đã duyệt, không
+bị báo cáo) có tổ hợp đó. Trigger trên Posts cộng / trừ post_count mỗi khi bài đăng được thêm,
+xóa (kể cả theo ON DELETE CASCADE khi xóa người dùng), duyệt, từ chối, báo cáo hoặc đổi giá,
+địa chỉ, tiện ích, nên các endpoint không phải tự cập nhật bảng này. Số dòng của cube là số tổ
+hợp thực sự có, ít hơn nhiều so với số bài đăng, nên đếm trên cube thay vì quét Posts.
+
+Số đếm của mỗi chiều tính theo bộ lọc của các chiều còn lại: đang chọn Quận 1 vẫn thấy số bài
+đăng của các quận khác để đổi quận. Riêng tiện ích là điều kiện AND nên số đếm tính cả các
+tiện ích đã chọn, như amenity_counts trước đây.
+
+Giá được lưu theo khoảng: mỗi mốc trong PRICE_EDGES có một khoảng riêng chỉ gồm đúng giá đó,
+nên bộ lọc min_price <= price <= max_price có hai đầu rơi vào mốc vẫn đếm chính xác trên cube.
+Khi có bộ lọc cube không có (rural, diện tích, các khoản phí, từ khóa, vị trí, giá lệch mốc)
+thì đếm trực tiếp trên các bài đăng thỏa điều kiện, với cùng các truy vấn.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, case, cast, func, literal_column, select, text, union_all
+
+from amenities import AMENITY_BITS
+from filters import filter_conditions, visible
+from models.posts import Posts
+
+FACETS_TABLE = "PostFacets"
+FACETS = ("province", "district", "type", "room_num", "price", "amenities")
+# Các bộ lọc (xem filters.py) cube trả lời được; bộ lọc khác thì đếm trên Posts
+CUBE_FILTERS = ("province", "district", "type", "room_num", "price", "amenities")
+
+# Mốc giá (VND) của cube: mỗi 500.000đ tới 10 triệu, sau đó thưa dần
+PRICE_EDGES = [500_000 * i for i in range(1, 21)] + [15_000_000, 20_000_000, 30_000_000]
+# Các khoảng giá (lấy cả hai đầu) trả về trong facets, như các lựa chọn giá ở trang chủ
+PRICE_RANGES = [
+    (0, 1_000_000), (1_000_000, 2_000_000), (2_000_000, 3_000_000),
+    (3_000_000, 5_000_000), (5_000_000, 10_000_000), (10_000_000, None),
+]
+NO_PRICE = -1
+ABOVE_EDGES = 2 * len(PRICE_EDGES)
+
+# Không thuộc Base.metadata: bảng dẫn xuất từ Posts, như PostsSearch và PostsLocation.
+# Giá trị NULL được lưu thành '' / -1 để khóa chính (và ON CONFLICT) dùng được.
+post_facets = Table(
+    FACETS_TABLE, MetaData(),
+    Column("province", String, primary_key=True),
+    Column("district", String, primary_key=True),
+    Column("type", String, primary_key=True),
+    Column("room_num", Integer, primary_key=True, autoincrement=False),
+    Column("price_bucket", Integer, primary_key=True, autoincrement=False),
+    Column("amenity_mask", Integer, primary_key=True, autoincrement=False),
+    Column("post_count", Integer, nullable=False),
+)
+DIMENSIONS = ["province", "district", "type", "room_num", "price_bucket", "amenity_mask"]
+
+
+def _price_cases():
+    """(phép so sánh, mốc, mã khoảng): dưới mốc i -> 2i, đúng mốc i -> 2i + 1, trên mốc cuối -> 2n."""
+    cases = []
+    for i, edge in enumerate(PRICE_EDGES):
+        cases += [("<", edge, 2 * i), ("=", edge, 2 * i + 1)]
+    return cases
+
+
+def price_bucket(price):
+    """Mã khoảng giá của cột price (biểu thức SQLAlchemy)."""
+    whens = [(price < edge if op == "<" else price == edge, code) for op, edge, code in _price_cases()]
+    return case((price.is_(None), NO_PRICE), *whens, else_=ABOVE_EDGES)
+
+
+def _price_bucket_sql(price):
+    whens = " ".join(f"WHEN {price} {op} {edge} THEN {code}" for op, edge, code in _price_cases())
+    return f"CASE WHEN {price} IS NULL THEN {NO_PRICE} {whens} ELSE {ABOVE_EDGES} END"
+
+
+def _edge_code(edge):
+    return 2 * PRICE_EDGES.index(edge) + 1
+
+
+def _bucket_bounds(min_price, max_price):
+    """
+    (mã nhỏ nhất, mã lớn nhất) tương đương min_price <= price <= max_price, hoặc None nếu có
+    đầu không nằm trên mốc nào (khi đó cube không đếm chính xác được).
+    """
+    low, high = 0, ABOVE_EDGES
+    if min_price is not None and min_price > 0:
+        if min_price not in PRICE_EDGES:
+            return None
+        low = _edge_code(min_price)
+    if max_price is not None:
+        if max_price not in PRICE_EDGES:
+            return None
+        high = _edge_code(max_price)
+    return low, high
+
+
+def _source(conditions, bounds):
+    """Cube, hoặc các bài đăng hiển thị thỏa conditions ở cùng dạng cột với cube."""
+    if not conditions and bounds is not None:
+        return post_facets
+    return select(
+        Posts.province, Posts.district, Posts.type, Posts.room_num,
+        price_bucket(Posts.price).label("price_bucket"), Posts.amenity_mask, Posts.price,
+        literal_column("1").label("post_count"),
+    ).where(*visible()).where(*conditions).subquery()
+
+
+def _price_ranges(buckets):
+    """Số bài đăng trong mỗi khoảng của PRICE_RANGES từ số bài đăng theo mã khoảng giá."""
+    ranges = {}
+    for low, high in PRICE_RANGES:
+        first, last = _bucket_bounds(low, high)
+        key = f"{low}-{high}" if high is not None else f"{low}-"
+        ranges[key] = sum(count for code, count in buckets.items() if first <= code <= last)
+    return ranges
+
+
+async def facet_counts(db, filters, conditions=(), dimensions=FACETS):
+    """
+    Số bài đăng theo từng chiều trong dimensions với các bộ lọc filters (SearchFilters).
+    conditions là các điều kiện khác trên Posts (từ khóa, vị trí) mà kết quả phải thỏa.
+    """
+    bounds = _bucket_bounds(*filters.ranges.get("price", (None, None)))
+    other = [
+        condition for name, group in filter_conditions(filters).items() if name not in CUBE_FILTERS
+        for condition in group
+    ]
+    source = _source([*conditions, *other], bounds)
+    groups = {name: group for name, group in filter_conditions(filters, source.c).items() if name in CUBE_FILTERS}
+    if source is post_facets and "price" in filters.ranges:
+        # Cube không có cột price: lọc theo mã khoảng giá
+        groups["price"] = [source.c.price_bucket.between(*bounds)]
+
+    def other_filters(dimension):
+        return [condition for name, group in groups.items() if name != dimension for condition in group]
+
+    total = func.sum(source.c.post_count)
+    columns = {"price": "price_bucket"}
+    grouped = [
+        select(
+            literal_column(f"'{name}'").label("facet"),
+            cast(source.c[columns.get(name, name)], String).label("value"),
+            total.label("posts"),
+        ).where(*other_filters(name)).group_by(source.c[columns.get(name, name)])
+        for name in ("province", "district", "type", "room_num", "price") if name in dimensions
+    ]
+    counts = {name: {} for name in dimensions}
+    if grouped:
+        result = await db.execute(union_all(*grouped))
+        for facet, value, posts in result.all():
+            # Bỏ các bài đăng thiếu giá trị ('' / -1 trong cube)
+            if value is not None and value not in ("", str(NO_PRICE)):
+                counts[facet][value] = posts
+    for name in ("province", "district", "type", "room_num"):
+        if name in counts:
+            counts[name] = dict(sorted(counts[name].items(), key=lambda item: -item[1]))
+    if "price" in counts:
+        counts["price"] = _price_ranges({int(code): posts for code, posts in counts["price"].items()})
+
+    if "amenities" in dimensions:
+        # Tiện ích là điều kiện AND nên tính cả các tiện ích đang chọn
+        result = await db.execute(select(*[
+            func.coalesce(func.sum(case((source.c.amenity_mask.op("&")(bit) != 0, source.c.post_count), else_=0)), 0)
+            .label(name)
+            for name, bit in AMENITY_BITS.items()
+        ]).where(*other_filters(None)))
+        counts["amenities"] = dict(result.one()._mapping)
+    return counts
+
+
+# ----- Bảng PostFacets và trigger -----
+def _values(row):
+    """Giá trị các chiều của cube cho dòng Posts row (NEW / OLD, hoặc bí danh của bảng)."""
+    return [
+        f"COALESCE({row}.province, '')", f"COALESCE({row}.district, '')", f"COALESCE({row}.type, '')",
+        f"COALESCE({row}.room_num, -1)", _price_bucket_sql(f"{row}.price"), f"COALESCE({row}.amenity_mask, 0)",
+    ]
+
+
+def _visible(row):
+    return f"{row}.status = 'approved' AND NOT {row}.is_report"
+
+
+def _add_sql(row):
+    dimensions = ", ".join(DIMENSIONS)
+    return (
+        f'INSERT INTO "{FACETS_TABLE}" ({dimensions}, post_count) '
+        f"SELECT {', '.join(_values(row))}, 1 WHERE {_visible(row)} "
+        f'ON CONFLICT ({dimensions}) DO UPDATE SET post_count = "{FACETS_TABLE}".post_count + 1;'
+    )
+
+
+def _remove_sql(row):
+    match = " AND ".join(f"{name} = {value}" for name, value in zip(DIMENSIONS, _values(row)))
+    return (
+        f'UPDATE "{FACETS_TABLE}" SET post_count = post_count - 1 WHERE {_visible(row)} AND {match}; '
+        f'DELETE FROM "{FACETS_TABLE}" WHERE post_count <= 0 AND {match};'
+    )
+
+
+# Các cột của Posts mà cube phụ thuộc
+_WATCHED = "status, is_report, province, district, type, room_num, price, amenity_mask"
+
+
+def rebuild_facets(connection):
+    """Tính lại toàn bộ cube từ Posts."""
+    connection.execute(text(f'DELETE FROM "{FACETS_TABLE}"'))
+    connection.execute(text(
+        f'INSERT INTO "{FACETS_TABLE}" ({", ".join(DIMENSIONS)}, post_count) '
+        f"SELECT {', '.join(_values('p'))}, COUNT(*) FROM \"Posts\" p WHERE {_visible('p')} "
+        "GROUP BY 1, 2, 3, 4, 5, 6"
+    ))
+
+
+def create_facets(connection):
+    """Tạo và nạp cube, rồi tạo trigger giữ nó đồng bộ với Posts."""
+    post_facets.create(connection, checkfirst=True)
+    rebuild_facets(connection)
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f'CREATE OR REPLACE FUNCTION "{FACETS_TABLE}_sync"() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN '
+            f"IF TG_OP <> 'INSERT' THEN {_remove_sql('OLD')} END IF; "
+            f"IF TG_OP <> 'DELETE' THEN {_add_sql('NEW')} END IF; "
+            "RETURN NULL; END $$"
+        ))
+        connection.execute(text(f'DROP TRIGGER IF EXISTS "{FACETS_TABLE}_sync" ON "Posts"'))
+        connection.execute(text(
+            f'CREATE TRIGGER "{FACETS_TABLE}_sync" AFTER INSERT OR DELETE OR UPDATE OF {_WATCHED} '
+            f'ON "Posts" FOR EACH ROW EXECUTE FUNCTION "{FACETS_TABLE}_sync"()'
+        ))
+        return
+    for name, event, body in [
+        ("insert", 'AFTER INSERT ON "Posts"', _add_sql("NEW")),
+        ("update", f'AFTER UPDATE OF {_WATCHED} ON "Posts"', _remove_sql("OLD") + " " + _add_sql("NEW")),
+        ("delete", 'AFTER DELETE ON "Posts"', _remove_sql("OLD")),
+    ]:
+        connection.execute(text(f'CREATE TRIGGER IF NOT EXISTS "{FACETS_TABLE}_{name}" {event} BEGIN {body} END'))
+
+
+def drop_facets(connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(f'DROP TRIGGER IF EXISTS "{FACETS_TABLE}_sync" ON "Posts"'))
+        connection.execute(text(f'DROP FUNCTION IF EXISTS "{FACETS_TABLE}_sync"()'))
+    else:
+        for name in ("insert", "update", "delete"):
+            connection.execute(text(f'DROP TRIGGER IF EXISTS "{FACETS_TABLE}_{name}"'))
+    connection.execute(text(f'DROP TABLE IF EXISTS "{FACETS_TABLE}"'))
@@ -0,0 +1,156 @@
+"""
+Bộ lọc và thứ tự sắp xếp dùng chung của các endpoint tìm kiếm bài đăng.
+
+Mỗi bộ lọc được khai báo một lần trong EQUAL_FILTERS / RANGE_FILTERS (theo tên cột của Posts);
+search_filters đọc chúng từ tham số query, filter_conditions biến chúng thành điều kiện
+so sánh trực tiếp trên cột (không bọc trong hàm nào) để SQLite dùng được các index
+(status, is_report, ...) của Posts; apply_filters chỉ để bộ lọc khoảng trên khóa sắp xếp
+dùng index, các bộ lọc khoảng khác được kiểm tra khi đọc theo thứ tự. Bộ lọc khoảng nhận
+min_<tên> / max_<tên>, lấy cả hai đầu. Tiện ích lọc bằng một điều kiện trên amenity_mask (xem amenities.py).
+
+SORTS là các thứ tự sắp xếp, mỗi thứ tự kết thúc bằng Posts.id để làm khóa phân trang theo
+con trỏ (xem pagination.py).
+"""
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Query
+from pydantic import BaseModel
+from amenities import has_amenities, mask_for, unknown_amenities
+from models.posts import Posts
+
+# Tên bộ lọc là tên cột của Posts
+EQUAL_FILTERS = ("province", "district", "rural", "type")
+RANGE_FILTERS = ("price", "area", "room_num", "electricity_fee", "water_fee", "internet_fee", "vehicle_fee")
+
+# tên -> (khóa sắp xếp, giảm dần)
+SORTS = {
+    "newest": ([Posts.post_date, Posts.id], True),
+    "oldest": ([Posts.post_date, Posts.id], False),
+    "price_asc": ([Posts.price, Posts.id], False),
+    "price_desc": ([Posts.price, Posts.id], True),
+    "area_asc": ([Posts.area, Posts.id], False),
+    "area_desc": ([Posts.area, Posts.id], True),
+    # Bài chưa có đánh giá có avg_rating = 0 nên xếp sau cùng
+    "rating": ([Posts.avg_rating, Posts.rating_count, Posts.id], True),
+}
+DEFAULT_SORT = "newest"
+
+
+class SearchFilters(BaseModel):
+    province: Optional[str] = None
+    district: Optional[str] = None
+    rural: Optional[str] = None
+    type: Optional[str] = None
+    room_num: Optional[int] = None  # đúng số phòng
+    ranges: Dict[str, Tuple[Optional[int], Optional[int]]] = {}  # tên trong RANGE_FILTERS -> (min, max)
+    amenities: List[str] = []
+
+
+def search_filters(
+    province: Optional[str] = None,
+    district: Optional[str] = None,
+    rural: Optional[str] = None,
+    type: Optional[str] = None,
+    room_num: Optional[int] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_area: Optional[int] = None,
+    max_area: Optional[int] = None,
+    min_room_num: Optional[int] = None,
+    max_room_num: Optional[int] = None,
+    min_electricity_fee: Optional[int] = None,
+    max_electricity_fee: Optional[int] = None,
+    min_water_fee: Optional[int] = None,
+    max_water_fee: Optional[int] = None,
+    min_internet_fee: Optional[int] = None,
+    max_internet_fee: Optional[int] = None,
+    min_vehicle_fee: Optional[int] = None,
+    max_vehicle_fee: Optional[int] = None,
+    amenities: Optional[List[str]] = Query(None),
+):
+    """
+    Tham số lọc của các endpoint tìm kiếm (dùng với Depends).
+    amenities là danh sách tiện ích bắt buộc phải có (vd: amenities=wifi&amenities=fridge).
+    """
+    values = locals()
+    ranges = {
+        name: (values[f"min_{name}"], values[f"max_{name}"])
+        for name in RANGE_FILTERS
+        if values[f"min_{name}"] is not None or values[f"max_{name}"] is not None
+    }
+    return SearchFilters(
+        province=province, district=district, rural=rural, type=type, room_num=room_num,
+        ranges=ranges, amenities=amenities or [],
+    )
+
+
+def invalid_filters(filters):
+    unknown = unknown_amenities(filters.amenities)
+    if unknown:
+        return f"Unknown amenities: {', '.join(unknown)}"
+    for name, (low, high) in filters.ranges.items():
+        if low is not None and high is not None and low > high:
+            return f"min_{name} must not be greater than max_{name}"
+    return None
+
+
+def invalid_sort(sort):
+    if sort is not None and sort not in SORTS:
+        return f"Unknown sort: {sort}. Use one of: {', '.join(SORTS)}"
+    return None
+
+
+def filter_conditions(filters, columns=None):
+    """
+    Điều kiện của các bộ lọc đang dùng: tên bộ lọc -> danh sách điều kiện.
+    columns thay cột của Posts bằng cột cùng tên của một nguồn khác (vd cube của facets.py);
+    bộ lọc không có cột trong columns thì bị bỏ qua.
+    """
+    if columns is None:
+        columns = Posts.__table__.c
+
+    conditions = {}
+    for name in EQUAL_FILTERS:
+        value = getattr(filters, name)
+        if value and name in columns:
+            conditions[name] = [columns[name] == value]
+    if filters.room_num is not None and "room_num" in columns:
+        conditions["room_num"] = [columns["room_num"] == filters.room_num]
+    for name, (low, high) in filters.ranges.items():
+        if name not in columns:
+            continue
+        group = conditions.setdefault(name, [])
+        if low is not None:
+            group.append(columns[name] >= low)
+        if high is not None:
+            group.append(columns[name] <= high)
+    if filters.amenities and "amenity_mask" in columns:
+        conditions["amenities"] = [has_amenities(columns["amenity_mask"], mask_for(filters.amenities))]
+    return conditions
+
+
+def visible():
+    """Bài đăng hiển thị công khai: đã duyệt và không bị báo cáo."""
+    return [Posts.status == 'approved', Posts.is_report == False]
+
+
+def apply_filters(query, filters, sort=None):
+    """
+    Chỉ giữ các bài đăng hiển thị thỏa mọi bộ lọc, cho truy vấn đọc theo thứ tự sort.
+
+    Bộ lọc khoảng trên cột không phải khóa sắp xếp so sánh trên cột + 0, nên SQLite không chọn
+    index của cột đó (lấy mọi dòng trong khoảng rồi sắp xếp bằng B-tree tạm) mà đọc theo index
+    của khóa sắp xếp, bỏ qua các dòng ngoài khoảng và dừng ngay khi đủ LIMIT.
+    """
+    key = sort_order(sort)[0][0].key
+    columns = dict(Posts.__table__.c.items())
+    for name in RANGE_FILTERS:
+        if name != key:
+            columns[name] = columns[name] + 0
+    conditions = filter_conditions(filters, columns)
+    return query.where(*visible()).where(*[condition for group in conditions.values() for condition in group])
+
+
+def sort_order(sort):
+    """(khóa sắp xếp, giảm dần) của thứ tự sort, mặc định là bài mới nhất."""
+    return SORTS[sort or DEFAULT_SORT]
@@ -0,0 +1,194 @@
+"""
+Tìm kiếm toàn văn bài đăng: SQLite FTS5, hoặc tsvector + GIN index trên PostgreSQL.
+
+Bảng PostsSearch lưu title, description, street, detailed_address của mỗi bài đăng
+ở dạng đã chuẩn hóa: chữ thường, bỏ dấu và đổi 'đ' thành 'd' (tokenizer unicode61 của
+SQLite không tự bỏ nét gạch của chữ 'đ'), chỉ giữ các từ, cách nhau bằng dấu cách (parser
+của PostgreSQL coi "tin.phong" là một từ, FTS5 tách thành "tin" và "phong"). Câu truy vấn
+được chuẩn hóa giống hệt nên "gan dai hoc" và "gần đại học" cho cùng kết quả.
+    SQLite:      bảng ảo FTS5, rowid = Posts.id, xếp hạng bằng bm25()
+    PostgreSQL:  bảng (post_id, document tsvector) với GIN index, xếp hạng bằng ts_rank()
+Việc chuẩn hóa làm ở Python nên không cần extension unaccent của PostgreSQL.
+"""
+import re
+import unicodedata
+
+from sqlalchemy import text, select, func, literal_column, table, column
+
+import database
+
+SEARCH_TABLE = "PostsSearch"
+SEARCH_COLUMNS = ("title", "description", "street", "detailed_address")
+
+posts_search = table(SEARCH_TABLE, column("rowid"), *[column(name) for name in SEARCH_COLUMNS])
+pg_posts_search = table(SEARCH_TABLE, column("post_id"), column("document"))
+
+# Chữ cái và chữ số; dấu gạch dưới là dấu phân cách như ở FTS5 và PostgreSQL
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def normalize(value):
+    if not value:
+        return ""
+    value = value.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", value)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _tokens(q):
+    return _TOKEN.findall(normalize(q))
+
+
+def words(value):
+    """Nội dung được lưu vào bảng tìm kiếm: các từ đã chuẩn hóa, cách nhau bằng dấu cách."""
+    return " ".join(_tokens(value))
+
+
+def match_expression(q):
+    """
+    Chuyển chuỗi người dùng nhập thành biểu thức MATCH của FTS5.
+    Mỗi từ được đặt trong ngoặc kép (tránh lỗi cú pháp FTS5) và cho phép khớp tiền tố,
+    các từ được nối bằng AND ngầm định. Trả về None nếu không có từ nào.
+    """
+    tokens = _tokens(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def tsquery_expression(q):
+    """Như match_expression nhưng theo cú pháp to_tsquery của PostgreSQL: gan:* & dai:* & hoc:*"""
+    tokens = _tokens(q)
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def ranked_matches(q):
+    """
+    Subquery (post_id, rank) các bài đăng khớp với q, rank càng nhỏ càng liên quan
+    (điểm BM25 của SQLite, -ts_rank của PostgreSQL). Trả về None nếu q không chứa từ nào.
+    """
+    if database.DIALECT == "postgresql":
+        expression = tsquery_expression(q)
+        if expression is None:
+            return None
+        query = func.to_tsquery("simple", expression)
+        return (
+            select(
+                pg_posts_search.c.post_id,
+                (-func.ts_rank(pg_posts_search.c.document, query)).label("rank"),
+            )
+            .where(pg_posts_search.c.document.op("@@")(query))
+            .subquery("matches")
+        )
+
+    expression = match_expression(q)
+    if expression is None:
+        return None
+    return (
+        select(
+            posts_search.c.rowid.label("post_id"),
+            func.bm25(literal_column(SEARCH_TABLE)).label("rank"),
+        )
+        .where(literal_column(SEARCH_TABLE).op("MATCH")(expression))
+        .subquery("matches")
+    )
+
+
+def _document(post):
+    return {name: words(getattr(post, name)) for name in SEARCH_COLUMNS}
+
+
+def _pg_document_sql():
+    # Các cột đã được tách từ và chuẩn hóa ở Python, nối lại thành một tài liệu
+    return "to_tsvector('simple', " + " || ' ' || ".join(f"CAST(:{name} AS TEXT)" for name in SEARCH_COLUMNS) + ")"
+
+
+def _insert_sql(dialect):
+    if dialect == "postgresql":
+        return (
+            f'INSERT INTO "{SEARCH_TABLE}" (post_id, document) VALUES (:id, {_pg_document_sql()}) '
+            "ON CONFLICT (post_id) DO UPDATE SET document = excluded.document"
+        )
+    return (
+        f'INSERT INTO "{SEARCH_TABLE}" (rowid, {", ".join(SEARCH_COLUMNS)}) '
+        f'VALUES (:id, {", ".join(":" + name for name in SEARCH_COLUMNS)})'
+    )
+
+
+def _key(dialect):
+    return "post_id" if dialect == "postgresql" else "rowid"
+
+
+async def index_post(db, post):
+    """Ghi (hoặc ghi đè) dòng tìm kiếm của bài đăng trong cùng transaction với db."""
+    dialect = database.DIALECT
+    if dialect != "postgresql":
+        await remove_post(db, post.id)
+    await db.execute(text(_insert_sql(dialect)), {"id": post.id, **_document(post)})
+
+
+async def remove_post(db, post_id):
+    await db.execute(
+        text(f'DELETE FROM "{SEARCH_TABLE}" WHERE {_key(database.DIALECT)} = :id'), {"id": post_id}
+    )
+
+
+async def remove_user_posts(db, user_id):
+    await db.execute(
+        text(
+            f'DELETE FROM "{SEARCH_TABLE}" WHERE {_key(database.DIALECT)} IN '
+            '(SELECT id FROM "Posts" WHERE user_id = :user_id)'
+        ),
+        {"user_id": user_id},
+    )
+
+
+def create_search_index(connection):
+    """Tạo bảng tìm kiếm nếu chưa có (dữ liệu được nạp bằng index_posts)."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{SEARCH_TABLE}" ('
+            'post_id INTEGER PRIMARY KEY REFERENCES "Posts" (id) ON DELETE CASCADE, '
+            "document TSVECTOR NOT NULL)"
+        ))
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS "ix_{SEARCH_TABLE}_document" ON "{SEARCH_TABLE}" USING GIN (document)'
+        ))
+    else:
+        connection.execute(text(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS "{SEARCH_TABLE}" USING fts5('
+            f"{', '.join(SEARCH_COLUMNS)}, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+
+
+def drop_search_index(connection):
+    connection.execute(text(f'DROP TABLE IF EXISTS "{SEARCH_TABLE}"'))
+
+
+def index_posts(connection, after=None, until=None):
+    """Ghi lại dòng tìm kiếm của mọi bài đăng hoặc các id trong (after, until]. Trả về số bài đăng."""
+    key = _key(connection.dialect.name)
+    if after is None:
+        connection.execute(text(f'DELETE FROM "{SEARCH_TABLE}"'))
+        where = ""
+    else:
+        connection.execute(
+            text(f'DELETE FROM "{SEARCH_TABLE}" WHERE {key} > :after AND {key} <= :until'),
+            {"after": after, "until": until},
+        )
+        where = " WHERE id > :after AND id <= :until"
+    rows = connection.execute(
+        text(f'SELECT id, {", ".join(SEARCH_COLUMNS)} FROM "Posts"' + where), {"after": after, "until": until}
+    ).all()
+    if rows:
+        connection.execute(
+            text(_insert_sql(connection.dialect.name)),
+            [
+                {"id": row[0], **{name: words(value) for name, value in zip(SEARCH_COLUMNS, row[1:])}}
+                for row in rows
+            ],
+        )
+    return len(rows)
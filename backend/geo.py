@@ -0,0 +1,191 @@
+"""
+Tọa độ bài đăng và tìm kiếm theo vị trí.
+
+Posts.latitude / longitude được điền khi tạo / sửa bài đăng: dùng tọa độ client gửi lên (vd
+chọn trên bản đồ), nếu không có thì lấy tâm quận / huyện trong data/districts.csv (geocode
+offline, độ chính xác cấp quận; quận không có trong danh sách thì lấy tâm tỉnh / thành phố).
+Tên được so khớp sau khi bỏ dấu và các tiền tố "Quận", "TP."... nên cả "Quận 11" lẫn mã "q11"
+của frontend đều khớp.
+
+Index không gian:
+    SQLite:      bảng ảo R*Tree PostsLocation (id = Posts.id), đồng bộ bằng trigger trên Posts
+    PostgreSQL:  GiST index trên biểu thức point(longitude, latitude)
+Truy vấn theo bán kính lọc trước bằng hình chữ nhật bao quanh vòng tròn (dùng index), sau đó
+lọc và sắp xếp theo khoảng cách. Khoảng cách tính theo phép chiếu equirectangular: sai số không
+đáng kể trong phạm vi vài chục km và chỉ cần phép tính số học, chạy được trên mọi bản SQLite.
+
+Cấu hình qua biến môi trường:
+    GEO_MAX_RADIUS_KM  bán kính tìm kiếm lớn nhất, km (mặc định 50)
+"""
+import csv
+import math
+import os
+import re
+from functools import lru_cache
+
+from sqlalchemy import and_, func, select, table, column, text
+
+import database
+from fulltext import normalize
+from models.posts import Posts
+
+MAX_RADIUS_KM = float(os.environ.get("GEO_MAX_RADIUS_KM", 50))
+KM_PER_DEGREE = 111.32
+
+LOCATION_TABLE = "PostsLocation"
+DATASET = os.path.join(os.path.dirname(__file__), "data", "districts.csv")
+
+posts_location = table(
+    LOCATION_TABLE, column("id"), column("min_lat"), column("max_lat"), column("min_lng"), column("max_lng")
+)
+
+_PREFIXES = ("thanh pho ", "tp. ", "tp.", "tp ", "tinh ", "quan ", "huyen ", "thi xa ", "thi tran ")
+# Mã tỉnh / thành phố dùng ở frontend (lib/locations.ts)
+_PROVINCE_ALIASES = {"hcm": "ho chi minh", "tphcm": "ho chi minh", "sai gon": "ho chi minh", "hn": "ha noi"}
+
+
+def _key(value):
+    value = normalize(value).replace("_", " ").strip()
+    for prefix in _PREFIXES:
+        if value.startswith(prefix):
+            value = value[len(prefix):].strip()
+            break
+    # q11 -> 11, như "Quận 11" sau khi bỏ tiền tố
+    return re.sub(r"^q(\d+)$", r"\1", value)
+
+
+def _province_key(value):
+    key = _key(value)
+    return _PROVINCE_ALIASES.get(key, key)
+
+
+@lru_cache(maxsize=1)
+def _dataset():
+    """(tỉnh, quận) -> (lat, lng); quận rỗng là tâm của tỉnh / thành phố."""
+    with open(DATASET, encoding="utf-8") as f:
+        return {
+            (_province_key(row["province"]), _key(row["district"])): (float(row["latitude"]), float(row["longitude"]))
+            for row in csv.DictReader(f)
+        }
+
+
+def geocode(province, district):
+    """Tọa độ (lat, lng) của quận / huyện, hoặc (None, None) nếu không biết địa danh."""
+    places = _dataset()
+    province = _province_key(province)
+    return places.get((province, _key(district))) or places.get((province, "")) or (None, None)
+
+
+def invalid_point(lat, lng):
+    if lat is None and lng is None:
+        return None
+    if lat is None or lng is None:
+        return "lat and lng must be given together"
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return "Coordinates out of range"
+    return None
+
+
+def invalid_box(south, west, north, east):
+    values = [south, west, north, east]
+    if all(value is None for value in values):
+        return None
+    if any(value is None for value in values):
+        return "south, west, north and east must be given together"
+    if south > north or west > east:
+        return "Invalid bounding box"
+    return invalid_point(south, west) or invalid_point(north, east)
+
+
+def box_around(lat, lng, radius_km):
+    """(south, west, north, east) của hình chữ nhật bao quanh vòng tròn bán kính radius_km."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+def in_box(south, west, north, east):
+    """Điều kiện tọa độ bài đăng nằm trong hình chữ nhật, dùng index không gian."""
+    latitude, longitude = Posts.latitude, Posts.longitude
+    if database.DIALECT == "postgresql":
+        return func.point(longitude, latitude).op("<@")(func.box(func.point(west, south), func.point(east, north)))
+    # R*Tree lưu số thực 32 bit, làm tròn ra phía ngoài: lọc theo R*Tree rồi so lại giá trị chính xác
+    candidates = select(posts_location.c.id).where(
+        posts_location.c.max_lat >= south, posts_location.c.min_lat <= north,
+        posts_location.c.max_lng >= west, posts_location.c.min_lng <= east,
+    )
+    return and_(
+        latitude.between(south, north), longitude.between(west, east),
+        Posts.id.in_(candidates),
+    )
+
+
+def squared_distance(lat, lng):
+    """Bình phương khoảng cách (km²) từ điểm (lat, lng) tới tọa độ của bài đăng."""
+    dy = (Posts.latitude - lat) * KM_PER_DEGREE
+    dx = (Posts.longitude - lng) * (KM_PER_DEGREE * math.cos(math.radians(lat)))
+    return dy * dy + dx * dx
+
+
+def near(lat, lng, radius_km):
+    """
+    (điều kiện, biểu thức khoảng cách) cho các bài đăng cách (lat, lng) không quá radius_km.
+    Biểu thức có nhãn distance_sq (km²), dùng để sắp xếp và làm khóa phân trang.
+    """
+    distance = squared_distance(lat, lng)
+    condition = and_(in_box(*box_around(lat, lng, radius_km)), distance <= radius_km ** 2)
+    return condition, distance.label("distance_sq")
+
+
+def distance_km(distance_sq):
+    return round(math.sqrt(distance_sq), 3)
+
+
+def create_location_index(connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            'CREATE INDEX IF NOT EXISTS "ix_Posts_location" ON "Posts" USING GIST (point(longitude, latitude))'
+        ))
+        return
+    connection.execute(text(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{LOCATION_TABLE}" USING rtree(id, min_lat, max_lat, min_lng, max_lng)'
+    ))
+    # Trigger giữ R*Tree đồng bộ với Posts, kể cả khi bài đăng bị xóa theo ON DELETE CASCADE
+    located = "NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL"
+    add = (
+        f'INSERT INTO "{LOCATION_TABLE}" SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude '
+        f"WHERE {located};"
+    )
+    remove = f'DELETE FROM "{LOCATION_TABLE}" WHERE id = OLD.id;'
+    for name, event, body in [
+        ("insert", 'AFTER INSERT ON "Posts"', add),
+        ("update", 'AFTER UPDATE OF latitude, longitude ON "Posts"', remove + " " + add),
+        ("delete", 'AFTER DELETE ON "Posts"', remove),
+    ]:
+        connection.execute(text(f'CREATE TRIGGER IF NOT EXISTS "{LOCATION_TABLE}_{name}" {event} BEGIN {body} END'))
+
+
+def drop_location_index(connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text('DROP INDEX IF EXISTS "ix_Posts_location"'))
+        return
+    for name in ("insert", "update", "delete"):
+        connection.execute(text(f'DROP TRIGGER IF EXISTS "{LOCATION_TABLE}_{name}"'))
+    connection.execute(text(f'DROP TABLE IF EXISTS "{LOCATION_TABLE}"'))
+
+
+def backfill_locations(connection, after=None, until=None):
+    """Geocode các bài đăng chưa có tọa độ, của mọi bài đăng hoặc các id trong (after, until]."""
+    where = " AND id > :after AND id <= :until" if after is not None else ""
+    rows = connection.execute(
+        text('SELECT id, province, district FROM "Posts" WHERE latitude IS NULL' + where),
+        {"after": after, "until": until},
+    ).all()
+    located = []
+    for post_id, province, district in rows:
+        lat, lng = geocode(province, district)
+        if lat is not None:
+            located.append({"id": post_id, "lat": lat, "lng": lng})
+    if located:
+        connection.execute(text('UPDATE "Posts" SET latitude = :lat, longitude = :lng WHERE id = :id'), located)
+    return len(located)
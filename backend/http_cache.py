@@ -0,0 +1,72 @@
+"""
+HTTP conditional requests: ETag / Last-Modified / 304 Not Modified.
+
+Validator của một phản hồi được tính từ cột updated_at (và id) của các dòng tạo nên phản
+hồi đó, đọc bằng một truy vấn chỉ lấy các cột này. Nếu client gửi If-None-Match (hoặc
+If-Modified-Since) khớp, endpoint trả 304 ngay mà không tải đối tượng ORM nào và không
+chạy jsonable_encoder.
+"""
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+
+# Chính sách Cache-Control theo loại endpoint
+CACHE_POLICIES = {
+    # Chi tiết bài đăng, ảnh, tiện ích: trình duyệt dùng lại trong thời gian ngắn rồi hỏi lại bằng ETag
+    "detail": "public, max-age=30, must-revalidate",
+    # Danh sách bài đăng thay đổi khi có bài mới được duyệt
+    "list": "public, max-age=10, must-revalidate",
+}
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def http_date(value):
+    """datetime (UTC, có thể không có tzinfo) -> chuỗi ngày giờ HTTP, hoặc None."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    # So sánh yếu: bỏ tiền tố W/ ở cả hai phía
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+def is_fresh(request, etag, last_modified=None):
+    """Client đã có bản mới nhất? If-None-Match được ưu tiên hơn If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def validator_headers(etag, last_modified, policy):
+    headers = {"ETag": etag, "Cache-Control": CACHE_POLICIES[policy]}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
+
+
+def not_modified(etag, last_modified, policy):
+    return Response(status_code=304, headers=validator_headers(etag, last_modified, policy))
+
+
+def set_validators(response, etag, last_modified, policy):
+    response.headers.update(validator_headers(etag, last_modified, policy))
@@ -0,0 +1,128 @@
+"""
+Xử lý ảnh tải lên: tạo các kích thước cố định ở định dạng hiện đại và bỏ EXIF.
+
+Mỗi ảnh gốc được xoay theo EXIF Orientation rồi lưu lại thành các biến thể:
+    thumb   cạnh dài tối đa 400px   (thẻ bài đăng ở trang tìm kiếm, danh sách)
+    detail  cạnh dài tối đa 1024px  (trang chi tiết)
+    full    cạnh dài tối đa 2048px  (xem ảnh lớn)
+mỗi kích thước ở WebP và AVIF (nếu Pillow hỗ trợ). Ảnh mới được ghi không kèm metadata
+nên vị trí GPS, model máy ảnh... của ảnh gốc bị loại bỏ.
+
+File tải lên được ghi theo từng khối (save_upload), không đọc cả file vào bộ nhớ, vào
+PENDING_DIR (ngoài thư mục public) rồi được xử lý bởi hàng đợi công việc nền (jobs.py).
+Cấu hình qua biến môi trường:
+    UPLOAD_DIR                thư mục public/uploads của frontend
+    UPLOAD_PENDING_DIR        nơi giữ file gốc chờ xử lý (mặc định /app/uploads-pending)
+    UPLOAD_MAX_FILE_BYTES     tối đa cho mỗi ảnh (mặc định 10 MB)
+    UPLOAD_MAX_REQUEST_BYTES  tối đa cho cả một lần tải lên (mặc định 60 MB)
+    UPLOAD_MAX_FILES          số ảnh tối đa mỗi lần tải lên (mặc định 20)
+"""
+import os
+
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, ImageOps, features
+
+# Thư mục public/uploads của frontend (đường dẫn trong container docker)
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join("/app", "frontend", "public", "uploads"))
+UPLOAD_URL_PREFIX = "/uploads"
+PENDING_DIR = os.environ.get("UPLOAD_PENDING_DIR", os.path.join("/app", "uploads-pending"))
+
+VARIANT_SIZES = {"thumb": 400, "detail": 1024, "full": 2048}
+FORMATS = ["webp"] + (["avif"] if features.check("avif") else [])
+QUALITY = {"webp": 80, "avif": 60}
+
+CHUNK_SIZE = 1024 * 1024
+MAX_FILE_BYTES = int(os.environ.get("UPLOAD_MAX_FILE_BYTES", 10 * 1024 * 1024))
+MAX_REQUEST_BYTES = int(os.environ.get("UPLOAD_MAX_REQUEST_BYTES", 60 * 1024 * 1024))
+MAX_FILES = int(os.environ.get("UPLOAD_MAX_FILES", 20))
+
+
+class UploadRejected(ValueError):
+    pass
+
+
+def sniff_image_type(head):
+    """Định dạng ảnh theo magic bytes của file (không tin content-type do client gửi), hoặc None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis", b"heic", b"heix", b"mif1"):
+        return "avif" if head[8:12] in (b"avif", b"avis") else "heic"
+    return None
+
+
+async def save_upload(upload, path, max_bytes=MAX_FILE_BYTES):
+    """
+    Ghi UploadFile xuống path theo từng khối CHUNK_SIZE, mọi thao tác file chạy trong thread pool.
+    Trả về số byte đã ghi; UploadRejected nếu không phải ảnh hoặc vượt max_bytes (file dở bị xóa).
+    """
+    written = 0
+    buffer = await run_in_threadpool(open, path, "wb")
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            if written == 0 and sniff_image_type(chunk[:32]) is None:
+                raise UploadRejected(f"{upload.filename}: not a supported image")
+            written += len(chunk)
+            if written > max_bytes:
+                raise UploadRejected(f"{upload.filename}: larger than {max_bytes} bytes")
+            await run_in_threadpool(buffer.write, chunk)
+        if written == 0:
+            raise UploadRejected(f"{upload.filename}: empty file")
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.remove, path)
+        raise
+    await run_in_threadpool(buffer.close)
+    return written
+
+
+async def process_pending(base_name):
+    """
+    Tạo biến thể cho file gốc đang chờ base_name; trả về (width, height, variants).
+    Số ảnh được xử lý đồng thời bị giới hạn bởi số worker của hàng đợi (JOB_WORKERS).
+    """
+    return await run_in_threadpool(process_image, pending_path(base_name), base_name)
+
+
+def pending_path(base_name):
+    return os.path.join(PENDING_DIR, f"{base_name}.upload")
+
+
+def process_image(source_path, base_name):
+    """
+    Tạo các biến thể của ảnh source_path trong UPLOAD_DIR (hàm đồng bộ, chạy trong thread pool).
+    Chạy lại với cùng tham số sẽ ghi đè đúng các file đó nên an toàn khi công việc được thử lại.
+    Trả về (width, height, variants) với variants dạng
+        {"thumb": {"width": 400, "height": 300, "webp": "/uploads/..._thumb.webp", "avif": ...}, ...}
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        width, height = image.size
+
+        variants = {}
+        for name, max_side in VARIANT_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            variant = {"width": resized.width, "height": resized.height}
+            for fmt in FORMATS:
+                file_name = f"{base_name}_{name}.{fmt}"
+                # Không truyền exif=... nên ảnh mới không mang metadata của ảnh gốc
+                resized.save(os.path.join(UPLOAD_DIR, file_name), fmt.upper(), quality=QUALITY[fmt])
+                variant[fmt] = f"{UPLOAD_URL_PREFIX}/{file_name}"
+            variants[name] = variant
+
+    return width, height, variants
+
+
+def variant_url(image_url, variants, size="thumb", fmt="webp"):
+    """URL của biến thể phù hợp, hoặc image_url gốc với ảnh chưa xử lý / ảnh từ trang khác."""
+    if variants and size in variants and fmt in variants[size]:
+        return variants[size][fmt]
+    return image_url
@@ -0,0 +1,190 @@
+"""
+Hàng đợi công việc nền lưu trong bảng Jobs của cơ sở dữ liệu.
+
+Endpoint gọi enqueue(db, kind, **payload) trong cùng transaction với thay đổi của nó rồi
+trả về ngay; công việc chỉ được thấy sau khi transaction commit nên không bao giờ chạy trên
+dữ liệu chưa lưu, và không mất khi tiến trình khởi động lại. Một nhóm worker asyncio lấy
+việc theo thứ tự, chạy handler đã đăng ký bằng @queue.task(kind); lỗi thì thử lại sau
+2, 4, 8... giây cho tới max_attempts, sau đó giữ lại với status = 'failed' để kiểm tra.
+
+Cấu hình qua biến môi trường:
+    JOB_WORKERS        số công việc chạy đồng thời (mặc định 2)
+    JOB_POLL_INTERVAL  chu kỳ kiểm tra hàng đợi khi không được đánh thức, giây (mặc định 5)
+    JOB_STALE_AFTER    việc "running" lâu hơn bấy nhiêu giây khi khởi động được coi là bị bỏ dở (mặc định 600)
+"""
+import asyncio
+import os
+import traceback
+from datetime import timedelta
+
+from sqlalchemy import func, select, update, delete
+
+from database import AsyncSessionLocal, utcnow
+from models.jobs import Jobs
+
+
+class PermanentJobError(Exception):
+    """Lỗi không thể khắc phục bằng cách thử lại; công việc chuyển ngay sang failed."""
+
+
+class JobQueue:
+    def __init__(self, workers, poll_interval, stale_after):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.handlers = {}
+        self.max_attempts = {}
+        self._wakeup = None
+        self._stopping = False
+        self._tasks = []
+
+    def task(self, kind, max_attempts=5):
+        """Đăng ký handler: async def handler(db, **payload)."""
+        def register(handler):
+            self.handlers[kind] = handler
+            self.max_attempts[kind] = max_attempts
+            return handler
+        return register
+
+    def enqueue(self, db, kind, **payload):
+        """Thêm công việc vào session db; được lưu khi endpoint commit. Gọi wake() sau commit."""
+        if kind not in self.handlers:
+            raise KeyError(f"Unknown job kind: {kind}")
+        job = Jobs(kind=kind, payload=payload, max_attempts=self.max_attempts[kind])
+        db.add(job)
+        return job
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        # Công việc đang chạy khi một tiến trình dừng đột ngột được đưa lại vào hàng đợi. Chỉ lấy
+        # những việc đã "running" quá lâu vì có thể có tiến trình khác dùng chung database
+        stale = utcnow() - timedelta(seconds=self.stale_after)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Jobs).where(Jobs.status == 'running').where(Jobs.updated_at < stale).values(status='queued')
+            )
+            await db.commit()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # Cờ dừng cùng với cancel: lệnh cancel có thể bị nuốt khi rơi vào lúc worker đang chờ
+        # một thao tác được bảo vệ (threadpool, đóng kết nối), worker vẫn thoát ở vòng lặp sau
+        self._stopping = True
+        self.wake()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while not self._stopping:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                # Vd: cơ sở dữ liệu đang bị khóa; thử lại ở chu kỳ sau thay vì làm dừng worker
+                print(f"❌ Job queue error: {e}")
+                job = None
+            if job is None:
+                if self._stopping:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(*job)
+
+    async def _claim(self):
+        """Đánh dấu công việc sẵn sàng đầu tiên là running, trả về (id, kind, payload, attempts, max_attempts)."""
+        async with AsyncSessionLocal() as db:
+            next_id = (
+                select(Jobs.id)
+                .where(Jobs.status == 'queued')
+                .where(Jobs.run_after <= utcnow())
+                .order_by(Jobs.run_after, Jobs.id)
+                .limit(1)
+                # PostgreSQL: nhiều tiến trình lấy việc cùng lúc không chờ nhau (SQLite bỏ qua)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(Jobs)
+                .where(Jobs.id == next_id)
+                .where(Jobs.status == 'queued')
+                .values(status='running', attempts=Jobs.attempts + 1, updated_at=utcnow())
+                .returning(Jobs.id, Jobs.kind, Jobs.payload, Jobs.attempts, Jobs.max_attempts)
+            )
+            job = result.first()
+            await db.commit()
+            return tuple(job) if job else None
+
+    async def _run(self, job_id, kind, payload, attempts, max_attempts):
+        try:
+            handler = self.handlers.get(kind)
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for {kind}")
+            async with AsyncSessionLocal() as db:
+                await handler(db, **payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(e)).strip()
+            print(f"❌ Job {job_id} ({kind}) failed on attempt {attempts}: {error}")
+            retry = attempts < max_attempts and not isinstance(e, PermanentJobError)
+            values = {"last_error": error, "status": 'queued' if retry else 'failed'}
+            if retry:
+                values["run_after"] = utcnow() + timedelta(seconds=2 ** attempts)
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(Jobs).where(Jobs.id == job_id).values(**values))
+                await db.commit()
+            return
+        # Công việc thành công được xóa khỏi bảng; chỉ giữ lại những việc đang chờ hoặc thất bại
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Jobs).where(Jobs.id == job_id))
+            await db.commit()
+
+    async def stats(self, db, failures=20):
+        """Số công việc theo loại và trạng thái, tuổi của việc chờ lâu nhất và các lỗi gần nhất."""
+        counts = await db.execute(
+            select(Jobs.kind, Jobs.status, func.count(Jobs.id)).group_by(Jobs.kind, Jobs.status)
+        )
+        depth = {}
+        for kind, status, count in counts.all():
+            depth.setdefault(kind, {})[status] = count
+        oldest = (await db.execute(
+            select(func.min(Jobs.created_at)).where(Jobs.status == 'queued')
+        )).scalar()
+        failed = await db.execute(
+            select(Jobs).where(Jobs.status == 'failed').order_by(Jobs.updated_at.desc()).limit(failures)
+        )
+        return {
+            "workers": self.workers,
+            "depth": depth,
+            "oldest_queued_seconds": round((utcnow() - oldest).total_seconds(), 1) if oldest else None,
+            "failures": failed.scalars().all(),
+        }
+
+    async def retry(self, db, job_id):
+        """Đưa một công việc thất bại trở lại hàng đợi. Trả về False nếu không tìm thấy."""
+        result = await db.execute(
+            update(Jobs)
+            .where(Jobs.id == job_id)
+            .where(Jobs.status == 'failed')
+            .values(status='queued', attempts=0, run_after=utcnow())
+        )
+        await db.commit()
+        self.wake()
+        return result.rowcount > 0
+
+
+queue = JobQueue(
+    workers=int(os.environ.get("JOB_WORKERS", 2)),
+    poll_interval=float(os.environ.get("JOB_POLL_INTERVAL", 5)),
+    stale_after=float(os.environ.get("JOB_STALE_AFTER", 600)),
+)
@@ -0,0 +1,349 @@
+"""
+Giới hạn tần suất, kích thước và số request đồng thời của mỗi client (ASGI middleware).
+
+LimitMiddleware kiểm tra mỗi request trước khi nó tới endpoint:
+    - limit= trong query phải nằm trong khoảng 1..MAX_PAGE_SIZE, nếu không trả 400
+    - body không được vượt MAX_BODY_BYTES, hoặc MAX_REQUEST_BYTES của images.py với route tải
+      ảnh; kiểm tra theo Content-Length và cả khi đang đọc body không khai báo độ dài (413)
+    - token bucket theo (loại route, client): mỗi loại trong RATES có sức chứa `số request` và
+      được nạp lại đều trong `giây`; hết token thì trả 429 kèm Retry-After
+    - mỗi client chỉ có tối đa CLIENT_MAX_CONCURRENCY request đang xử lý (429)
+    - request ghi (không phải GET/HEAD) chờ một trong WRITE_CONCURRENCY lượt ghi để hàng đợi
+      người ghi của SQLite luôn ngắn; chờ quá WRITE_QUEUE_TIMEOUT giây thì trả 503. Body được
+      đọc hết trước khi chờ, nên client gửi chậm không giữ lượt ghi của người khác; route tải
+      ảnh (body lớn, ảnh được xử lý sau bởi hàng đợi job) và các route băm mật khẩu (PBKDF2 tốn
+      vài trăm ms CPU, phần ghi chỉ là một câu lệnh ngắn) không chiếm lượt ghi
+
+Client được nhận diện bằng địa chỉ IP (X-Forwarded-For nếu chạy sau reverse proxy). Token
+bucket nằm trong bộ nhớ của tiến trình, hoặc trên Redis (hay máy chủ tương thích) để nhiều
+worker dùng chung; giới hạn đồng thời luôn tính theo từng tiến trình. Nếu Redis lỗi, request
+được cho qua thay vì làm sập cả trang.
+
+Cấu hình qua biến môi trường:
+    RATE_LIMIT_BACKEND          memory (mặc định) | redis | off
+    RATE_LIMIT_REDIS_URL        địa chỉ Redis cho backend redis (mặc định redis://localhost:6379/0)
+    RATE_LIMIT_<LOẠI>           "<số request>/<giây>" của từng loại route trong RATES (vd RATE_LIMIT_AUTH=5/60)
+    RATE_LIMIT_MAX_CLIENTS      số bucket tối đa backend memory giữ (mặc định 10000)
+    RATE_LIMIT_TRUST_PROXY      1: lấy địa chỉ client từ X-Forwarded-For
+    CLIENT_MAX_CONCURRENCY      số request đang xử lý tối đa của mỗi client (mặc định 8)
+    WRITE_CONCURRENCY           số request ghi được xử lý cùng lúc (mặc định 4)
+    WRITE_QUEUE_TIMEOUT         thời gian chờ tối đa một lượt ghi, giây (mặc định 10)
+    MAX_PAGE_SIZE               giá trị lớn nhất của limit= (mặc định 100)
+    MAX_BODY_BYTES              tối đa của body các request không tải ảnh (mặc định 1 MB)
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from images import MAX_REQUEST_BYTES
+
+
+def _rate(kind, default):
+    value = os.environ.get(f"RATE_LIMIT_{kind.upper()}")
+    if not value:
+        return default
+    count, _, seconds = value.partition("/")
+    return int(count), float(seconds or 1)
+
+
+# Loại route -> (số request, trong bao nhiêu giây)
+RATES = {
+    "auth": _rate("auth", (10, 60)),       # đăng nhập, đăng ký: chống dò mật khẩu
+    "upload": _rate("upload", (20, 60)),   # tải ảnh lên
+    "search": _rate("search", (60, 60)),   # tìm kiếm và lọc: truy vấn nặng nhất
+    "write": _rate("write", (60, 60)),     # các request ghi khác
+    "read": _rate("read", (300, 60)),      # các request đọc khác
+}
+AUTH_PATHS = {"/login", "/signup"}
+UPLOAD_PATHS = {"/add-post-images"}
+SEARCH_PATHS = {"/search-posts", "/search-posts-with-details", "/get-posts-by-filter"}
+PASSWORD_PATHS = {"/login", "/signup", "/update-user"}
+# Route ghi không chờ lượt ghi (xem docstring của module)
+UNSLOTTED_PATHS = UPLOAD_PATHS | PASSWORD_PATHS
+READ_METHODS = {"GET", "HEAD"}
+
+MAX_CLIENTS = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", 10000))
+TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+CLIENT_MAX_CONCURRENCY = int(os.environ.get("CLIENT_MAX_CONCURRENCY", 8))
+WRITE_CONCURRENCY = int(os.environ.get("WRITE_CONCURRENCY", 4))
+WRITE_QUEUE_TIMEOUT = float(os.environ.get("WRITE_QUEUE_TIMEOUT", 10))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
+MAX_BODY_BYTES = int(os.environ.get("MAX_BODY_BYTES", 1024 * 1024))
+# Phần đầu / ranh giới của multipart cộng thêm vào tổng kích thước các ảnh
+MULTIPART_OVERHEAD = 1024 * 1024
+
+
+def route_class(method, path):
+    if path in AUTH_PATHS:
+        return "auth"
+    if path in UPLOAD_PATHS:
+        return "upload"
+    if path in SEARCH_PATHS:
+        return "search"
+    return "read" if method in READ_METHODS else "write"
+
+
+def max_body_bytes(path):
+    return MAX_REQUEST_BYTES + MULTIPART_OVERHEAD if path in UPLOAD_PATHS else MAX_BODY_BYTES
+
+
+def invalid_limit(values):
+    for value in values:
+        try:
+            limit = int(value)
+        except ValueError:
+            continue  # để endpoint báo lỗi kiểu dữ liệu như trước
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return f"limit must be between 1 and {MAX_PAGE_SIZE}"
+    return None
+
+
+class MemoryBuckets:
+    """Token bucket trong tiến trình, LRU giới hạn số client: key -> (số token, cập nhật lúc)."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+
+    async def take(self, key, capacity, period):
+        """(được phép, số giây phải chờ tới khi có token)."""
+        now = time.monotonic()
+        rate = capacity / period
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        # Client bị đẩy ra khỏi LRU chỉ được nhận lại bucket đầy
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def info(self):
+        return {"backend": "memory", "clients": len(self.buckets), "max_clients": self.max_keys}
+
+
+# Nạp lại và lấy một token trong một bước, nguyên tử trên Redis
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBuckets:
+    """Token bucket trên Redis để nhiều worker dùng chung giới hạn."""
+
+    prefix = "nhatro:ratelimit:"
+
+    def __init__(self, url):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis cần cài gói 'redis' (pip install redis)")
+        self.client = redis.from_url(url)
+        self.script = self.client.register_script(_TAKE_SCRIPT)
+        self.url = url
+        self.failing = False
+
+    async def take(self, key, capacity, period):
+        rate = capacity / period
+        try:
+            allowed, tokens = await self.script(keys=[self.prefix + key], args=[capacity, rate, time.time()])
+        except Exception as e:
+            if not self.failing:
+                print(f"⚠️ Rate limit backend unavailable, requests are not limited: {e}")
+                self.failing = True
+            return True, 0
+        self.failing = False
+        return bool(allowed), 0 if allowed else (1 - float(tokens)) / rate
+
+    def info(self):
+        return {"backend": "redis", "url": self.url, "failing": self.failing}
+
+
+class NoBuckets:
+    async def take(self, key, capacity, period):
+        return True, 0
+
+    def info(self):
+        return {"backend": "off"}
+
+
+class Limiter:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.active = {}  # client -> số request đang xử lý
+        self.write_slots = asyncio.Semaphore(WRITE_CONCURRENCY)
+        self.writes_waiting = 0
+        self.rejected = {"limit": 0, "body": 0, "rate": 0, "concurrency": 0, "write_queue": 0}
+
+    def info(self):
+        return {
+            **self.buckets.info(),
+            "rates": {kind: f"{count}/{period:g}" for kind, (count, period) in RATES.items()},
+            "active_clients": len(self.active),
+            "writes_waiting": self.writes_waiting,
+            "rejected": dict(self.rejected),
+        }
+
+
+def _create_limiter():
+    kind = os.environ.get("RATE_LIMIT_BACKEND", "memory").lower()
+    if kind == "redis":
+        buckets = RedisBuckets(os.environ.get("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+    elif kind == "off":
+        buckets = NoBuckets()
+    else:
+        buckets = MemoryBuckets(MAX_CLIENTS)
+    return Limiter(buckets)
+
+
+limiter = _create_limiter()
+
+
+def client_id(scope, headers):
+    if TRUST_PROXY:
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _fail(status_code, message, retry_after=None):
+    headers = {"Retry-After": str(math.ceil(retry_after))} if retry_after is not None else None
+    return JSONResponse({"status": "fail", "message": message}, status_code=status_code, headers=headers)
+
+
+class LimitMiddleware:
+    """ASGI middleware áp dụng các giới hạn của limiter cho mọi request HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        response = await self.check(scope)
+        if response is not None:
+            return await response(scope, receive, send)
+
+        client = client_id(scope, _headers(scope))
+        limiter.active[client] = limiter.active.get(client, 0) + 1
+        try:
+            receive = _capped(receive, max_body_bytes(scope["path"]))
+            if scope["method"] in READ_METHODS or scope["path"] in UNSLOTTED_PATHS:
+                return await self.app(scope, receive, send)
+            try:
+                receive = await _buffered(receive)
+            except HTTPException as e:
+                return await _fail(e.status_code, e.detail)(scope, receive, send)
+            limiter.writes_waiting += 1
+            try:
+                await asyncio.wait_for(limiter.write_slots.acquire(), WRITE_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                limiter.rejected["write_queue"] += 1
+                response = _fail(503, "Server is busy, please retry", retry_after=1)
+                return await response(scope, receive, send)
+            finally:
+                limiter.writes_waiting -= 1
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                limiter.write_slots.release()
+        finally:
+            limiter.active[client] -= 1
+            if not limiter.active[client]:
+                del limiter.active[client]
+
+    async def check(self, scope):
+        """Phản hồi từ chối request, hoặc None nếu request được xử lý."""
+        headers = _headers(scope)
+        path, method = scope["path"], scope["method"]
+
+        error = invalid_limit(_query_values(scope, "limit"))
+        if error:
+            limiter.rejected["limit"] += 1
+            return _fail(400, error)
+
+        declared = headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > max_body_bytes(path):
+            limiter.rejected["body"] += 1
+            return _fail(413, f"Request body too large (max {max_body_bytes(path)} bytes)")
+
+        client = client_id(scope, headers)
+        kind = route_class(method, path)
+        allowed, retry_after = await limiter.buckets.take(f"{kind}:{client}", *RATES[kind])
+        if not allowed:
+            limiter.rejected["rate"] += 1
+            return _fail(429, "Too many requests, please slow down", retry_after=retry_after)
+
+        if limiter.active.get(client, 0) >= CLIENT_MAX_CONCURRENCY:
+            limiter.rejected["concurrency"] += 1
+            return _fail(429, "Too many concurrent requests", retry_after=1)
+        return None
+
+
+def _headers(scope):
+    return {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+
+
+def _query_values(scope, name):
+    query = scope.get("query_string", b"").decode("latin-1")
+    return [value for key, value in parse_qsl(query) if key == name]
+
+
+async def _buffered(receive):
+    """Đọc hết body, trả về receive phát lại các message đã đọc rồi tiếp tục với receive gốc."""
+    messages = []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request" or not message.get("more_body", False):
+            break
+
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    return replay
+
+
+def _capped(receive, max_bytes):
+    """receive chỉ cho đọc tối đa max_bytes của body (body không khai báo Content-Length)."""
+    received = 0
+
+    async def capped_receive():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                limiter.rejected["body"] += 1
+                raise HTTPException(status_code=413, detail=f"Request body too large (max {max_bytes} bytes)")
+        return message
+
+    return capped_receive
@@ -0,0 +1,264 @@
+"""
+Migration có đánh số phiên bản cho cơ sở dữ liệu.
+
+Mỗi file trong migrations/versions/ (vd 0004_amenity_mask.py) khai báo:
+    revision     mã phiên bản, các migration chạy theo thứ tự mã tăng dần
+    description  mô tả ngắn
+    upgrade(connection) / downgrade(connection)
+                 thay đổi cấu trúc (DDL), chạy trong một transaction
+    backfills    (tùy chọn) danh sách Backfill điền dữ liệu cho cột mới
+
+Bảng SchemaMigrations ghi lại các revision đã chạy và tiến độ backfill của chúng. Backfill
+không chạy trong transaction của DDL: nó xử lý từng lô BATCH_SIZE dòng theo id tăng dần, mỗi
+lô một transaction ngắn rồi nghỉ BATCH_PAUSE giây, nên không giữ khóa ghi của SQLite lâu và
+các request ghi khác vẫn chen vào được giữa hai lô. Tiến độ (id cuối cùng đã xử lý) được lưu
+cùng transaction với lô, nên dừng giữa chừng thì lần sau chạy tiếp từ chỗ cũ.
+
+Khi khởi động, ứng dụng chạy các DDL còn thiếu rồi để backfiller chạy nền; CLI migrate.py
+chạy, kiểm tra và hoàn tác migration từ dòng lệnh.
+
+Cấu hình qua biến môi trường:
+    MIGRATION_BATCH_SIZE   số dòng mỗi lô backfill (mặc định 500)
+    MIGRATION_BATCH_PAUSE  thời gian nghỉ giữa hai lô, giây (mặc định 0.05)
+"""
+import asyncio
+import importlib
+import os
+import pkgutil
+
+from sqlalchemy import Column, MetaData, String, Table, JSON, inspect, select, text, delete, update
+
+from database import Base, UTCDateTime, utcnow
+
+BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", 500))
+BATCH_PAUSE = float(os.environ.get("MIGRATION_BATCH_PAUSE", 0.05))
+
+# Không thuộc Base.metadata: bảng của công cụ migration, không phải của ứng dụng
+schema_migrations = Table(
+    "SchemaMigrations", MetaData(),
+    Column("revision", String, primary_key=True),
+    Column("description", String),
+    Column("applied_at", UTCDateTime),
+    Column("backfill_state", JSON),  # tên backfill -> id cuối cùng đã xử lý
+    Column("backfilled_at", UTCDateTime),  # NULL khi còn backfill chưa xong
+)
+
+
+class IrreversibleMigration(Exception):
+    """Migration không thể hoàn tác."""
+
+
+class MigrationBlocked(Exception):
+    """Migration không chạy được khi dữ liệu chưa sẵn sàng (vd còn dòng trùng, xem duplicates.py)."""
+
+
+class Backfill:
+    """
+    Điền dữ liệu cho bảng table theo từng lô id tăng dần. apply(connection, after, until)
+    cập nhật các dòng có after < id <= until.
+    """
+
+    def __init__(self, name, table, apply):
+        self.name = name
+        self.table = table
+        self.apply = apply
+
+    def step(self, connection, after, batch_size):
+        """Xử lý một lô sau id after. Trả về id cuối của lô, hoặc None khi đã hết dòng."""
+        until = connection.execute(
+            text(
+                f'SELECT MAX(id) FROM (SELECT id FROM "{self.table}" WHERE id > :after '
+                "ORDER BY id LIMIT :limit) AS batch"
+            ),
+            {"after": after, "limit": batch_size},
+        ).scalar()
+        if until is None:
+            return None
+        self.apply(connection, after, until)
+        return until
+
+
+class Migration:
+    def __init__(self, module):
+        self.revision = module.revision
+        self.description = module.description
+        self.upgrade = module.upgrade
+        self.downgrade = module.downgrade
+        self.backfills = getattr(module, "backfills", [])
+
+    def __repr__(self):
+        return f"<Migration {self.revision} {self.description}>"
+
+
+def load():
+    """Các migration trong migrations/versions, theo thứ tự revision."""
+    package = f"{__name__}.versions"
+    path = os.path.join(os.path.dirname(__file__), "versions")
+    migrations = [
+        Migration(importlib.import_module(f"{package}.{info.name}"))
+        for info in pkgutil.iter_modules([path])
+    ]
+    migrations.sort(key=lambda migration: migration.revision)
+    revisions = [migration.revision for migration in migrations]
+    if len(set(revisions)) != len(revisions):
+        raise RuntimeError(f"Duplicate migration revision in {revisions}")
+    return migrations
+
+
+MIGRATIONS = load()
+
+
+def applied(connection):
+    """revision -> dòng SchemaMigrations của các migration đã chạy."""
+    if not inspect(connection).has_table(schema_migrations.name):
+        return {}
+    return {row.revision: row for row in connection.execute(select(schema_migrations)).all()}
+
+
+def _lock(connection):
+    # PostgreSQL: nhiều tiến trình khởi động cùng lúc thì chỉ một tiến trình chạy migration,
+    # các tiến trình khác chờ rồi thấy chúng đã được chạy. SQLite đã có khóa ghi của file.
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('SchemaMigrations'))"))
+
+
+def upgrade(connection, target=None):
+    """Chạy DDL của các migration chưa chạy (tới target nếu có). Trả về các migration đã chạy."""
+    _lock(connection)
+    schema_migrations.create(connection, checkfirst=True)
+    done = applied(connection)
+    ran = []
+    for migration in MIGRATIONS:
+        if target is not None and migration.revision > target:
+            break
+        if migration.revision in done:
+            continue
+        migration.upgrade(connection)
+        connection.execute(schema_migrations.insert().values(
+            revision=migration.revision,
+            description=migration.description,
+            applied_at=utcnow(),
+            backfill_state={},
+            backfilled_at=None if migration.backfills else utcnow(),
+        ))
+        ran.append(migration)
+    return ran
+
+
+def downgrade(connection, target=None):
+    """
+    Hoàn tác các migration có revision lớn hơn target, mới nhất trước. Không có target thì chỉ
+    hoàn tác migration mới nhất. Trả về các migration đã hoàn tác.
+    """
+    _lock(connection)
+    done = applied(connection)
+    reverted = []
+    for migration in reversed(MIGRATIONS):
+        if migration.revision not in done:
+            continue
+        if target is None and reverted:
+            break
+        if target is not None and migration.revision <= target:
+            break
+        migration.downgrade(connection)
+        connection.execute(delete(schema_migrations).where(schema_migrations.c.revision == migration.revision))
+        reverted.append(migration)
+    return reverted
+
+
+def pending(connection):
+    done = applied(connection)
+    return [migration for migration in MIGRATIONS if migration.revision not in done]
+
+
+def pending_backfills(connection):
+    done = applied(connection)
+    return [
+        migration for migration in MIGRATIONS
+        if migration.revision in done and done[migration.revision].backfilled_at is None
+    ]
+
+
+def backfill_step(connection, batch_size=BATCH_SIZE):
+    """
+    Chạy một lô của backfill đầu tiên chưa xong. Trả về (revision, tên backfill, id cuối) của lô
+    vừa chạy, hoặc None khi không còn backfill nào.
+    """
+    for migration in pending_backfills(connection):
+        state = dict(applied(connection)[migration.revision].backfill_state or {})
+        for backfill in migration.backfills:
+            after = state.get(backfill.name, 0)
+            if after is None:
+                continue  # đã xong
+            until = backfill.step(connection, after, batch_size)
+            state[backfill.name] = until
+            values = {"backfill_state": state}
+            if until is None and all(state.get(b.name, 0) is None for b in migration.backfills):
+                values["backfilled_at"] = utcnow()
+            connection.execute(
+                update(schema_migrations).where(schema_migrations.c.revision == migration.revision).values(**values)
+            )
+            return migration.revision, backfill.name, until
+    return None
+
+
+def drift(connection):
+    """Các bảng, cột, index khai báo trong model nhưng không có trong cơ sở dữ liệu."""
+    inspector = inspect(connection)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            missing.append(f"table {table.name}")
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"column {table.name}.{column.name}" for column in table.columns if column.name not in columns]
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing += [f"index {index.name}" for index in table.indexes if index.name not in indexes]
+    return missing
+
+
+class Backfiller:
+    """Chạy nền các backfill còn dở, từng lô một, giữa các request của ứng dụng."""
+
+    def __init__(self, batch_size, pause):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.batches = 0
+        self.running = None
+        self._stopping = False
+        self._task = None
+
+    async def start(self, engine):
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(engine))
+
+    async def stop(self):
+        if self._task is not None:
+            # Như JobQueue.stop: cờ dừng phòng khi lệnh cancel bị nuốt lúc đang chạy một lô
+            self._stopping = True
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, engine):
+        while not self._stopping:
+            try:
+                async with engine.begin() as connection:
+                    progress = await connection.run_sync(backfill_step, self.batch_size)
+            except Exception as e:
+                print(f"❌ Backfill error: {e}")
+                return
+            if progress is None:
+                if self.batches:
+                    print(f"✅ Backfill finished ({self.batches} batches)")
+                self.running = None
+                return
+            self.batches += 1
+            self.running = f"{progress[0]}:{progress[1]}"
+            await asyncio.sleep(self.pause)
+
+    def info(self):
+        return {"running": self.running, "batches": self.batches}
+
+
+backfiller = Backfiller(batch_size=BATCH_SIZE, pause=BATCH_PAUSE)
@@ -0,0 +1,97 @@
+"""
+Các thao tác thay đổi cấu trúc dùng trong migration.
+
+Mọi thao tác đều bỏ qua khi cơ sở dữ liệu đã ở trạng thái đích (bảng / cột / index đã có
+hoặc đã bị xóa): các file app.db cũ từng được cập nhật bằng cách so với model nên có thể đã
+có một phần thay đổi của một migration.
+"""
+from sqlalchemy import Column, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+
+def has_table(connection, table):
+    return inspect(connection).has_table(table)
+
+
+def has_column(connection, table, column):
+    return column in {c["name"] for c in inspect(connection).get_columns(table)}
+
+
+def create_table(connection, table):
+    """Tạo bảng (sqlalchemy.Table) kèm các index của nó."""
+    table.create(connection, checkfirst=True)
+
+
+def drop_table(connection, table):
+    connection.execute(text(f'DROP TABLE IF EXISTS "{table}"'))
+
+
+def add_column(connection, table, column):
+    """ALTER TABLE ... ADD COLUMN; cột NOT NULL phải có server_default."""
+    if has_column(connection, table, column.name):
+        return False
+    ddl = CreateColumn(column).compile(dialect=connection.dialect)
+    connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {ddl}'))
+    return True
+
+
+def drop_column(connection, table, column):
+    # SQLite >= 3.35 hỗ trợ DROP COLUMN, với điều kiện cột không nằm trong index nào
+    if not has_column(connection, table, column):
+        return False
+    connection.execute(text(f'ALTER TABLE "{table}" DROP COLUMN "{column}"'))
+    return True
+
+
+def set_not_null(connection, table, column):
+    """
+    Đổi cột column.name thành NOT NULL DEFAULT column.server_default (column là sqlalchemy.Column);
+    các dòng đang NULL phải được điền trước.
+
+    SQLite không sửa được ràng buộc của một cột có sẵn: thêm cột mới NOT NULL, chép dữ liệu,
+    xóa cột cũ rồi đổi tên cột mới. Cột chuyển xuống cuối bảng và không được nằm trong index
+    hay trigger nào lúc đổi.
+    """
+    current = {c["name"]: c for c in inspect(connection).get_columns(table)}[column.name]
+    if not current["nullable"]:
+        return False
+    if connection.dialect.name == "postgresql":
+        default = column.server_default.arg.text
+        connection.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN "{column.name}" SET DEFAULT {default}'))
+        connection.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN "{column.name}" SET NOT NULL'))
+        return True
+    _swap_column(connection, table, column)
+    return True
+
+
+def drop_not_null(connection, table, column):
+    """Ngược lại của set_not_null: cột column.name (sqlalchemy.Column, nullable) nhận NULL, không có default."""
+    current = {c["name"]: c for c in inspect(connection).get_columns(table)}[column.name]
+    if current["nullable"]:
+        return False
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN "{column.name}" DROP NOT NULL'))
+        connection.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN "{column.name}" DROP DEFAULT'))
+        return True
+    _swap_column(connection, table, column)
+    return True
+
+
+def _swap_column(connection, table, column):
+    staging = f"{column.name}__new"
+    add_column(connection, table, Column(
+        staging, column.type, nullable=column.nullable, server_default=column.server_default
+    ))
+    connection.execute(text(f'UPDATE "{table}" SET "{staging}" = "{column.name}"'))
+    drop_column(connection, table, column.name)
+    connection.execute(text(f'ALTER TABLE "{table}" RENAME COLUMN "{staging}" TO "{column.name}"'))
+
+
+def create_index(connection, name, table, *columns, unique=False):
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    connection.execute(text(f'CREATE {kind} IF NOT EXISTS "{name}" ON "{table}" ({quoted})'))
+
+
+def drop_index(connection, name):
+    connection.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
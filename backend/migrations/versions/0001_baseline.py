@@ -0,0 +1,26 @@
+"""Các bảng ban đầu của ứng dụng."""
+from migrations import IrreversibleMigration
+from migrations import ops
+from models.users import Users
+from models.posts import Posts
+from models.favourites import Favourites
+from models.postComments import PostComments
+from models.postImages import PostImages
+from models.history import History
+from models.convinience import Convinience
+
+revision = "0001"
+description = "baseline tables"
+
+TABLES = [Users, Posts, Favourites, PostComments, PostImages, History, Convinience]
+
+
+def upgrade(connection):
+    # Cơ sở dữ liệu mới được tạo theo model hiện tại; các migration sau sẽ thấy cột / index
+    # của chúng đã có và bỏ qua
+    for model in TABLES:
+        ops.create_table(connection, model.__table__)
+
+
+def downgrade(connection):
+    raise IrreversibleMigration("the baseline tables hold all application data")
@@ -0,0 +1,58 @@
+"""
+Index cho các truy vấn danh sách, lọc và trang quản trị.
+
+Trên SQLite, các cột thời điểm trước đây mặc định là func.now() nên được ghi dạng
+"YYYY-MM-DD HH:MM:SS", trong khi SQLAlchemy ghi và so sánh dạng "YYYY-MM-DD HH:MM:SS.ffffff".
+Cột được so sánh như chuỗi nên điều kiện = / < của con trỏ phân trang sai với các dòng trùng
+giây; chuẩn hóa về dạng của SQLAlchemy (các model giờ mặc định là utcnow).
+"""
+from sqlalchemy import text
+
+from migrations import ops
+
+revision = "0002"
+description = "listing indexes"
+
+INDEXES = [
+    ("ix_Posts_status_is_report_id", "Posts", "status", "is_report", "id"),
+    ("ix_Posts_status_is_report_post_date", "Posts", "status", "is_report", "post_date"),
+    ("ix_Posts_status_is_report_province_district_post_date", "Posts",
+     "status", "is_report", "province", "district", "post_date"),
+    ("ix_Posts_status_is_report_price", "Posts", "status", "is_report", "price"),
+    ("ix_Posts_status_post_date", "Posts", "status", "post_date"),
+    ("ix_Posts_is_report_post_date", "Posts", "is_report", "post_date"),
+    ("ix_Posts_user_id", "Posts", "user_id"),
+    ("ix_PostImages_post_id_id", "PostImages", "post_id", "id"),
+    ("ix_Convinience_post_id", "Convinience", "post_id"),
+    ("ix_PostComments_post_id_status_is_report", "PostComments", "post_id", "status", "is_report"),
+    ("ix_PostComments_user_id_post_id", "PostComments", "user_id", "post_id"),
+    ("ix_PostComments_status_comment_date", "PostComments", "status", "comment_date"),
+    ("ix_PostComments_is_report_comment_date", "PostComments", "is_report", "comment_date"),
+    ("ix_Favourites_post_id", "Favourites", "post_id"),
+    ("ix_History_user_id_viewed_at", "History", "user_id", "viewed_at"),
+    ("ix_History_post_id", "History", "post_id"),
+]
+
+TIMESTAMPS = [
+    ("Posts", "post_date"),
+    ("PostComments", "comment_date"),
+    ("Favourites", "added_at"),
+    ("History", "viewed_at"),
+    ("Users", "created_at"),
+]
+
+
+def upgrade(connection):
+    if connection.dialect.name == "sqlite":
+        for table, column in TIMESTAMPS:
+            connection.execute(text(
+                f'UPDATE "{table}" SET "{column}" = "{column}" || \'.000000\' WHERE length("{column}") = 19'
+            ))
+    for name, table, *columns in INDEXES:
+        ops.create_index(connection, name, table, *columns)
+
+
+def downgrade(connection):
+    # Dạng thời điểm đã chuẩn hóa vẫn đọc được như cũ, không cần hoàn tác
+    for name, *_ in INDEXES:
+        ops.drop_index(connection, name)
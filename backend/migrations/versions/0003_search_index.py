@@ -0,0 +1,16 @@
+"""Bảng tìm kiếm toàn văn PostsSearch (xem fulltext.py)."""
+from migrations import Backfill
+from fulltext import create_search_index, drop_search_index, index_posts
+
+revision = "0003"
+description = "full-text search index"
+
+backfills = [Backfill("PostsSearch", "Posts", index_posts)]
+
+
+def upgrade(connection):
+    create_search_index(connection)
+
+
+def downgrade(connection):
+    drop_search_index(connection)
@@ -0,0 +1,19 @@
+"""Posts.amenity_mask: tiện ích dạng bitmask (xem amenities.py)."""
+from sqlalchemy import Column, Integer, text
+
+from migrations import Backfill
+from migrations import ops
+from amenities import backfill_masks
+
+revision = "0004"
+description = "Posts.amenity_mask"
+
+backfills = [Backfill("Posts.amenity_mask", "Posts", backfill_masks)]
+
+
+def upgrade(connection):
+    ops.add_column(connection, "Posts", Column("amenity_mask", Integer, nullable=False, server_default=text("0")))
+
+
+def downgrade(connection):
+    ops.drop_column(connection, "Posts", "amenity_mask")
@@ -0,0 +1,41 @@
+"""updated_at của Posts, PostImages, Convinience, dùng cho ETag / Last-Modified."""
+from sqlalchemy import Column, text
+
+from database import UTCDateTime
+from migrations import Backfill
+from migrations import ops
+
+revision = "0005"
+description = "updated_at columns"
+
+# Bảng -> giá trị ban đầu của updated_at
+SOURCES = {
+    "Posts": "COALESCE(post_date, CURRENT_TIMESTAMP)",
+    "PostImages": "CURRENT_TIMESTAMP",
+    "Convinience": "CURRENT_TIMESTAMP",
+}
+
+
+def _backfill(table):
+    def apply(connection, after, until):
+        connection.execute(
+            text(
+                f'UPDATE "{table}" SET updated_at = {SOURCES[table]} '
+                "WHERE updated_at IS NULL AND id > :after AND id <= :until"
+            ),
+            {"after": after, "until": until},
+        )
+    return apply
+
+
+backfills = [Backfill(f"{table}.updated_at", table, _backfill(table)) for table in SOURCES]
+
+
+def upgrade(connection):
+    for table in SOURCES:
+        ops.add_column(connection, table, Column("updated_at", UTCDateTime))
+
+
+def downgrade(connection):
+    for table in SOURCES:
+        ops.drop_column(connection, table, "updated_at")
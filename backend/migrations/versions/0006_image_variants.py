@@ -0,0 +1,20 @@
+"""Kích thước và các bản thu nhỏ của ảnh (xem images.py)."""
+from sqlalchemy import Column, Integer, JSON
+
+from migrations import ops
+
+revision = "0006"
+description = "PostImages width, height, variants"
+
+COLUMNS = [Column("width", Integer), Column("height", Integer), Column("variants", JSON)]
+
+
+def upgrade(connection):
+    # Ảnh cũ không có bản thu nhỏ, variant_url trả về ảnh gốc
+    for column in COLUMNS:
+        ops.add_column(connection, "PostImages", column)
+
+
+def downgrade(connection):
+    for column in COLUMNS:
+        ops.drop_column(connection, "PostImages", column.name)
@@ -0,0 +1,14 @@
+"""Bảng Jobs của hàng đợi công việc nền (xem jobs.py)."""
+from migrations import ops
+from models.jobs import Jobs
+
+revision = "0007"
+description = "background job queue"
+
+
+def upgrade(connection):
+    ops.create_table(connection, Jobs.__table__)
+
+
+def downgrade(connection):
+    ops.drop_table(connection, Jobs.__tablename__)
@@ -0,0 +1,28 @@
+"""Điểm đánh giá cộng dồn của bài đăng (xem ratings.py)."""
+from sqlalchemy import Column, Float, Integer, text
+
+from migrations import Backfill
+from migrations import ops
+from ratings import STARS, backfill_ratings
+
+revision = "0008"
+description = "Posts rating aggregates"
+
+backfills = [Backfill("Posts.rating_*", "Posts", backfill_ratings)]
+
+
+def _columns():
+    yield Column("rating_sum", Float, nullable=False, server_default=text("0"))
+    yield Column("rating_count", Integer, nullable=False, server_default=text("0"))
+    for star in STARS:
+        yield Column(f"stars_{star}", Integer, nullable=False, server_default=text("0"))
+
+
+def upgrade(connection):
+    for column in _columns():
+        ops.add_column(connection, "Posts", column)
+
+
+def downgrade(connection):
+    for column in _columns():
+        ops.drop_column(connection, "Posts", column.name)
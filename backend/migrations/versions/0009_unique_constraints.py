@@ -0,0 +1,35 @@
+"""
+Ràng buộc duy nhất: một bình luận cho mỗi (bài đăng, người dùng) và một dòng tiện ích cho mỗi
+bài đăng, để các endpoint ghi dùng INSERT ... ON CONFLICT thay vì SELECT kiểm tra trước.
+
+Dữ liệu cũ có thể có dòng trùng. Migration không tự xóa chúng mà từ chối chạy cho tới khi
+chúng được chuyển sang bảng lưu trữ bằng python migrate.py dedupe (xem duplicates.py).
+"""
+from migrations import Backfill, MigrationBlocked
+from migrations import ops
+from duplicates import count_duplicates
+from ratings import backfill_ratings
+
+revision = "0009"
+description = "unique comments and convenience rows"
+
+backfills = [Backfill("Posts.rating_*", "Posts", backfill_ratings)]
+
+
+def upgrade(connection):
+    duplicates = count_duplicates(connection)
+    if duplicates:
+        found = ", ".join(f"{count} in {table}" for table, count in duplicates.items())
+        raise MigrationBlocked(
+            f"duplicate rows ({found}) block the unique indexes of 0009; "
+            "archive them with: python migrate.py dedupe"
+        )
+    ops.create_index(connection, "uq_PostComments_post_id_user_id", "PostComments", "post_id", "user_id", unique=True)
+    ops.create_index(connection, "uq_Convinience_post_id", "Convinience", "post_id", unique=True)
+    ops.drop_index(connection, "ix_Convinience_post_id")
+
+
+def downgrade(connection):
+    ops.create_index(connection, "ix_Convinience_post_id", "Convinience", "post_id")
+    ops.drop_index(connection, "uq_Convinience_post_id")
+    ops.drop_index(connection, "uq_PostComments_post_id_user_id")
@@ -0,0 +1,27 @@
+"""
+Posts.latitude / longitude và index không gian (xem geo.py). Backfill geocode các bài đăng
+cũ theo quận / huyện; trigger của R*Tree (SQLite) tự thêm chúng vào index khi được cập nhật.
+"""
+from sqlalchemy import Column, Float
+
+from migrations import Backfill
+from migrations import ops
+from geo import backfill_locations, create_location_index, drop_location_index
+
+revision = "0010"
+description = "Posts.latitude/longitude and spatial index"
+
+backfills = [Backfill("Posts.location", "Posts", backfill_locations)]
+
+
+def upgrade(connection):
+    ops.add_column(connection, "Posts", Column("latitude", Float, nullable=True))
+    ops.add_column(connection, "Posts", Column("longitude", Float, nullable=True))
+    create_location_index(connection)
+
+
+def downgrade(connection):
+    # Trigger tham chiếu tới các cột nên phải xóa trước
+    drop_location_index(connection)
+    ops.drop_column(connection, "Posts", "longitude")
+    ops.drop_column(connection, "Posts", "latitude")
@@ -0,0 +1,15 @@
+"""Cube PostFacets cho số đếm theo bộ lọc của trang tìm kiếm và trigger giữ nó đồng bộ (xem facets.py)."""
+from facets import create_facets, drop_facets
+
+revision = "0011"
+description = "PostFacets aggregate table"
+
+
+def upgrade(connection):
+    # Cube được nạp bằng một câu GROUP BY ngay trong migration: bảng tổng hợp không chia lô
+    # theo id được, và trigger đã chạy từ lúc này nên backfill sau đó sẽ đếm trùng
+    create_facets(connection)
+
+
+def downgrade(connection):
+    drop_facets(connection)
@@ -0,0 +1,13 @@
+"""Index cho bộ lọc và sắp xếp theo diện tích của các endpoint tìm kiếm (xem filters.py)."""
+from migrations import ops
+
+revision = "0012"
+description = "Posts area index"
+
+
+def upgrade(connection):
+    ops.create_index(connection, "ix_Posts_status_is_report_area", "Posts", "status", "is_report", "area")
+
+
+def downgrade(connection):
+    ops.drop_index(connection, "ix_Posts_status_is_report_area")
@@ -0,0 +1,20 @@
+"""
+Index cho danh sách yêu thích / lịch sử xem phân trang theo (added_at, post_id) và
+(viewed_at, post_id): thay ix_History_user_id_viewed_at bằng index có thêm post_id.
+"""
+from migrations import ops
+
+revision = "0013"
+description = "favourites and history keyset indexes"
+
+
+def upgrade(connection):
+    ops.create_index(connection, "ix_Favourites_user_id_added_at_post_id", "Favourites", "user_id", "added_at", "post_id")
+    ops.create_index(connection, "ix_History_user_id_viewed_at_post_id", "History", "user_id", "viewed_at", "post_id")
+    ops.drop_index(connection, "ix_History_user_id_viewed_at")
+
+
+def downgrade(connection):
+    ops.create_index(connection, "ix_History_user_id_viewed_at", "History", "user_id", "viewed_at")
+    ops.drop_index(connection, "ix_History_user_id_viewed_at_post_id")
+    ops.drop_index(connection, "ix_Favourites_user_id_added_at_post_id")
@@ -0,0 +1,29 @@
+"""
+Sắp xếp theo điểm đánh giá (sort=rating, xem filters.py) bằng index thay vì B-tree tạm.
+
+avg_rating thành NOT NULL DEFAULT 0: bài chưa có đánh giá (rating_count = 0) có avg_rating = 0,
+nên khóa sắp xếp là chính cột avg_rating thay cho COALESCE(avg_rating, 0) và đọc được theo
+index (status, is_report, avg_rating, rating_count, id). Chỉ các bài chưa có đánh giá cần điền
+giá trị, trong cùng transaction với DDL vì NOT NULL cần chúng đã được điền.
+"""
+from sqlalchemy import Column, Float, text
+
+from migrations import ops
+
+revision = "0014"
+description = "Posts rating sort index"
+
+
+def upgrade(connection):
+    connection.execute(text('UPDATE "Posts" SET avg_rating = 0 WHERE avg_rating IS NULL'))
+    ops.set_not_null(connection, "Posts", Column("avg_rating", Float, nullable=False, server_default=text("0")))
+    ops.create_index(
+        connection, "ix_Posts_status_is_report_avg_rating", "Posts",
+        "status", "is_report", "avg_rating", "rating_count", "id",
+    )
+
+
+def downgrade(connection):
+    ops.drop_index(connection, "ix_Posts_status_is_report_avg_rating")
+    ops.drop_not_null(connection, "Posts", Column("avg_rating", Float, nullable=True))
+    connection.execute(text('UPDATE "Posts" SET avg_rating = NULL WHERE rating_count = 0'))
@@ -0,0 +1,20 @@
+"""
+Nạp lại PostsSearch với nội dung chỉ gồm các từ cách nhau bằng dấu cách (xem fulltext.words):
+trên PostgreSQL, các từ nối bằng dấu câu như "tin.phong" trước đây không khớp với "phong".
+"""
+from migrations import Backfill
+from fulltext import index_posts
+
+revision = "0015"
+description = "full-text search words"
+
+backfills = [Backfill("PostsSearch.words", "Posts", index_posts)]
+
+
+def upgrade(connection):
+    pass
+
+
+def downgrade(connection):
+    # Nội dung chỉ gồm các từ vẫn dùng được với cách tìm kiếm trước đó, không cần nạp lại
+    pass
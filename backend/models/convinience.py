@@ -1,9 +1,13 @@
-from database import Base
-from sqlalchemy import Column, Integer, ForeignKey, Boolean
+from database import Base, utcnow, UTCDateTime
+from sqlalchemy import Column, Integer, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 
 class Convinience(Base):
     __tablename__ = 'Convinience'
+    __table_args__ = (
+        # Mỗi bài đăng có một dòng tiện ích (add_convenience dựa vào ràng buộc này)
+        Index('uq_Convinience_post_id', 'post_id', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey('Posts.id', ondelete='CASCADE'))
@@ -19,5 +23,6 @@ class Convinience(Base):
     bacony = Column(Boolean, default=False)
     elevator = Column(Boolean, default=False)
     pet_allowed = Column(Boolean, default=False)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
 
     post = relationship('Posts', back_populates='convinience')
\ No newline at end of file
@@ -1,14 +1,19 @@
-from sqlalchemy import Integer, ForeignKey, Column, DateTime, func
+from sqlalchemy import Integer, ForeignKey, Column, Index
 from sqlalchemy.orm import relationship
-from database import Base
+from database import Base, utcnow, UTCDateTime
 
 
 class Favourites(Base):
     __tablename__ = 'Favourites'
+    __table_args__ = (
+        Index('ix_Favourites_post_id', 'post_id'),
+        # Danh sách yêu thích phân trang theo (added_at, post_id)
+        Index('ix_Favourites_user_id_added_at_post_id', 'user_id', 'added_at', 'post_id'),
+    )
 
     user_id = Column(Integer, ForeignKey('Users.id', ondelete='CASCADE'), primary_key=True)
     post_id = Column(Integer, ForeignKey('Posts.id', ondelete='CASCADE'), primary_key=True)
-    added_at = Column(DateTime, default=func.now())
+    added_at = Column(UTCDateTime, default=utcnow)
 
     user = relationship('Users', back_populates='user_favourites')
     post = relationship('Posts', back_populates='user_favourites')
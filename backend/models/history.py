@@ -1,14 +1,19 @@
-from sqlalchemy import Integer, ForeignKey, Column, DateTime, func
+from sqlalchemy import Integer, ForeignKey, Column, Index
 from sqlalchemy.orm import relationship
-from database import Base
+from database import Base, utcnow, UTCDateTime
 
 
 class History(Base):
     __tablename__ = 'History'
+    __table_args__ = (
+        # Lịch sử xem phân trang theo (viewed_at, post_id)
+        Index('ix_History_user_id_viewed_at_post_id', 'user_id', 'viewed_at', 'post_id'),
+        Index('ix_History_post_id', 'post_id'),
+    )
 
     user_id = Column(Integer, ForeignKey('Users.id', ondelete='CASCADE'), primary_key=True)
     post_id = Column(Integer, ForeignKey('Posts.id', ondelete='CASCADE'), primary_key=True)
-    viewed_at = Column(DateTime, default=func.now())
+    viewed_at = Column(UTCDateTime, default=utcnow)
 
     user = relationship('Users', back_populates='user_history')
     post = relationship('Posts', back_populates='user_history')
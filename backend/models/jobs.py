@@ -0,0 +1,22 @@
+from sqlalchemy import Integer, String, Text, Column, JSON, Index
+from database import Base, utcnow, UTCDateTime
+
+
+class Jobs(Base):
+    """Hàng đợi công việc nền (xem jobs.py)."""
+    __tablename__ = 'Jobs'
+    __table_args__ = (
+        # Worker lấy việc: status = 'queued' AND run_after <= now, theo thứ tự id
+        Index('ix_Jobs_status_run_after_id', 'status', 'run_after', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default='queued')  # queued, running, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(UTCDateTime, nullable=False, default=utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(UTCDateTime, default=utcnow)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
@@ -1,17 +1,25 @@
-from sqlalchemy import Integer, Column, String, ForeignKey, Float, func, DateTime, Boolean
+from sqlalchemy import Integer, Column, String, ForeignKey, Float, Boolean, Index
 from sqlalchemy.orm import relationship
-from database import Base
+from database import Base, utcnow, UTCDateTime
 
 
 class PostComments(Base):
     __tablename__ = 'PostComments'
+    __table_args__ = (
+        # Mỗi người dùng chỉ bình luận một lần cho một bài đăng (add_comment dựa vào ràng buộc này)
+        Index('uq_PostComments_post_id_user_id', 'post_id', 'user_id', unique=True),
+        Index('ix_PostComments_post_id_status_is_report', 'post_id', 'status', 'is_report'),
+        Index('ix_PostComments_user_id_post_id', 'user_id', 'post_id'),
+        Index('ix_PostComments_status_comment_date', 'status', 'comment_date'),
+        Index('ix_PostComments_is_report_comment_date', 'is_report', 'comment_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("Posts.id", ondelete='CASCADE'))
     user_id = Column(Integer, ForeignKey('Users.id', ondelete='CASCADE'))
     rating = Column(Float, nullable=False)
     comment = Column(String, nullable=True)
-    comment_date = Column(DateTime, default=func.now())
+    comment_date = Column(UTCDateTime, default=utcnow)
     status = Column(String, default='pending')  # pending, approved, rejected
     is_report = Column(Boolean, default=False)
 
@@ -1,13 +1,21 @@
-from sqlalchemy import Integer, String, ForeignKey, Column
+from sqlalchemy import Integer, String, ForeignKey, Column, Index, JSON
 from sqlalchemy.orm import relationship
-from database import Base
+from database import Base, utcnow, UTCDateTime
 
 
 class PostImages(Base):
     __tablename__ = 'PostImages'
+    __table_args__ = (
+        Index('ix_PostImages_post_id_id', 'post_id', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("Posts.id", ondelete='CASCADE'))
     image_url = Column(String, nullable=False)
+    # Kích thước ảnh gốc và các biến thể đã tạo (xem images.py); NULL với ảnh là URL ngoài
+    width = Column(Integer)
+    height = Column(Integer)
+    variants = Column(JSON)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
 
     post = relationship("Posts", back_populates="images")
@@ -1,10 +1,24 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, func, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, Boolean, Index, text
 from sqlalchemy.orm import relationship
-from database import Base
+from database import Base, utcnow, UTCDateTime
 
 
 class Posts(Base):
     __tablename__ = 'Posts'
+    __table_args__ = (
+        # Danh sách công khai: status = 'approved' AND is_report = 0, sắp xếp theo id hoặc post_date
+        Index('ix_Posts_status_is_report_id', 'status', 'is_report', 'id'),
+        Index('ix_Posts_status_is_report_post_date', 'status', 'is_report', 'post_date'),
+        Index('ix_Posts_status_is_report_province_district_post_date',
+              'status', 'is_report', 'province', 'district', 'post_date'),
+        Index('ix_Posts_status_is_report_price', 'status', 'is_report', 'price'),
+        Index('ix_Posts_status_is_report_area', 'status', 'is_report', 'area'),
+        Index('ix_Posts_status_is_report_avg_rating', 'status', 'is_report', 'avg_rating', 'rating_count', 'id'),
+        # Trang quản trị: bài chờ duyệt / bị báo cáo
+        Index('ix_Posts_status_post_date', 'status', 'post_date'),
+        Index('ix_Posts_is_report_post_date', 'is_report', 'post_date'),
+        Index('ix_Posts_user_id', 'user_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("Users.id", ondelete='CASCADE'))
@@ -12,8 +26,17 @@ class Posts(Base):
     description = Column(Text, nullable=False)
     price = Column(Integer, nullable=False)
     room_num = Column(Integer, nullable=False)
-    avg_rating = Column(Float, nullable=True)
-    post_date = Column(DateTime, default=func.now())
+    # 0 khi chưa có đánh giá nào (rating_count = 0)
+    avg_rating = Column(Float, nullable=False, default=0, server_default=text('0'))
+    # Tổng, số lượng và phân bố số sao của các đánh giá đã duyệt, cập nhật tăng dần (xem ratings.py)
+    rating_sum = Column(Float, nullable=False, default=0, server_default=text('0'))
+    rating_count = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    stars_1 = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    stars_2 = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    stars_3 = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    stars_4 = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    stars_5 = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    post_date = Column(UTCDateTime, default=utcnow)
     views = Column(Integer, default=0)
     type = Column(String, nullable=False)
     deposit = Column(String, nullable=False)
@@ -30,10 +53,17 @@ class Posts(Base):
     area = Column(Integer, nullable=False)
     status = Column(String, default='pending')  # pending, approved, rejected
     is_report = Column(Boolean, default=False)
+    # Tọa độ, lấy từ client hoặc geocode theo quận / huyện; có index không gian riêng (xem geo.py)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    # Bitmask tiện ích, đồng bộ từ bảng Convinience (xem amenities.py)
+    amenity_mask = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow)
     
+    # passive_deletes: các dòng con được xóa bởi ON DELETE CASCADE của cơ sở dữ liệu, không nạp từng dòng
     owner = relationship('Users', back_populates='posts')
-    images = relationship('PostImages', back_populates='post', cascade='all, delete-orphan')
-    comments = relationship('PostComments', back_populates='post', cascade='all, delete-orphan')
-    user_favourites = relationship('Favourites', back_populates='post', cascade='all, delete-orphan')
-    user_history = relationship('History', back_populates='post', cascade='all, delete-orphan')
-    convinience = relationship('Convinience', back_populates='post', cascade='all, delete-orphan')
+    images = relationship('PostImages', back_populates='post', cascade='all, delete-orphan', passive_deletes=True)
+    comments = relationship('PostComments', back_populates='post', cascade='all, delete-orphan', passive_deletes=True)
+    user_favourites = relationship('Favourites', back_populates='post', cascade='all, delete-orphan', passive_deletes=True)
+    user_history = relationship('History', back_populates='post', cascade='all, delete-orphan', passive_deletes=True)
+    convinience = relationship('Convinience', back_populates='post', cascade='all, delete-orphan', passive_deletes=True)
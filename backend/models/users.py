@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, func, Boolean
+from sqlalchemy import Column, Integer, String, Date, Boolean
 from sqlalchemy.orm import relationship
-from database import Base
+from database import Base, utcnow, UTCDateTime
 
 
 class Users(Base):
@@ -15,10 +15,11 @@ class Users(Base):
     gender = Column(String, nullable=True)
     birthday = Column(Date, nullable=True)
     full_name = Column(String, nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(UTCDateTime, default=utcnow)
     is_admin = Column(Boolean, default=False)
 
-    posts = relationship('Posts', back_populates='owner', cascade='all, delete-orphan')
-    comments = relationship('PostComments', back_populates='user', cascade='all, delete-orphan')
-    user_favourites = relationship('Favourites', back_populates='user', cascade='all, delete-orphan')
-    user_history = relationship('History', back_populates='user', cascade='all, delete-orphan')
\ No newline at end of file
+    # passive_deletes: các dòng con được xóa bởi ON DELETE CASCADE của cơ sở dữ liệu, không nạp từng dòng
+    posts = relationship('Posts', back_populates='owner', cascade='all, delete-orphan', passive_deletes=True)
+    comments = relationship('PostComments', back_populates='user', cascade='all, delete-orphan', passive_deletes=True)
+    user_favourites = relationship('Favourites', back_populates='user', cascade='all, delete-orphan', passive_deletes=True)
+    user_history = relationship('History', back_populates='user', cascade='all, delete-orphan', passive_deletes=True)
\ No newline at end of file
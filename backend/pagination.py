@@ -0,0 +1,83 @@
+"""
+Phân trang theo con trỏ (keyset pagination).
+
+Thay vì OFFSET (SQLite phải duyệt rồi bỏ qua mọi dòng phía trước), trang tiếp theo được
+lọc bằng giá trị khóa sắp xếp của dòng cuối cùng ở trang trước, ví dụ (post_date, id).
+Con trỏ trả cho client là chuỗi base64 mờ (opaque), client chỉ cần gửi lại nguyên văn.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, desc
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    payload = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _is_datetime(column):
+    try:
+        return column.type.python_type is datetime
+    except NotImplementedError:
+        # Cột tính toán không có kiểu (vd: điểm bm25)
+        return False
+
+
+def decode_cursor(cursor, columns):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor(cursor)
+        return [
+            datetime.fromisoformat(value) if _is_datetime(column) and value is not None else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(cursor)
+
+
+def after_cursor(columns, values, descending=True):
+    """(a, b) < (x, y)  <=>  a < x OR (a = x AND b < y), viết dạng OR để dùng được index."""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def paginate(query, columns, limit, cursor=None, offset=0, descending=True):
+    """
+    Sắp xếp query theo columns và cắt trang.
+    Có cursor thì lọc theo keyset, không có thì dùng offset như cũ.
+    """
+    query = query.order_by(*[desc(column) if descending else column for column in columns])
+    if cursor:
+        query = query.where(after_cursor(columns, decode_cursor(cursor, columns), descending))
+    elif offset:
+        query = query.offset(offset)
+    return query.limit(limit)
+
+
+def next_cursor(rows, columns, limit, key=None):
+    """
+    Con trỏ của trang kế tiếp, hoặc None nếu đây là trang cuối.
+    key(row) trả về giá trị các khóa sắp xếp khi row không có sẵn thuộc tính trùng tên cột.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if key is not None:
+        return encode_cursor(key(last))
+    return encode_cursor([getattr(last, column.key) for column in columns])
@@ -0,0 +1,196 @@
+"""
+Các truy vấn đọc của endpoint trong api.py, tách khỏi endpoint để migrate.py verify kiểm tra
+kế hoạch truy vấn (EXPLAIN QUERY PLAN) trên đúng các truy vấn ứng dụng chạy.
+
+Mỗi hàm chỉ dựng câu SELECT, không chạy; endpoint tự thực thi và định dạng kết quả.
+"""
+from sqlalchemy import desc, func, select
+
+from fulltext import ranked_matches
+from filters import sort_order
+from pagination import paginate
+from ratings import STARS
+from amenities import AMENITY_FIELDS
+from auth import Principal
+from schemas import columns_of, UserOut, OwnerOut, PostOut, CommentOut, ImageOut, ConvenienceOut
+from models.users import Users
+from models.posts import Posts
+from models.favourites import Favourites
+from models.postComments import PostComments
+from models.postImages import PostImages
+from models.history import History
+from models.convinience import Convinience
+
+# Khóa sắp xếp dùng cho phân trang theo con trỏ
+POST_ID_ORDER = [Posts.id]
+FAVOURITE_ORDER = [Favourites.added_at, Favourites.post_id]
+HISTORY_ORDER = [History.viewed_at, History.post_id]
+USER_ORDER = [Users.id]
+
+# Các cột được đọc cho từng kiểu phản hồi (xem schemas.py)
+USER_COLUMNS = columns_of(UserOut, Users)
+PRINCIPAL_COLUMNS = [getattr(Users, name) for name in Principal._fields]
+POST_COLUMNS = columns_of(PostOut, Posts)
+COMMENT_COLUMNS = columns_of(CommentOut, PostComments)
+COMMENT_USER_COLUMNS = [Users.full_name.label("user_full_name"), Users.avatar_url.label("user_avatar_url")]
+RATING_COLUMNS = [getattr(Posts, f"stars_{star}") for star in STARS]
+IMAGE_COLUMNS = columns_of(ImageOut, PostImages)
+CONVENIENCE_COLUMNS = columns_of(ConvenienceOut, Convinience)
+OWNER_COLUMNS = [column.label(f"owner_{column.key}") for column in columns_of(OwnerOut, Users)]
+CARD_CONVENIENCE_COLUMNS = [
+    Convinience.id.label("convenience_id"), *[getattr(Convinience, key) for key in AMENITY_FIELDS]
+]
+
+
+def post_columns(names, order=()):
+    """Các cột bài đăng được chọn bằng fields=, thêm các cột sắp xếp còn thiếu (next_cursor cần đọc)."""
+    columns = [getattr(Posts, name) for name in names]
+    return columns + [column for column in order if column.key not in names]
+
+
+def card_query(names, order=()):
+    """Truy vấn thẻ bài đăng: các cột names, chủ nhà và tiện ích (tối đa một dòng Convinience mỗi bài)."""
+    return (
+        select(*post_columns(names, order), *OWNER_COLUMNS, *CARD_CONVENIENCE_COLUMNS)
+        .outerjoin(Users, Users.id == Posts.user_id)
+        .outerjoin(Convinience, Convinience.post_id == Posts.id)
+    )
+
+
+def search_page(query, q, limit, cursor=None, offset=0, distance=None, sort=None):
+    """
+    Phân trang truy vấn tìm kiếm đã lọc theo thứ tự sort (xem filters.SORTS). Trả về
+    (truy vấn, khóa sắp xếp); lỗi con trỏ ném InvalidCursor.
+    Không chọn sort thì có distance sắp xếp theo khoảng cách gần nhất, có q theo độ liên quan
+    BM25, còn lại theo bài mới nhất; q không dùng để sắp xếp thì chỉ dùng để lọc.
+    query phải chọn sẵn các cột của sort_order(sort) (next_cursor cần đọc).
+    """
+    ranked = ranked_matches(q) if q else None
+    if distance is not None:
+        query = query.add_columns(distance)
+    if sort is None and distance is not None:
+        order, descending = [distance, Posts.id], False
+    elif sort is None and ranked is not None:
+        order, descending = [ranked.c.rank, Posts.id], False
+        query = query.add_columns(ranked.c.rank).join(ranked, ranked.c.post_id == Posts.id)
+        ranked = None
+    else:
+        order, descending = sort_order(sort)
+    if ranked is not None:
+        query = query.where(Posts.id.in_(select(ranked.c.post_id)))
+    return paginate(query, order, limit, cursor, offset, descending=descending), order
+
+
+def cover_images_query(post_ids):
+    """Ảnh đại diện (ảnh có id nhỏ nhất) của các bài đăng: (post_id, image_url, variants)."""
+    first_image_ids = (
+        select(func.min(PostImages.id))
+        .where(PostImages.post_id.in_(post_ids))
+        .group_by(PostImages.post_id)
+    )
+    return select(PostImages.post_id, PostImages.image_url, PostImages.variants).where(
+        PostImages.id.in_(first_image_ids)
+    )
+
+
+def list_posts_query(names, limit, cursor=None, offset=0):
+    """Danh sách bài đăng công khai theo id tăng dần (/get-list-of-posts)."""
+    return paginate(
+        select(*post_columns(names, POST_ID_ORDER))
+        .where(Posts.status == 'approved')
+        .where(Posts.is_report == False),
+        POST_ID_ORDER, limit, cursor, offset
+    )
+
+
+def user_posts_query(user_id, names):
+    return select(*post_columns(names)).where(Posts.user_id == user_id)
+
+
+def post_query(post_id):
+    return select(*POST_COLUMNS).where(Posts.id == post_id)
+
+
+def post_detail_query(post_id):
+    """Bài đăng kèm phân bố số sao và chủ nhà (/posts/{post_id}/full)."""
+    return (
+        select(*POST_COLUMNS, *RATING_COLUMNS, *OWNER_COLUMNS)
+        .outerjoin(Users, Users.id == Posts.user_id)
+        .where(Posts.id == post_id)
+    )
+
+
+def post_images_query(post_id):
+    return select(*IMAGE_COLUMNS).where(PostImages.post_id == post_id).order_by(PostImages.id)
+
+
+def post_convenience_query(post_id):
+    return select(*CONVENIENCE_COLUMNS).where(Convinience.post_id == post_id)
+
+
+def post_comments_query(post_id):
+    """Bình luận đã duyệt, không bị báo cáo của một bài đăng."""
+    return (
+        select(*COMMENT_COLUMNS)
+        .where(PostComments.post_id == post_id)
+        .where(PostComments.status == 'approved')
+        .where(PostComments.is_report == False)
+    )
+
+
+def comment_thread_query(post_id):
+    """Như post_comments_query, kèm tên người viết, mới nhất trước (/posts/{post_id}/full)."""
+    return (
+        post_comments_query(post_id)
+        .add_columns(*COMMENT_USER_COLUMNS)
+        .outerjoin(Users, Users.id == PostComments.user_id)
+        .order_by(desc(PostComments.comment_date), desc(PostComments.id))
+    )
+
+
+def list_users_query(limit, cursor=None, offset=0):
+    return paginate(select(*USER_COLUMNS), USER_ORDER, limit, cursor, offset, descending=False)
+
+
+def user_by_email_query(email):
+    return select(Users).where(Users.email == email)
+
+
+def favourites_query(user_id, names, limit, cursor=None, offset=0):
+    """Thẻ các bài đăng yêu thích của người dùng, mới thêm nhất trước."""
+    query = card_query(names, FAVOURITE_ORDER).join(Favourites, Posts.id == Favourites.post_id).where(
+        Favourites.user_id == user_id
+    )
+    return paginate(query, FAVOURITE_ORDER, limit, cursor, offset)
+
+
+def favourite_ids_query(user_id):
+    return select(Favourites.post_id).where(Favourites.user_id == user_id)
+
+
+def history_query(user_id, names, limit, cursor=None, offset=0):
+    """Thẻ các bài đăng người dùng đã xem, mới xem nhất trước."""
+    query = card_query(names, HISTORY_ORDER).join(History, Posts.id == History.post_id).where(
+        History.user_id == user_id
+    )
+    return paginate(query, HISTORY_ORDER, limit, cursor, offset)
+
+
+def admin_posts_query(condition):
+    """Bài đăng thỏa condition kèm email người đăng, mới nhất trước (trang quản trị)."""
+    return (
+        select(*POST_COLUMNS, Users.email.label("user_email"))
+        .join(Users, Posts.user_id == Users.id)
+        .where(condition)
+        .order_by(desc(Posts.post_date))
+    )
+
+
+def admin_comments_query(condition):
+    """Bình luận thỏa condition kèm email người viết, mới nhất trước (trang quản trị)."""
+    return (
+        select(*COMMENT_COLUMNS, Users.email.label("user_email"))
+        .join(Users, PostComments.user_id == Users.id)
+        .where(condition)
+        .order_by(desc(PostComments.comment_date))
+    )
@@ -0,0 +1,96 @@
+"""
+Điểm đánh giá của bài đăng, cập nhật tăng dần.
+
+Posts lưu rating_sum / rating_count và phân bố số sao stars_1..stars_5 của các bình luận đã
+được duyệt (status = 'approved'). Mỗi lần một bình luận được duyệt, từ chối, sửa hoặc xóa,
+endpoint cộng / trừ phần chênh lệch bằng một câu UPDATE trong cùng transaction, nên không
+phải chạy AVG(rating) trên PostComments. avg_rating = rating_sum / rating_count (0 khi chưa có
+đánh giá) được cập nhật cùng lúc để các client cũ vẫn đọc được và để sắp xếp theo index.
+"""
+import math
+from collections import defaultdict
+
+from sqlalchemy import update, func, text
+
+from models.posts import Posts
+
+STARS = range(1, 6)
+
+
+def stars(rating):
+    """Số sao (1..5) của một điểm đánh giá, làm tròn 4.5 -> 5."""
+    return min(5, max(1, math.floor(rating + 0.5)))
+
+
+def is_counted(comment):
+    """Bình luận có được tính vào điểm của bài đăng không."""
+    return comment.status == 'approved'
+
+
+def rating_change(post_id, removed=(), added=()):
+    """
+    Câu UPDATE áp dụng chênh lệch khi bỏ các điểm removed và thêm các điểm added vào bài
+    post_id, hoặc None nếu không có gì thay đổi.
+    """
+    if not removed and not added:
+        return None
+    delta_sum = sum(added) - sum(removed)
+    delta_count = len(added) - len(removed)
+    delta_stars = defaultdict(int)
+    for rating in added:
+        delta_stars[stars(rating)] += 1
+    for rating in removed:
+        delta_stars[stars(rating)] -= 1
+
+    # Vế phải của SET đọc giá trị cũ của hàng nên avg_rating tính từ giá trị cũ + chênh lệch
+    new_sum = Posts.rating_sum + delta_sum
+    new_count = Posts.rating_count + delta_count
+    values = {
+        "rating_sum": new_sum,
+        "rating_count": new_count,
+        "avg_rating": func.coalesce(new_sum / func.nullif(new_count, 0), 0),
+    }
+    for star, delta in delta_stars.items():
+        if delta:
+            column = getattr(Posts, f"stars_{star}")
+            values[column.key] = column + delta
+    return update(Posts).where(Posts.id == post_id).values(**values)
+
+
+def histogram(post):
+    return {star: getattr(post, f"stars_{star}") for star in STARS}
+
+
+def summary(post):
+    return {
+        "avg_rating": post.avg_rating,
+        "rating_count": post.rating_count,
+        "histogram": histogram(post),
+    }
+
+
+def _stars_sql(dialect):
+    """Biểu thức SQL tương đương stars(a.rating)."""
+    if dialect == "postgresql":
+        return "LEAST(5, GREATEST(1, FLOOR(a.rating + 0.5)))"
+    # CAST của SQLite cắt phần thập phân, với số dương tương đương FLOOR
+    return "MIN(5, MAX(1, CAST(a.rating + 0.5 AS INTEGER)))"
+
+
+def backfill_ratings(connection, after=None, until=None):
+    """Tính lại điểm từ các bình luận đã được duyệt, của mọi bài đăng hoặc các id trong (after, until]."""
+    stars_sql = _stars_sql(connection.dialect.name)
+    buckets = ", ".join(
+        f"stars_{star} = COALESCE((SELECT COUNT(*) FROM approved a WHERE a.post_id = \"Posts\".id "
+        f"AND {stars_sql} = {star}), 0)"
+        for star in STARS
+    )
+    where = ' WHERE "Posts".id > :after AND "Posts".id <= :until' if after is not None else ""
+    connection.execute(text(
+        'WITH approved AS (SELECT post_id, rating FROM "PostComments" WHERE status = \'approved\') '
+        'UPDATE "Posts" SET '
+        'rating_sum = COALESCE((SELECT SUM(rating) FROM approved a WHERE a.post_id = "Posts".id), 0), '
+        'rating_count = (SELECT COUNT(*) FROM approved a WHERE a.post_id = "Posts".id), '
+        'avg_rating = COALESCE((SELECT AVG(rating) FROM approved a WHERE a.post_id = "Posts".id), 0), '
+        f'{buckets}' + where
+    ), {"after": after, "until": until})
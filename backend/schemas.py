@@ -0,0 +1,393 @@
+"""
+Kiểu dữ liệu của các phản hồi API.
+
+Mỗi endpoint khai báo response_model bằng các lớp dưới đây: FastAPI kiểm tra và chuyển phản
+hồi thẳng thành JSON bằng pydantic-core, không đi qua jsonable_encoder, và chỉ những trường
+được khai báo mới được trả về (không lộ password, _sa_instance_state hay các cột nội bộ như
+amenity_mask, rating_sum, stars_1..5).
+
+Các lớp có from_attributes nên nhận được cả đối tượng ORM lẫn dòng kết quả của
+select(*columns_of(Schema, Model)); các endpoint danh sách chỉ đọc đúng những cột đó thay vì
+tải cả đối tượng ORM.
+
+Các endpoint danh sách bài đăng nhận tham số fields= (xem post_fields): chỉ những cột được chọn
+có trong câu SELECT, và PostFields (mọi trường đều tùy chọn) cùng response_model_exclude_unset
+chỉ trả về đúng những trường đó.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+
+class Schema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+def columns_of(schema, model):
+    """Các cột của model có trong schema, theo thứ tự khai báo của schema."""
+    table = model.__table__
+    return [getattr(model, name) for name in schema.model_fields if name in table.c]
+
+
+# ----- Dữ liệu -----
+class UserOut(Schema):
+    id: int
+    email: Optional[str]
+    avatar_url: Optional[str]
+    contact_number: Optional[str]
+    address: Optional[str]
+    gender: Optional[str]
+    birthday: Optional[date]
+    full_name: Optional[str]
+    created_at: Optional[datetime]
+    is_admin: Optional[bool]
+
+
+class OwnerOut(Schema):
+    id: int
+    full_name: Optional[str]
+    contact_number: Optional[str]
+    avatar_url: Optional[str]
+
+
+class PostOut(Schema):
+    id: int
+    user_id: Optional[int]
+    title: Optional[str]
+    description: Optional[str]
+    price: Optional[int]
+    room_num: Optional[int]
+    area: Optional[int]
+    type: Optional[str]
+    deposit: Optional[str]
+    electricity_fee: Optional[int]
+    water_fee: Optional[int]
+    internet_fee: Optional[int]
+    vehicle_fee: Optional[int]
+    floor_num: Optional[str]
+    province: Optional[str]
+    district: Optional[str]
+    rural: Optional[str]
+    street: Optional[str]
+    detailed_address: Optional[str]
+    avg_rating: Optional[float]
+    rating_count: Optional[int]
+    views: Optional[int]
+    post_date: Optional[datetime]
+    status: Optional[str]
+    is_report: Optional[bool]
+    updated_at: Optional[datetime]
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+
+# Bài đăng chỉ gồm các trường được chọn bằng fields=; distance_km chỉ có khi tìm theo bán kính
+PostFields = create_model(
+    "PostFields", __base__=Schema,
+    **{name: (field.annotation, None) for name, field in PostOut.model_fields.items()},
+    distance_km=(Optional[float], None),
+)
+
+POST_FIELDSETS = {
+    # Thẻ bài đăng trong danh sách và kết quả tìm kiếm: không có description và các khoản phí
+    "card": [
+        "id", "user_id", "title", "price", "area", "room_num", "type", "province", "district", "rural",
+        "avg_rating", "rating_count", "views", "post_date", "status", "latitude", "longitude",
+    ],
+    "full": list(PostOut.model_fields),
+}
+
+
+def _field_names(fields):
+    return [name.strip() for name in fields.split(",") if name.strip()]
+
+
+def unknown_fields(fields):
+    if not fields:
+        return []
+    return [
+        name for name in _field_names(fields)
+        if name not in POST_FIELDSETS and name not in PostOut.model_fields
+    ]
+
+
+def post_fields(fields, default="card"):
+    """
+    Tên các trường bài đăng theo tham số fields=: tên một bộ trường trong POST_FIELDSETS, các tên
+    trường cách nhau bởi dấu phẩy, hoặc cả hai (vd: card,description). Luôn có id.
+    """
+    names = ["id"]
+    for name in _field_names(fields or default):
+        for field in POST_FIELDSETS.get(name, [name]):
+            if field not in names:
+                names.append(field)
+    return names
+
+
+class AdminPost(PostOut):
+    user_email: Optional[str]
+
+
+class PostCard(PostFields):
+    convenience: Optional[Dict[str, bool]]
+    cover_image: Optional[str]
+    owner: Optional[OwnerOut]
+
+
+class CommentOut(Schema):
+    id: int
+    post_id: Optional[int]
+    user_id: Optional[int]
+    rating: Optional[float]
+    comment: Optional[str]
+    comment_date: Optional[datetime]
+    status: Optional[str]
+    is_report: Optional[bool]
+
+
+class AdminComment(CommentOut):
+    user_email: Optional[str]
+
+
+class PostComment(CommentOut):
+    """Bình luận kèm tên và ảnh đại diện của người viết."""
+    user_full_name: Optional[str]
+    user_avatar_url: Optional[str]
+
+
+class ImageOut(Schema):
+    id: int
+    post_id: Optional[int]
+    image_url: str
+    width: Optional[int]
+    height: Optional[int]
+    variants: Optional[Dict[str, Any]]
+    updated_at: Optional[datetime]
+
+
+class ConvenienceOut(Schema):
+    id: int
+    post_id: Optional[int]
+    wifi: Optional[bool]
+    air_conditioner: Optional[bool]
+    fridge: Optional[bool]
+    washing_machine: Optional[bool]
+    parking_lot: Optional[bool]
+    security: Optional[bool]
+    kitchen: Optional[bool]
+    private_bathroom: Optional[bool]
+    furniture: Optional[bool]
+    bacony: Optional[bool]
+    elevator: Optional[bool]
+    pet_allowed: Optional[bool]
+    updated_at: Optional[datetime]
+
+
+class FavouriteOut(Schema):
+    user_id: int
+    post_id: int
+    added_at: Optional[datetime]
+
+
+class FavouriteItem(FavouriteOut):
+    post: PostCard
+
+
+class HistoryItem(Schema):
+    post: PostCard
+    viewed_at: Optional[datetime]
+
+
+class Facets(Schema):
+    """Số bài đăng theo từng giá trị của mỗi bộ lọc (xem facets.py)."""
+    province: Dict[str, int]
+    district: Dict[str, int]
+    type: Dict[str, int]
+    room_num: Dict[str, int]
+    price: Dict[str, int]
+    amenities: Dict[str, int]
+
+
+class RatingOut(Schema):
+    avg_rating: Optional[float]
+    rating_count: int
+    histogram: Dict[int, int]
+
+
+class UserStats(Schema):
+    posts_count: int
+    comments_count: int
+    favorites_count: int
+    history_count: int
+
+
+class JobOut(Schema):
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: Optional[datetime]
+    last_error: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+class JobStats(Schema):
+    workers: int
+    depth: Dict[str, Dict[str, int]]
+    oldest_queued_seconds: Optional[float]
+    failures: List[JobOut]
+
+
+# ----- Phản hồi -----
+class Message(Schema):
+    """Phản hồi chỉ có trạng thái và thông báo."""
+    status: str
+    message: str
+
+
+class Fail(Message):
+    status: Literal["fail", "error"]
+
+
+class Success(Schema):
+    status: Literal["success"]
+
+
+class UserResult(Success):
+    user: UserOut
+
+
+class UserSaved(UserResult):
+    message: str
+
+
+class LoginResult(UserResult):
+    access_token: str
+    token_type: str
+    expires_in: int
+
+
+class UserPage(Success):
+    users: List[UserOut]
+    count: int
+    next_cursor: Optional[str]
+
+
+class PostResult(Success):
+    post: PostOut
+
+
+class PostSaved(PostResult):
+    message: str
+
+
+class PostDetail(Success):
+    """Toàn bộ dữ liệu của trang chi tiết bài đăng."""
+    post: PostOut
+    owner: Optional[OwnerOut]
+    images: List[ImageOut]
+    convenience: Optional[ConvenienceOut]
+    comments: List[PostComment]
+    rating: RatingOut
+
+
+class PostList(Success):
+    posts: List[PostFields]
+
+
+class PostPage(Success):
+    posts: List[PostFields]
+    next_cursor: Optional[str]
+
+
+class SearchPage(PostPage):
+    count: int
+    facets: Optional[Facets] = None
+
+
+class FilterPage(SearchPage):
+    amenity_counts: Optional[Dict[str, int]] = None
+
+
+class PostCardPage(Success):
+    posts: List[PostCard]
+    count: int
+    next_cursor: Optional[str]
+    amenity_counts: Optional[Dict[str, int]] = None
+    facets: Optional[Facets] = None
+
+
+class ImageSaved(Success):
+    message: str
+    image: ImageOut
+
+
+class ImagesQueued(Success):
+    message: str
+    queued: int
+    skipped: int
+
+
+class ImageList(Success):
+    images: List[ImageOut]
+
+
+class CommentSaved(Success):
+    message: str
+    comment: CommentOut
+
+
+class CommentList(Success):
+    comments: List[CommentOut]
+
+
+class RatingResult(Success):
+    rating: RatingOut
+
+
+class FavouriteList(Success):
+    favourites: List[FavouriteItem]
+    next_cursor: Optional[str]
+
+
+class FavouriteIds(Success):
+    post_ids: List[int]
+
+
+class HistoryList(Success):
+    history: List[HistoryItem]
+    next_cursor: Optional[str]
+
+
+class ConvenienceResult(Success):
+    convenience: ConvenienceOut
+
+
+class ConvenienceSaved(ConvenienceResult):
+    message: str
+
+
+class StatsResult(Success):
+    stats: UserStats
+
+
+class AdminPostList(Success):
+    posts: List[AdminPost]
+
+
+class AdminCommentList(Success):
+    comments: List[AdminComment]
+
+
+class CacheStatsResult(Success):
+    cache: Dict[str, Any]
+
+
+class JobsResult(Success):
+    jobs: JobStats
+    views: Dict[str, int]
+    backfill: Dict[str, Any]
@@ -0,0 +1,121 @@
+"""
+Cấu hình chung của bộ test: mỗi lần chạy dùng một bản sao của app.db trong thư mục tạm, được
+ứng dụng chạy hết migration và backfill khi khởi động như khi triển khai, nên test không sửa app.db.
+
+Chạy từ thư mục backend: python -m pytest -q tests
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="nhatro-tests-")
+DB_PATH = os.path.join(WORK_DIR, "app.db")
+
+# Phải đặt trước khi import các module của ứng dụng (config đọc biến môi trường lúc import)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+os.environ.setdefault("AUTH_SECRET", "test-secret")
+os.environ.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+os.environ["RATE_LIMIT_BACKEND"] = "off"
+os.environ["UPLOAD_DIR"] = os.path.join(WORK_DIR, "uploads")
+os.environ["UPLOAD_PENDING_DIR"] = os.path.join(WORK_DIR, "uploads-pending")
+sys.path.insert(0, BACKEND_DIR)
+shutil.copy(os.path.join(BACKEND_DIR, "app.db"), DB_PATH)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+import migrations
+
+
+def _wait_for_backfills(engine, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with engine.connect() as connection:
+            if not migrations.pending_backfills(connection):
+                return
+        time.sleep(0.05)
+    raise TimeoutError("backfills did not finish")
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient của api.app; khi khởi động ứng dụng tự chạy migration trên bản sao app.db."""
+    import api
+
+    with TestClient(api.app) as client:
+        engine = create_engine(f"sqlite:///{DB_PATH}")
+        _wait_for_backfills(engine)
+        engine.dispose()
+        yield client
+
+
+@pytest.fixture
+def connection(client):
+    """Kết nối đồng bộ tới cơ sở dữ liệu của client, mọi thay đổi bị hoàn tác sau test."""
+    engine = create_engine(f"sqlite:///{DB_PATH}")
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        yield connection
+        transaction.rollback()
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    """Header Authorization của một tài khoản admin có sẵn trong app.db."""
+    from auth import create_token
+
+    db = sqlite3.connect(DB_PATH)
+    admin_id = db.execute('SELECT id FROM "Users" WHERE is_admin ORDER BY id LIMIT 1').fetchone()[0]
+    db.close()
+    return {"Authorization": f"Bearer {create_token(admin_id)}"}
+
+
+UPDATE_POST_FIELDS = (
+    "title", "description", "price", "room_num", "type", "deposit", "electricity_fee", "water_fee",
+    "internet_fee", "vehicle_fee", "province", "district", "rural", "street", "detailed_address",
+    "floor_num", "latitude", "longitude",
+)
+
+
+def update_post(client, post_id, **changes):
+    """Gửi lại các trường hiện tại của bài đăng qua /update-post, trường trong changes được biến đổi."""
+    post = client.get("/get-post-by-id", params={"post_id": post_id}).json()["post"]
+    update = {name: post[name] for name in UPDATE_POST_FIELDS if post.get(name) is not None}
+    update.update({name: change(post[name]) for name, change in changes.items()})
+    assert client.put(f"/update-post/{post_id}", params=update).json()["status"] == "success"
+    return update
+
+
+def restore_duplicates(path):
+    """
+    Đưa các bình luận trùng mà migrate.py dedupe đã chuyển sang PostCommentsArchive trong app.db
+    về lại PostComments của bản sao tại path: trạng thái của database cũ trước khi dedupe.
+    """
+    db = sqlite3.connect(path)
+    with db:
+        names = ", ".join(f'"{row[1]}"' for row in db.execute('PRAGMA table_info("PostComments")'))
+        db.execute(f'INSERT INTO "PostComments" ({names}) SELECT {names} FROM "PostCommentsArchive"')
+        db.execute('DROP TABLE "PostCommentsArchive"')
+    db.close()
+
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    """Engine đồng bộ trên một bản sao khác của app.db còn các dòng trùng, chưa chạy migration."""
+    path = tmp_path / "app.db"
+    shutil.copy(os.path.join(BACKEND_DIR, "app.db"), path)
+    restore_duplicates(path)
+    engine = create_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+
+from auth import create_token, is_hashed
+from conftest import DB_PATH
+
+
+def _admin_routes(client):
+    routes = []
+    for route in client.app.routes:
+        if route.path.startswith("/admin/"):
+            path = route.path.replace("{post_id}", "1").replace("{comment_id}", "1")
+            path = path.replace("{job_id}", "1").replace("{user_id}", "1")
+            routes += [(method, path) for method in route.methods]
+    return routes
+
+
+@pytest.fixture
+def tokens(connection):
+    admin_id = connection.execute(text('SELECT id FROM "Users" WHERE is_admin ORDER BY id LIMIT 1')).scalar()
+    user_id = connection.execute(
+        text('SELECT id FROM "Users" WHERE NOT is_admin OR is_admin IS NULL ORDER BY id LIMIT 1')
+    ).scalar()
+    return {"admin": create_token(admin_id), "user": create_token(user_id)}
+
+
+def test_admin_routes_are_listed(client):
+    paths = {path for _, path in _admin_routes(client)}
+    assert {"/admin/pending-posts", "/admin/make-admin/1", "/admin/cache-stats"} <= paths
+
+
+def test_admin_routes_require_token(client):
+    for method, path in _admin_routes(client):
+        assert client.request(method, path).status_code == 401, path
+        response = client.request(method, path, headers={"Authorization": "Bearer not-a-token"})
+        assert response.status_code == 401, path
+        response = client.request(method, path, headers={"Authorization": "Basic abc"})
+        assert response.status_code == 401, path
+
+
+def test_admin_routes_reject_non_admin(client, tokens):
+    headers = {"Authorization": f"Bearer {tokens['user']}"}
+    for method, path in _admin_routes(client):
+        assert client.request(method, path, headers=headers).status_code == 403, path
+
+
+def test_admin_routes_accept_admin(client, tokens):
+    headers = {"Authorization": f"Bearer {tokens['admin']}"}
+    for method, path in _admin_routes(client):
+        if method == "GET":
+            response = client.get(path, headers=headers)
+            assert response.status_code == 200, path
+            assert response.json()["status"] == "success", path
+
+
+def test_login_rehashes_plaintext_password(client):
+    email = "rehash@example.com"
+    assert client.post("/signup", params={"email": email, "password": "secret"}).json()["status"] == "success"
+    # Mật khẩu cũ lưu dạng văn bản thường
+    with sqlite3.connect(DB_PATH) as db:
+        db.execute('UPDATE "Users" SET password = ? WHERE email = ?', ("secret", email))
+
+    body = client.get("/login", params={"email": email, "password": "secret"}).json()
+    assert body["status"] == "success"
+    assert body["token_type"] == "bearer" and body["access_token"]
+    with sqlite3.connect(DB_PATH) as db:
+        stored = db.execute('SELECT password FROM "Users" WHERE email = ?', (email,)).fetchone()[0]
+    assert is_hashed(stored)
+
+    assert client.get("/login", params={"email": email, "password": "secret"}).json()["status"] == "success"
+    assert client.get("/login", params={"email": email, "password": "wrong"}).json() == {
+        "status": "fail", "message": "Invalid username or password"
+    }
+
+
+def test_update_user_changes_password(client):
+    email = "update@example.com"
+    user = client.post("/signup", params={"email": email, "password": "old"}).json()["user"]
+    body = client.put("/update-user", params={"user_id": user["id"], "password": "new", "full_name": "Updated"}).json()
+    assert body["status"] == "success" and body["user"]["full_name"] == "Updated"
+    assert client.get("/login", params={"email": email, "password": "new"}).json()["status"] == "success"
+    assert client.get("/login", params={"email": email, "password": "old"}).json()["status"] == "fail"
+
+
+def test_token_of_unknown_user_is_rejected(client):
+    missing = client.get("/admin/cache-stats", headers={"Authorization": f"Bearer {create_token(10 ** 9)}"})
+    assert missing.status_code == 401
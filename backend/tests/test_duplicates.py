@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import text
+
+import migrations
+from duplicates import count_duplicates, archive_duplicates
+
+
+def _duplicate_keys(connection):
+    return connection.execute(text(
+        'SELECT post_id, user_id FROM "PostComments" WHERE post_id IS NOT NULL AND user_id IS NOT NULL '
+        "GROUP BY post_id, user_id HAVING COUNT(*) > 1"
+    )).all()
+
+
+def test_migration_refuses_to_run_with_duplicates(fresh_engine):
+    with fresh_engine.connect() as connection:
+        assert count_duplicates(connection)["PostComments"] > 0
+        comments = connection.execute(text('SELECT COUNT(*) FROM "PostComments"')).scalar()
+
+    with pytest.raises(migrations.MigrationBlocked, match="migrate.py dedupe"):
+        with fresh_engine.begin() as connection:
+            migrations.upgrade(connection)
+
+    # Không migration nào được ghi nhận, không dòng nào bị xóa
+    with fresh_engine.connect() as connection:
+        assert migrations.applied(connection) == {}
+        assert connection.execute(text('SELECT COUNT(*) FROM "PostComments"')).scalar() == comments
+
+
+def test_archive_then_migrate(fresh_engine):
+    with fresh_engine.connect() as connection:
+        duplicates = count_duplicates(connection)
+        comments = connection.execute(text('SELECT COUNT(*) FROM "PostComments"')).scalar()
+        ids = set(connection.execute(text('SELECT id FROM "PostComments"')).scalars())
+
+    with fresh_engine.begin() as connection:
+        assert archive_duplicates(connection) == duplicates
+
+    with fresh_engine.connect() as connection:
+        assert count_duplicates(connection) == {}
+        assert _duplicate_keys(connection) == []
+        kept = set(connection.execute(text('SELECT id FROM "PostComments"')).scalars())
+        archived = set(connection.execute(text('SELECT id FROM "PostCommentsArchive"')).scalars())
+        # Mọi bình luận vẫn còn, ở bảng gốc hoặc bảng lưu trữ
+        assert len(kept) + len(archived) == comments
+        assert kept | archived == ids and not kept & archived
+        assert connection.execute(text('SELECT COUNT(*) FROM "PostCommentsArchive" WHERE archived_at IS NULL')).scalar() == 0
+        # Bình luận được giữ lại là bình luận đã duyệt nếu cặp (bài đăng, người dùng) có một bình luận như vậy
+        lost_approval = connection.execute(text(
+            'SELECT COUNT(*) FROM "PostCommentsArchive" a JOIN "PostComments" c '
+            "ON c.post_id = a.post_id AND c.user_id = a.user_id "
+            "WHERE a.status = 'approved' AND c.status != 'approved'"
+        )).scalar()
+        assert lost_approval == 0
+
+    with fresh_engine.begin() as connection:
+        assert archive_duplicates(connection) == {}
+        migrations.upgrade(connection)
+        assert not migrations.pending(connection)
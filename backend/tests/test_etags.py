@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from cache import cache
+from conftest import update_post
+
+
+@pytest.fixture
+def post_id(connection):
+    """Bài đăng có cả ảnh và tiện ích."""
+    return connection.execute(text(
+        'SELECT id FROM "Posts" p WHERE EXISTS (SELECT 1 FROM "PostImages" i WHERE i.post_id = p.id) '
+        'AND EXISTS (SELECT 1 FROM "Convinience" c WHERE c.post_id = p.id) ORDER BY id DESC LIMIT 1'
+    )).scalar()
+
+
+def _assert_revalidates(client, path, params=None):
+    """Kiểm tra 304 khi If-None-Match trùng ETag, 200 khi không trùng. Trả về ETag hiện tại."""
+    first = client.get(path, params=params)
+    assert first.status_code == 200 and first.json()["status"] == "success"
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"]
+
+    # 304 khi phản hồi lấy từ cache và cả khi validator được đọc lại từ cơ sở dữ liệu
+    hits = cache.stats.hits
+    cached = client.get(path, params=params, headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b"" and cached.headers["etag"] == etag
+    assert cache.stats.hits == hits + 1
+    asyncio.run(cache.clear())
+    revalidated = client.get(path, params=params, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.headers["etag"] == etag
+
+    stale = client.get(path, params=params, headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200 and stale.json() == first.json()
+    return etag
+
+
+def _assert_changed(client, path, old_etag, params=None):
+    response = client.get(path, params=params, headers={"If-None-Match": old_etag})
+    assert response.status_code == 200 and response.json()["status"] == "success"
+    assert response.headers["etag"] != old_etag
+    assert client.get(path, params=params, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    return response.json()
+
+
+def test_post_etag(client, post_id):
+    path, params = "/get-post-by-id", {"post_id": post_id}
+    etag = _assert_revalidates(client, path, params)
+    title = update_post(client, post_id, title=lambda title: title + " (sửa)")["title"]
+    assert _assert_changed(client, path, etag, params)["post"]["title"] == title
+
+
+def test_list_etag(client):
+    params = {"limit": 5}
+    etag = _assert_revalidates(client, "/get-list-of-posts", params)
+    first = client.get("/get-list-of-posts", params=params).json()["posts"][0]["id"]
+    update_post(client, first, price=lambda price: price + 1)
+    _assert_changed(client, "/get-list-of-posts", etag, params)
+
+
+def test_images_etag(client, post_id):
+    path = f"/get-post-images/{post_id}"
+    etag = _assert_revalidates(client, path)
+    added = client.post("/add-post-image", params={"post_id": post_id, "image_url": "https://example.com/new.jpg"})
+    assert added.json()["status"] == "success"
+    images = _assert_changed(client, path, etag)["images"]
+    assert "https://example.com/new.jpg" in [image["image_url"] for image in images]
+
+
+def test_convenience_etag(client, post_id):
+    path = f"/get-post-convenience/{post_id}"
+    etag = _assert_revalidates(client, path)
+    current = client.get(path).json()["convenience"]
+    update = {name: value for name, value in current.items() if isinstance(value, bool)}
+    update["wifi"] = not current["wifi"]
+    assert client.put(f"/update-convenience/{post_id}", params=update).json()["status"] == "success"
+    assert _assert_changed(client, path, etag)["convenience"]["wifi"] == update["wifi"]
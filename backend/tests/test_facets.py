@@ -0,0 +1,43 @@
+from sqlalchemy import text
+
+from conftest import update_post
+from facets import DIMENSIONS, FACETS_TABLE, rebuild_facets
+
+
+def _cube(connection):
+    rows = connection.execute(text(
+        f'SELECT {", ".join(DIMENSIONS)}, post_count FROM "{FACETS_TABLE}" WHERE post_count != 0'
+    )).all()
+    return {tuple(row[:-1]): row[-1] for row in rows}
+
+
+def test_cube_matches_rebuild(client, admin_headers, connection):
+    def ok(response):
+        body = response.json()
+        assert body["status"] == "success", body
+
+    pending = [row["id"] for row in client.get("/admin/pending-posts", headers=admin_headers).json()["posts"]]
+    assert len(pending) >= 2
+    posts = [post["id"] for post in client.get("/search-posts", params={"limit": 8, "sort": "oldest"}).json()["posts"]]
+
+    ok(client.put(f"/admin/approve-post/{pending[0]}", headers=admin_headers))
+    ok(client.put(f"/admin/approve-post/{pending[0]}", headers=admin_headers))
+    ok(client.put(f"/admin/reject-post/{pending[1]}", headers=admin_headers))
+    ok(client.put(f"/admin/reject-post/{posts[0]}", headers=admin_headers))
+    ok(client.post(f"/report-post/{posts[1]}"))
+    ok(client.post(f"/report-post/{posts[2]}"))
+    ok(client.put(f"/admin/approve-post/{posts[2]}", headers=admin_headers))
+    ok(client.delete(f"/delete-post/{posts[3]}"))
+    # Đổi giá qua mốc của cube, đổi tỉnh / quận
+    update_post(client, posts[4], price=lambda price: price + 750_000)
+    update_post(client, posts[5], province=lambda _: "Đà Nẵng", district=lambda _: "Hải Châu")
+    ok(client.put(f"/update-convenience/{posts[6]}", params={"wifi": True, "elevator": True}))
+    ok(client.delete(f"/delete-convenience/{posts[7]}"))
+    ok(client.post("/add-convenience", params={"post_id": posts[7], "fridge": True, "parking_lot": True}))
+    ok(client.delete(f"/delete-convenience/{pending[0]}"))
+
+    incremental = _cube(connection)
+    # Tính lại từ Posts trong transaction của fixture (được hoàn tác sau test)
+    rebuild_facets(connection)
+    assert incremental == _cube(connection)
+    assert client.get("/search-posts", params={"facets": True, "limit": 1}).json()["facets"]["province"]["Đà Nẵng"] >= 1
@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+import pytest
+
+import limits
+from limits import LimitMiddleware, Limiter, MemoryBuckets, NoBuckets, MAX_PAGE_SIZE
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """Limiter mới (bucket trong bộ nhớ) thay cho limiter của tiến trình trong một test."""
+    limiter = Limiter(MemoryBuckets(100))
+    monkeypatch.setattr(limits, "limiter", limiter)
+    return limiter
+
+
+@pytest.mark.parametrize("limit", [0, -1, MAX_PAGE_SIZE + 1])
+def test_limit_out_of_range_is_rejected(client, limit):
+    for path in ("/get-list-of-posts", "/search-posts", "/list-users"):
+        response = client.get(path, params={"limit": limit})
+        assert response.status_code == 400
+        assert response.json() == {"status": "fail", "message": f"limit must be between 1 and {MAX_PAGE_SIZE}"}
+
+
+@pytest.mark.parametrize("limit", [1, MAX_PAGE_SIZE])
+def test_limit_in_range_is_accepted(client, limit):
+    body = client.get("/search-posts", params={"limit": limit}).json()
+    assert body["status"] == "success"
+    assert 0 < body["count"] <= limit
+
+
+def test_rate_limit_returns_429(client, limiter, monkeypatch):
+    monkeypatch.setitem(limits.RATES, "read", (3, 60))
+    codes = [client.get("/get-post-by-id", params={"post_id": 1}).status_code for _ in range(4)]
+    assert codes == [200, 200, 200, 429]
+    response = client.get("/get-post-by-id", params={"post_id": 1})
+    assert response.json()["status"] == "fail"
+    assert int(response.headers["retry-after"]) >= 1
+    # Mỗi loại route có bucket riêng
+    assert client.get("/search-posts", params={"limit": 1}).status_code == 200
+    assert limiter.rejected["rate"] == 2
+
+
+def test_body_without_length_is_capped(client):
+    def chunks():
+        for _ in range(3):
+            yield b"x" * (limits.MAX_BODY_BYTES // 2)
+
+    response = client.post("/create-post", content=chunks(), headers={"content-type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 413
+
+
+def _app(calls):
+    async def app(scope, receive, send):
+        message = await receive()
+        calls.append((scope["path"], len(message.get("body", b""))))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def test_slow_body_does_not_hold_write_slot(monkeypatch):
+    limiter = Limiter(NoBuckets())
+    limiter.write_slots = asyncio.Semaphore(1)
+    monkeypatch.setattr(limits, "limiter", limiter)
+    monkeypatch.setattr(limits, "WRITE_QUEUE_TIMEOUT", 1)
+    calls = []
+    middleware = LimitMiddleware(_app(calls))
+
+    async def main():
+        body_sent = asyncio.Event()
+
+        async def slow_body():
+            await body_sent.wait()
+            yield b"late"
+
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            slow = asyncio.create_task(http.post("/slow", content=slow_body()))
+            await asyncio.sleep(0.05)
+            # Request gửi chậm chưa đọc xong body nên chưa giữ lượt ghi duy nhất
+            fast = await asyncio.wait_for(http.post("/fast", content=b"x"), 0.5)
+            body_sent.set()
+            return fast, await slow
+
+    fast, slow = asyncio.run(main())
+    assert fast.status_code == 200 and slow.status_code == 200
+    assert calls == [("/fast", 1), ("/slow", 4)]
+    assert limiter.rejected["write_queue"] == 0
+
+
+@pytest.mark.parametrize("path", ["/add-post-images", "/signup", "/update-user"])
+def test_uploads_and_password_routes_do_not_take_write_slot(monkeypatch, path):
+    limiter = Limiter(NoBuckets())
+    limiter.write_slots = asyncio.Semaphore(0)
+    monkeypatch.setattr(limits, "limiter", limiter)
+    monkeypatch.setattr(limits, "WRITE_QUEUE_TIMEOUT", 0.1)
+    middleware = LimitMiddleware(_app([]))
+
+    async def main():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post(path, content=b"x"), await http.post("/create-post", content=b"x")
+
+    unslotted, write = asyncio.run(main())
+    assert unslotted.status_code == 200
+    assert write.status_code == 503
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, text
+
+from conftest import DB_PATH
+from database import utcnow
+from filters import SORTS
+from models.favourites import Favourites
+from models.history import History
+
+PAGE = 13
+
+
+def _ids(body, key):
+    return [item["post"]["id"] if "post" in item else item["id"] for item in body[key]]
+
+
+def _by_cursor(client, path, key, params):
+    ids, cursor = [], None
+    while True:
+        body = client.get(path, params={**params, "limit": PAGE, **({"cursor": cursor} if cursor else {})}).json()
+        assert body["status"] == "success", body
+        ids += _ids(body, key)
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def _by_offset(client, path, key, params):
+    ids, offset = [], 0
+    while True:
+        body = client.get(path, params={**params, "limit": PAGE, "offset": offset}).json()
+        assert body["status"] == "success", body
+        page = _ids(body, key)
+        ids += page
+        if len(page) < PAGE:
+            return ids
+        offset += PAGE
+
+
+def _assert_same_traversal(client, path, key, params=None):
+    params = params or {}
+    by_offset = _by_offset(client, path, key, params)
+    assert len(by_offset) > PAGE and len(set(by_offset)) == len(by_offset)
+    assert _by_cursor(client, path, key, params) == by_offset
+
+
+@pytest.mark.parametrize("sort", list(SORTS))
+@pytest.mark.parametrize("path", ["/search-posts", "/search-posts-with-details", "/get-posts-by-filter"])
+def test_search_cursor_matches_offset(client, path, sort):
+    _assert_same_traversal(client, path, "posts", {"sort": sort})
+
+
+@pytest.mark.parametrize("sort", ["price_asc", "rating"])
+def test_filtered_search_cursor_matches_offset(client, sort):
+    _assert_same_traversal(client, "/search-posts", "posts", {"sort": sort, "province": "Hồ Chí Minh", "min_price": 1})
+
+
+def test_list_cursor_matches_offset(client):
+    _assert_same_traversal(client, "/get-list-of-posts", "posts")
+    _assert_same_traversal(client, "/list-users", "users")
+
+
+@pytest.fixture(scope="module")
+def viewer(client):
+    """Người dùng mới có nhiều bài yêu thích và lịch sử xem, nhiều dòng trùng thời điểm."""
+    user = client.post("/signup", params={"email": "pages@example.com", "password": "secret"}).json()["user"]
+    engine = create_engine(f"sqlite:///{DB_PATH}")
+    with engine.begin() as connection:
+        post_ids = connection.execute(text('SELECT id FROM "Posts" ORDER BY id LIMIT 60')).scalars().all()
+        now = utcnow()
+        # Mỗi 4 bài cùng một thời điểm: thứ tự giữa chúng do post_id quyết định
+        times = [now - timedelta(minutes=index // 4) for index in range(len(post_ids))]
+        connection.execute(insert(Favourites), [
+            {"user_id": user["id"], "post_id": post_id, "added_at": at} for post_id, at in zip(post_ids, times)
+        ])
+        connection.execute(insert(History), [
+            {"user_id": user["id"], "post_id": post_id, "viewed_at": at} for post_id, at in zip(post_ids, times)
+        ])
+    engine.dispose()
+    return user["id"]
+
+
+def test_favourites_and_history_cursor_matches_offset(client, viewer):
+    _assert_same_traversal(client, f"/get-user-favourites/{viewer}", "favourites")
+    _assert_same_traversal(client, f"/get-user-history/{viewer}", "history")
+
+
+@pytest.mark.parametrize("path", ["/search-posts-with-details", "/get-posts-by-filter"])
+def test_amenity_counts_only_on_first_page(client, path):
+    params = {"limit": PAGE, "min_area": 10, "max_area": 100}
+    first = client.get(path, params=params).json()
+    assert first["amenity_counts"]["wifi"] > 0
+    assert "amenity_counts" not in client.get(path, params={**params, "cursor": first["next_cursor"]}).json()
+    assert "amenity_counts" not in client.get(path, params={**params, "offset": PAGE}).json()
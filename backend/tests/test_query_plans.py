@@ -0,0 +1,36 @@
+from sqlalchemy import text
+
+from migrate import PLAN_QUERIES, check_plans, explain, full_scans
+from filters import SORTS
+
+
+def test_plan_queries_cover_every_sort():
+    for sort in SORTS:
+        assert f"search_posts (sort={sort}, cursor)" in PLAN_QUERIES
+        assert f"search_posts_with_details (sort={sort}, cursor)" in PLAN_QUERIES
+
+
+def test_no_full_scans(connection):
+    assert check_plans(connection) == {}
+
+
+def test_full_scan_is_reported(connection):
+    # Bỏ index của sort=rating (được hoàn tác sau test): check_plans phải báo sắp xếp bằng B-tree tạm
+    connection.execute(text('DROP INDEX "ix_Posts_status_is_report_avg_rating"'))
+    problems = check_plans(connection)
+    assert "search_posts (sort=rating, cursor)" in problems
+    assert any("TEMP B-TREE" in step for step in problems["search_posts (sort=rating, cursor)"])
+
+
+def test_full_scans():
+    assert full_scans(["SCAN Posts"]) == ["SCAN Posts"]
+    assert full_scans(["SCAN Posts USING INDEX ix_Posts_user_id"]) == []
+    assert full_scans(["SEARCH Posts USING INDEX ix_Posts_status_is_report_id (status=? AND is_report=?)"]) == []
+    assert full_scans(["USE TEMP B-TREE FOR ORDER BY"]) == ["USE TEMP B-TREE FOR ORDER BY"]
+    assert full_scans(["USE TEMP B-TREE FOR ORDER BY"], computed_order=True) == []
+    assert full_scans(["SCAN PostsLocation VIRTUAL TABLE INDEX 2:"]) == ["SCAN PostsLocation VIRTUAL TABLE INDEX 2:"]
+
+
+def test_explain_reads_query_plan(connection):
+    plan = explain(connection, PLAN_QUERIES["get_list_of_posts"])
+    assert plan and all(isinstance(step, str) for step in plan)
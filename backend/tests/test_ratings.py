@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import text
+
+from ratings import STARS, backfill_ratings
+
+COLUMNS = ["rating_sum", "rating_count", "avg_rating"] + [f"stars_{star}" for star in STARS]
+
+
+def _aggregates(connection):
+    rows = connection.execute(text(f'SELECT id, {", ".join(COLUMNS)} FROM "Posts" ORDER BY id')).all()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def _comment(client, post_id, user_id, rating):
+    body = client.post("/add-comment", params={"post_id": post_id, "user_id": user_id, "rating": rating}).json()
+    assert body["status"] == "success", body
+    return body["comment"]["id"]
+
+
+def test_incremental_ratings_match_backfill(client, admin_headers, connection):
+    post_ids = [post["id"] for post in client.get("/search-posts", params={"limit": 2}).json()["posts"]]
+    before = client.get(f"/get-post-rating/{post_ids[0]}").json()["rating"]["rating_count"]
+    users = [
+        client.post("/signup", params={"email": f"rating{n}@example.com", "password": "secret"}).json()["user"]["id"]
+        for n in range(4)
+    ]
+
+    def admin(action, comment_id):
+        body = client.put(f"/admin/{action}-comment/{comment_id}", headers=admin_headers).json()
+        assert body["status"] == "success", body
+
+    # Các điểm lẻ (x.5) nằm ở ranh giới giữa hai mức sao
+    comments = [_comment(client, post_id, user, rating)
+                for post_id in post_ids for user, rating in zip(users, (4.5, 3, 1.5, 5))]
+    for comment_id in comments:
+        admin("approve", comment_id)
+    admin("approve", comments[0])  # duyệt lại không được cộng hai lần
+    admin("reject", comments[1])
+    admin("reject", comments[1])
+    admin("approve", comments[1])
+    admin("reject", comments[2])
+    for comment_id, rating in [(comments[0], 2.5), (comments[2], 4), (comments[4], 1), (comments[5], 3.5)]:
+        assert client.put(f"/update-comment/{comment_id}", params={"rating": rating}).json()["status"] == "success"
+    for comment_id in (comments[3], comments[2], comments[6]):
+        assert client.delete(f"/delete-comment/{comment_id}").json()["status"] == "success"
+    pending = _comment(client, post_ids[0], users[3], 2)
+    admin("approve", pending)
+    assert client.put(f"/update-comment/{pending}", params={"rating": 4.5}).json()["status"] == "success"
+
+    incremental = _aggregates(connection)
+    # Tính lại từ PostComments trong transaction của fixture (được hoàn tác sau test)
+    backfill_ratings(connection)
+    rebuilt = _aggregates(connection)
+    assert incremental.keys() == rebuilt.keys()
+    for post_id, values in rebuilt.items():
+        assert incremental[post_id] == pytest.approx(values), post_id
+    # Còn lại ba bình luận được duyệt của bài đầu tiên: comments[0], comments[1] và pending
+    assert client.get(f"/get-post-rating/{post_ids[0]}").json()["rating"]["rating_count"] == before + 3
@@ -0,0 +1,136 @@
+"""
+Bộ đệm ghi lượt xem và lịch sử xem.
+
+Mỗi lượt xem chỉ được cộng vào bộ nhớ (record); cứ FLUSH_INTERVAL giây hoặc khi có quá
+FLUSH_SIZE mục đang chờ, toàn bộ được ghi trong một transaction:
+    - Posts.views tăng bằng một câu UPDATE (executemany) cho mỗi bài đăng,
+    - History được upsert bằng một câu INSERT ... ON CONFLICT DO UPDATE nhiều dòng.
+Nhiều lượt xem của cùng (user, post) trong một chu kỳ được gộp thành một dòng với thời điểm
+xem cuối cùng. Bộ đệm được ghi nốt khi ứng dụng tắt; nếu tiến trình bị kill, mất tối đa
+một chu kỳ lượt xem. Posts.views không làm thay đổi updated_at nên không làm mất ETag / cache
+của bài đăng, số lượt xem hiển thị có thể chậm tối đa bằng thời gian sống của cache.
+
+Cấu hình qua biến môi trường:
+    VIEW_FLUSH_INTERVAL  chu kỳ ghi, giây (mặc định 5)
+    VIEW_FLUSH_SIZE      số mục đang chờ để ghi ngay (mặc định 500)
+"""
+import asyncio
+import os
+from collections import Counter
+
+from sqlalchemy import bindparam, func, select
+
+from database import AsyncSessionLocal, utcnow, insert
+from models.posts import Posts
+from models.users import Users
+from models.history import History
+
+UPSERT_BATCH = 1000
+
+
+class ViewBuffer:
+    def __init__(self, interval, max_pending):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.views = Counter()  # post_id -> số lượt xem
+        self.history = {}  # (user_id, post_id) -> viewed_at
+        self.flushed = 0
+        self._wakeup = None
+        self._stopping = False
+        self._task = None
+
+    def record(self, post_id, user_id=None):
+        self.views[post_id] += 1
+        if user_id is not None:
+            self.history[(user_id, post_id)] = utcnow()
+        if self._wakeup is not None and len(self.views) + len(self.history) >= self.max_pending:
+            self._wakeup.set()
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Như JobQueue.stop: cancel có thể bị nuốt khi đang ghi, cờ dừng đảm bảo vòng lặp thoát
+            self._stopping = True
+            self._wakeup.set()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Error flushing views: {e}")
+
+    async def flush(self):
+        """Ghi các lượt xem đang chờ; lỗi thì trả chúng về bộ đệm cho lần sau."""
+        views, self.views = self.views, Counter()
+        history, self.history = self.history, {}
+        if not views and not history:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await self._write(db, views, history)
+                await db.commit()
+        except BaseException:
+            self.views.update(views)
+            for key, viewed_at in history.items():
+                self.history[key] = max(viewed_at, self.history.get(key, viewed_at))
+            raise
+        self.flushed += sum(views.values())
+
+    async def _write(self, db, views, history):
+        # Bỏ các id không tồn tại (endpoint không kiểm tra từng lượt xem)
+        post_ids = set(views) | {post_id for _, post_id in history}
+        existing_posts = set((await db.execute(select(Posts.id).where(Posts.id.in_(post_ids)))).scalars())
+        existing_users = set()
+        if history:
+            user_ids = {user_id for user_id, _ in history}
+            existing_users = set((await db.execute(select(Users.id).where(Users.id.in_(user_ids)))).scalars())
+
+        increments = [
+            {"b_id": post_id, "b_count": count} for post_id, count in views.items() if post_id in existing_posts
+        ]
+        if increments:
+            posts = Posts.__table__
+            await db.execute(
+                posts.update()
+                .where(posts.c.id == bindparam("b_id"))
+                # Giữ nguyên updated_at: lượt xem không phải là thay đổi nội dung bài đăng
+                .values(views=func.coalesce(posts.c.views, 0) + bindparam("b_count"), updated_at=posts.c.updated_at),
+                increments,
+            )
+
+        rows = [
+            {"user_id": user_id, "post_id": post_id, "viewed_at": viewed_at}
+            for (user_id, post_id), viewed_at in history.items()
+            if user_id in existing_users and post_id in existing_posts
+        ]
+        # Chia nhỏ để không vượt giới hạn số tham số của một câu lệnh
+        for start in range(0, len(rows), UPSERT_BATCH):
+            upsert = insert(History).values(rows[start:start + UPSERT_BATCH])
+            await db.execute(upsert.on_conflict_do_update(
+                index_elements=[History.user_id, History.post_id],
+                set_={"viewed_at": upsert.excluded.viewed_at},
+            ))
+
+    def info(self):
+        return {"pending_views": sum(self.views.values()), "pending_history": len(self.history),
+                "flushed_views": self.flushed}
+
+
+view_buffer = ViewBuffer(
+    interval=float(os.environ.get("VIEW_FLUSH_INTERVAL", 5)),
+    max_pending=int(os.environ.get("VIEW_FLUSH_SIZE", 500)),
+)
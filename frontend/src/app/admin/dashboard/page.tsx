@@ -96,14 +96,14 @@ export default function AdminDashboard() {
 
     const fetchData = async () => {
         try {
-            const adminUserId = Cookies.get("adminUserId")
-            if (!adminUserId) {
+            const adminToken = Cookies.get("adminToken")
+            if (!adminToken) {
                 router.push("/admin/login")
                 return
             }
 
             const headers = {
-                "Authorization": adminUserId
+                "Authorization": `Bearer ${adminToken}`
             }
 
             if (activeTab === 0) {
@@ -163,15 +163,15 @@ export default function AdminDashboard() {
 
     const handleApprove = async (type: "post" | "comment", id: number) => {
         try {
-            const adminUserId = Cookies.get("adminUserId")
-            if (!adminUserId) {
+            const adminToken = Cookies.get("adminToken")
+            if (!adminToken) {
                 router.push("/admin/login")
                 return
             }
 
             const headers = {
                 "Content-Type": "application/json",
-                "Authorization": adminUserId
+                "Authorization": `Bearer ${adminToken}`
             }
 
             const response = await fetch(`http://localhost:8000/admin/approve-${type}/${id}`, {
@@ -191,15 +191,15 @@ export default function AdminDashboard() {
 
     const handleReject = async (type: "post" | "comment", id: number) => {
         try {
-            const adminUserId = Cookies.get("adminUserId")
-            if (!adminUserId) {
+            const adminToken = Cookies.get("adminToken")
+            if (!adminToken) {
                 router.push("/admin/login")
                 return
             }
 
             const headers = {
                 "Content-Type": "application/json",
-                "Authorization": adminUserId
+                "Authorization": `Bearer ${adminToken}`
             }
 
             const response = await fetch(`http://localhost:8000/admin/reject-${type}/${id}`, {
@@ -219,15 +219,15 @@ export default function AdminDashboard() {
 
     const handleMakeAdmin = async () => {
         try {
-            const adminUserId = Cookies.get("adminUserId")
-            if (!adminUserId) {
+            const adminToken = Cookies.get("adminToken")
+            if (!adminToken) {
                 router.push("/admin/login")
                 return
             }
 
             const headers = {
                 "Content-Type": "application/json",
-                "Authorization": adminUserId
+                "Authorization": `Bearer ${adminToken}`
             }
 
             const response = await fetch(`http://localhost:8000/admin/make-admin/${userIdToMakeAdmin}`, {
@@ -249,6 +249,7 @@ export default function AdminDashboard() {
 
     const handleLogout = () => {
         Cookies.remove('adminUserId');
+        Cookies.remove('adminToken');
         router.push('/admin/login');
     };
 
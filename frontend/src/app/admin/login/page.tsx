@@ -57,6 +57,7 @@ export default function AdminLogin() {
             if (data.status === 'success') {
                 if (data.user.is_admin) {
                     Cookies.set('adminUserId', data.user.id.toString());
+                    Cookies.set('adminToken', data.access_token);
                     router.push('/admin/dashboard');
                 } else {
                     setError('Bạn không có quyền truy cập trang admin');
@@ -10,8 +10,7 @@ import { Badge } from "@/components/ui/badge"
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
 import { Separator } from "@/components/ui/separator"
 import Cookies from "js-cookie"
-import { getUserFavorites, getPostImages, removeFavorite as removeFromFavorites } from "@/lib/api"
-import { getPostById } from "@/lib/api"
+import { getUserFavorites, removeFavorite as removeFromFavorites } from "@/lib/api"
 import { ImageIcon } from "lucide-react"
 import PostCard from "@/components/post-card"
 import Footer from "@/components/footer"
@@ -22,6 +21,8 @@ export default function FavoritesPage() {
   const [currentSort, setCurrentSort] = useState("newest")
   const [username, setUsername] = useState("")
   const [removingId, setRemovingId] = useState<string | null>(null)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const [notification, setNotification] = useState<{ id: number, type: "success" | "error", message: string } | null>(null)
 
   useEffect(() => {
@@ -29,65 +30,67 @@ export default function FavoritesPage() {
     if (storedFullName) setUsername(storedFullName)
   }, [])
 
-  useEffect(() => {
-    const fetchFavorites = async () => {
-      const userId = Cookies.get("userId")
-      if (!userId) return
-
-      try {
-        const res = await getUserFavorites(Number(userId))
-        if (res.status === "success" && res.favourites) {
-          const posts = await Promise.all(
-            res.favourites.map(async (fav: any) => {
-              try {
-                const postRes = await getPostById(fav.post_id || fav)
-                const post = postRes.post
-
-                const imgRes = await getPostImages(fav.post_id || fav)
-                const rawImage = imgRes.images?.[0]?.image_url || ""
-                const fullImageUrl = rawImage.startsWith("http")
-                  ? rawImage
-                  : `http://localhost:3000${rawImage}`
-
-                return {
-                  ...post,
-                  image: fullImageUrl,
-                  address: {
-                    district: post.district || post.address || "Không rõ",
-                    city: post.province || "TP. Hồ Chí Minh",
-                  },
-                  area: post.area ?? 20,
-                  price: Number(post.price) ?? 1000000,
-                  type: post.type || "Phòng trọ",
-                  dateAdded: post.post_date || post.created_at || new Date().toISOString(),
-                  status: post.status || "Còn trống",
-                  rating: post.avg_rating ?? 4,
-                  reviewCount: 10,
-                  amenities: post.amenities || [],
-                  isFavorite: true
-                }
-              } catch (error) {
-                console.error(`Lỗi khi lấy bài viết ${fav.post_id || fav}:`, error)
-                return null
-              }
-            })
-          )
-          setFavoriteListings(posts.filter((item) => item !== null))
-        } else {
-          console.error("Không có dữ liệu yêu thích hoặc định dạng không đúng:", res)
-          setIsLoading(false)
-        }
-      } catch (err) {
-        console.error("Lỗi khi tải danh sách yêu thích:", err)
-        setIsLoading(false)
-      } finally {
-        setIsLoading(false)
-      }
+  // Mỗi mục yêu thích đã kèm thẻ bài đăng (ảnh đại diện, giá, địa chỉ, đánh giá)
+  const toListing = (fav: any) => {
+    const post = fav.post
+    const rawImage = post.cover_image || ""
+    const fullImageUrl = !rawImage
+      ? "/placeholder.svg"
+      : rawImage.startsWith("http")
+        ? rawImage
+        : `http://localhost:3000${rawImage}`
+
+    return {
+      ...post,
+      image: fullImageUrl,
+      address: {
+        district: post.district || "Không rõ",
+        city: post.province || "TP. Hồ Chí Minh",
+      },
+      area: post.area ?? 20,
+      price: Number(post.price) ?? 1000000,
+      type: post.type || "Phòng trọ",
+      dateAdded: fav.added_at || post.post_date || new Date().toISOString(),
+      status: post.status || "Còn trống",
+      rating: post.avg_rating ?? 4,
+      reviewCount: post.rating_count ?? 0,
+      amenities: [],
+      isFavorite: true
+    }
+  }
+
+  const fetchFavorites = async (cursor?: string) => {
+    const userId = Cookies.get("userId")
+    if (!userId) return
+
+    const res = await getUserFavorites(Number(userId), 20, cursor)
+    if (res.status === "success" && res.favourites) {
+      const listings = res.favourites.map(toListing)
+      setFavoriteListings((prev) => (cursor ? [...prev, ...listings] : listings))
+      setNextCursor(res.next_cursor)
+    } else {
+      console.error("Không có dữ liệu yêu thích hoặc định dạng không đúng:", res)
     }
+  }
 
+  useEffect(() => {
     fetchFavorites()
+      .catch((err) => console.error("Lỗi khi tải danh sách yêu thích:", err))
+      .finally(() => setIsLoading(false))
   }, [])
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setIsLoadingMore(true)
+    try {
+      await fetchFavorites(nextCursor)
+    } catch (err) {
+      console.error("Lỗi khi tải thêm danh sách yêu thích:", err)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   const handleToggleFavorite = async (id: number) => {
     const userId = Cookies.get("userId")
     if (!userId) return
@@ -237,9 +240,9 @@ export default function FavoritesPage() {
                 ))}
               </div>
 
-              {favoriteListings.length > 8 && (
+              {nextCursor && (
                 <div className="flex justify-center">
-                  <Button variant="outline" className="mt-4">
+                  <Button variant="outline" className="mt-4" onClick={loadMore} disabled={isLoadingMore}>
                     Xem thêm <ArrowRight className="ml-2 h-4 w-4" />
                   </Button>
                 </div>
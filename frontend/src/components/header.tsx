@@ -32,6 +32,7 @@ export default function Header() {
     const handleLogout = () => {
         Cookies.remove('token')
         Cookies.remove('userId')
+        Cookies.remove('accessToken')
         Cookies.remove('fullName')
         setIsLoggedIn(false)
         setUserName("")
@@ -39,6 +39,7 @@ export default function LoginPage() {
         // Store essential user information in cookies
         Cookies.set("userId", res.user.id.toString(), options)
         Cookies.set("email", res.user.email, options)
+        Cookies.set("accessToken", res.access_token, options)
 
         // Store additional user data from the Users model
         if (res.user.full_name) {
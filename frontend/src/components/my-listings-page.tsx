@@ -65,7 +65,7 @@ export default function MyListingsPage() {
       let response
       if (activeTab === "approved") {
         // Lấy bài viết đã duyệt của người dùng
-        response = await axios.get(`http://localhost:8000/get-posts-by-user?user_id=${userId}`)
+        response = await axios.get(`http://localhost:8000/get-posts-by-user?user_id=${userId}&fields=card,description,is_report`)
         if (response?.data.status === "success") {
           // Lọc chỉ lấy bài viết có status là 'approved'
           const approvedPosts = response.data.posts.filter((post: Post) => post.status === 'approved')
@@ -73,7 +73,7 @@ export default function MyListingsPage() {
         }
       } else if (activeTab === "pending") {
         // Lấy bài viết chờ duyệt của người dùng
-        response = await axios.get(`http://localhost:8000/get-posts-by-user?user_id=${userId}`)
+        response = await axios.get(`http://localhost:8000/get-posts-by-user?user_id=${userId}&fields=card,description,is_report`)
         if (response?.data.status === "success") {
           // Lọc chỉ lấy bài viết có status là 'pending'
           const pendingPosts = response.data.posts.filter((post: Post) => post.status === 'pending')
@@ -81,7 +81,7 @@ export default function MyListingsPage() {
         }
       } else if (activeTab === "rejected") {
         // Lấy bài viết bị từ chối của người dùng
-        response = await axios.get(`http://localhost:8000/get-posts-by-user?user_id=${userId}`)
+        response = await axios.get(`http://localhost:8000/get-posts-by-user?user_id=${userId}&fields=card,description,is_report`)
         if (response?.data.status === "success") {
           // Lọc chỉ lấy bài viết có status là 'rejected'
           const rejectedPosts = response.data.posts.filter((post: Post) => post.status === 'rejected')
@@ -107,14 +107,16 @@ export default function MyListingsPage() {
       const cookies = document.cookie.split(';')
       const userIdCookie = cookies.find(cookie => cookie.trim().startsWith('userId='))
       const userId = userIdCookie ? parseInt(userIdCookie.split('=')[1]) : null
+      const accessTokenCookie = cookies.find(cookie => cookie.trim().startsWith('accessToken='))
+      const accessToken = accessTokenCookie ? accessTokenCookie.split('=')[1] : null
 
-      if (!userId) {
+      if (!userId || !accessToken) {
         router.push('/login')
         return
       }
 
       const response = await axios.delete(`http://localhost:8000/delete-post/${postId}`, {
-        headers: { Authorization: userId.toString() }
+        headers: { Authorization: `Bearer ${accessToken}` }
       })
 
       if (response.data.status === "success") {
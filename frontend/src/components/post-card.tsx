@@ -6,7 +6,7 @@ import { Button } from "@/components/ui/button"
 import { Card, CardContent, CardFooter } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
 import { useEffect, useState } from "react"
-import { getUserFavorites } from "@/lib/api"
+import { getUserFavoriteIds } from "@/lib/api"
 import Cookies from "js-cookie"
 
 interface PostCardProps {
@@ -41,12 +41,9 @@ export default function PostCard({ item, onToggleFavorite, activeNotification }:
             if (!userId) return
 
             try {
-                const res = await getUserFavorites(Number(userId))
-                if (res.status === "success" && res.favourites) {
-                    const isFavorited = res.favourites.some((fav: any) =>
-                        (fav.post_id || fav) === item.id
-                    )
-                    setIsFavorited(isFavorited)
+                const res = await getUserFavoriteIds(Number(userId))
+                if (res.status === "success") {
+                    setIsFavorited(res.post_ids.includes(item.id))
                 }
             } catch (error) {
                 console.error("Error checking favorite status:", error)
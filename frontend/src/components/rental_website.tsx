@@ -1,6 +1,6 @@
 "use client"
 import { useEffect, useState } from "react"
-import { getPosts, getPostImages, addToHistory, getUserFavorites, addToFavorites, removeFavorite } from "@/lib/api"
+import { getPosts, getPostImages, addToHistory, addView, getUserFavoriteIds, addToFavorites, removeFavorite } from "@/lib/api"
 import { Search, MapPin, Phone, Mail, Star, Heart, ArrowRight, Check, X, AlertCircle } from "lucide-react"
 import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
@@ -56,13 +56,8 @@ export default function RentalWebsite() {
   const loadFavorites = async () => {
     if (!userId) return;
     try {
-      const res = await getUserFavorites(userId);
-      console.log("Kết quả response full:", res);
-      const favoriteIds = res.favourites
-        .filter((fav: any) => typeof fav.post_id === "number")
-        .map((fav: any) => fav.post_id);
-      console.log("FAVOURITE POST IDs:", favoriteIds);
-      setFavorites(favoriteIds);
+      const res = await getUserFavoriteIds(userId);
+      setFavorites(res.post_ids);
     } catch (err) {
       console.error("Failed to load favorites:", err);
     }
@@ -175,12 +170,15 @@ export default function RentalWebsite() {
 
 
   const handleViewDetails = async (postId: number) => {
-    if (userId) {
-      try {
+    try {
+      // Lượt xem của người dùng đã đăng nhập được tính cùng lịch sử xem
+      if (userId) {
         await addToHistory(userId, postId);
-      } catch (err) {
-        console.error("Error adding to history:", err);
+      } else {
+        await addView(postId);
       }
+    } catch (err) {
+      console.error("Error adding to history:", err);
     }
     window.location.href = `/room/${postId}`;
   };
@@ -203,20 +201,6 @@ export default function RentalWebsite() {
   useEffect(() => {
     if (userId) {
       loadFavorites();
-
-      // Gọi thêm API để in danh sách yêu thích
-      const fetchFavorites = async () => {
-        try {
-          const res = await getUserFavorites(userId);
-          if (res.status === "success") {
-            console.log("DANH SÁCH YÊU THÍCH KHI VỀ TRANG CHỦ:", res.favourites);
-          }
-        } catch (err) {
-          console.error("Lỗi khi in danh sách yêu thích:", err);
-        }
-      };
-
-      fetchFavorites();
     }
   }, [userId]);
 
@@ -259,6 +243,7 @@ export default function RentalWebsite() {
 
   const handleLogout = () => {
     Cookies.remove("userId")
+    Cookies.remove("accessToken")
     Cookies.remove("email")
     Cookies.remove("fullName")
     Cookies.remove("avatarUrl")
@@ -59,14 +59,14 @@ export default function RoomDetailPage({ id }: { id: string }) {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const res = await axios.get(`http://localhost:8000/get-post-by-id?post_id=${id}`)
+        // Bài đăng, ảnh, tiện ích, chủ nhà và bình luận trong một lần gọi
+        const res = await axios.get(`http://localhost:8000/posts/${id}/full`)
         if (res.data.status === "success") {
           const post = res.data.post
 
-          const imageRes = await axios.get(`http://localhost:8000/get-post-images/${id}`)
           let images = []
-          if (imageRes.data.status === "success" && imageRes.data.images) {
-            images = imageRes.data.images.map((img: any) => {
+          if (res.data.images) {
+            images = res.data.images.map((img: any) => {
               if (img.image_url) {
                 if (!img.image_url.startsWith('http')) {
                   return `http://localhost:3000${img.image_url}`
@@ -78,8 +78,7 @@ export default function RoomDetailPage({ id }: { id: string }) {
           }
           setImages(images)
 
-          const convenienceRes = await axios.get(`http://localhost:8000/get-post-convenience/${id}`)
-          const convenience = convenienceRes.data.status === "success" ? convenienceRes.data.convenience : {}
+          const convenience = res.data.convenience || {}
 
           const amenities: string[] = []
           if (convenience.wifi) amenities.push("Wi-Fi")
@@ -95,14 +94,9 @@ export default function RoomDetailPage({ id }: { id: string }) {
           if (convenience.elevator) amenities.push("Thang máy")
           if (convenience.pet_allowed) amenities.push("Thú cưng được phép")
 
-          const userRes = await axios.get(`http://localhost:8000/get-user-info?user_id=${post.user_id}`)
-          const user = userRes.data.status === "success" ? userRes.data.user : null
-
-          const commentRes = await axios.get(`http://localhost:8000/get-post-comments/${id}`)
-          const comments = commentRes.data.status === "success" ? commentRes.data.comments : []
-          console.log("All comments:", comments)
-          const approvedComments = comments.filter((comment: any) => comment.status === "approved")
-          console.log("Approved comments:", approvedComments)
+          const user = res.data.owner
+          // Backend chỉ trả về các bình luận đã duyệt
+          const approvedComments = res.data.comments
           setApprovedReviews(approvedComments)
 
           const processedPost = {
@@ -131,7 +125,7 @@ export default function RoomDetailPage({ id }: { id: string }) {
             owner: {
               name: user ? user.full_name : "Chủ trọ",
               phone: user ? user.contact_number : "0123456789",
-              avatar: "/placeholder.svg",
+              avatar: user?.avatar_url || "/placeholder.svg",
               responseRate: 95,
               responseTime: "Trong 1 giờ",
               memberSince: "01/2023",
@@ -513,12 +507,13 @@ export default function RoomDetailPage({ id }: { id: string }) {
                           <div className="flex justify-between items-start">
                             <div className="flex items-center gap-2">
                               <Avatar className="h-8 w-8">
+                                <AvatarImage src={review.user_avatar_url || undefined} alt={review.user_full_name || ""} />
                                 <AvatarFallback>
-                                  {review.user_id?.toString().charAt(0) || "U"}
+                                  {review.user_full_name?.charAt(0) || review.user_id?.toString().charAt(0) || "U"}
                                 </AvatarFallback>
                               </Avatar>
                               <div>
-                                <p className="font-medium">Người dùng #{review.user_id}</p>
+                                <p className="font-medium">{review.user_full_name || `Người dùng #${review.user_id}`}</p>
                                 <p className="text-xs text-muted-foreground">
                                   {new Date(review.comment_date).toLocaleDateString()}
                                 </p>
@@ -25,10 +25,10 @@ import {
 } from "@/components/ui/sheet"
 import { Collapsible, CollapsibleContent, CollapsibleTrigger } from "@/components/ui/collapsible"
 import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from "@/components/ui/tooltip"
-import { searchPosts } from "@/lib/api"
+import { searchPostsWithDetails } from "@/lib/api"
 import { getPostImages } from "@/lib/api"
 import Cookies from "js-cookie"
-import { getUserFavorites, addToFavorites, removeFavorite } from "@/lib/api"
+import { getUserFavoriteIds, addToFavorites, removeFavorite } from "@/lib/api"
 import {
   DropdownMenu,
   DropdownMenuContent,
@@ -84,11 +84,9 @@ export default function SearchPage() {
 
     if (uid) {
       setUserId(Number(uid))
-      getUserFavorites(Number(uid)).then((res) => {
+      getUserFavoriteIds(Number(uid)).then((res) => {
         if (res.status === "success") {
-          setTotalPosts(res.total) // <- 👈 total từ backend trả về
-          const ids = res.favourites.map((fav: any) => fav.post_id)
-          setFavorites(ids)
+          setFavorites(res.post_ids)
         }
       })
     }
@@ -98,6 +96,7 @@ export default function SearchPage() {
 
   const handleLogout = () => {
     Cookies.remove("userId")
+    Cookies.remove("accessToken")
     Cookies.remove("fullName")
     setUserId(null)
     setUsername("")
@@ -135,81 +134,75 @@ export default function SearchPage() {
     "Thang máy": "elevator",
     "Cho phép thú cưng": "pet_allowed",
   }
-  const handleSearch = async () => {
+  // Giá trị của ô "Sắp xếp theo" -> tham số sort của backend
+  const sortParams: Record<string, string> = {
+    "newest": "newest",
+    "price-asc": "price_asc",
+    "price-desc": "price_desc",
+    "area": "area_desc",
+  }
+  const handleSearch = async (sort: string = currentSort) => {
     setIsLoading(true)
     setHasSearched(true)
     try {
       const currentType = selectedType !== "all" ? selectedType || undefined : undefined
-      const res = await searchPosts({
+      const res = await searchPostsWithDetails({
         district: selectedDistrict || undefined,
         min_price: priceRange[0],
         max_price: priceRange[1],
-        area_min: areaRange[0],
-        area_max: areaRange[1],
+        min_area: areaRange[0],
+        max_area: areaRange[1],
         type: currentType,
+        amenities: selectedAmenities,
+        sort: sortParams[sort],
       })
       if (res.status === "success") {
         console.log("Số lượng từ API:", res.posts.length)
-        const enrichedPosts = await Promise.all(
-          res.posts.map(async (post: any) => {
-            const convenienceRes = await fetch(`http://localhost:8000/get-post-convenience/${post.id}`)
-            const convenienceData = await convenienceRes.json()
-            const convenience = convenienceData.convenience || {}
-
-            const isMatch = selectedAmenities.every(key => convenience[key] === true)
-            if (!isMatch) return null
-
-            // Lấy ảnh từ API
-            const imageRes = await fetch(`http://localhost:8000/get-post-images/${post.id}`)
-            const imageData = await imageRes.json()
-            let imageUrl = "/placeholder.svg"
-            if (imageData.status === "success" && imageData.images && imageData.images.length > 0) {
-              const firstImage = imageData.images[0]
-              if (firstImage.image_url) {
-                // Xử lý URL ảnh
-                if (firstImage.image_url.startsWith('http')) {
-                  // URL từ trang web khác
-                  imageUrl = firstImage.image_url
-                } else if (firstImage.image_url.startsWith('/uploads')) {
-                  // URL từ web của chúng ta
-                  imageUrl = `http://localhost:3000${firstImage.image_url}`
-                } else {
-                  // URL không hợp lệ, sử dụng placeholder
-                  imageUrl = "/placeholder.svg"
-                }
-              }
-            }
-
-            const amenities: string[] = []
-            if (convenience.wifi) amenities.push("Wi-Fi")
-            if (convenience.air_conditioner) amenities.push("Điều hòa")
-            if (convenience.fridge) amenities.push("Tủ lạnh")
-            if (convenience.washing_machine) amenities.push("Máy giặt")
-            if (convenience.parking_lot) amenities.push("Chỗ để xe")
-            if (convenience.security) amenities.push("An ninh 24/7")
-            if (convenience.kitchen) amenities.push("Nhà bếp")
-            if (convenience.private_bathroom) amenities.push("Nhà vệ sinh riêng")
-            if (convenience.furniture) amenities.push("Nội thất")
-            if (convenience.bacony) amenities.push("Ban công")
-            if (convenience.elevator) amenities.push("Thang máy")
-            if (convenience.pet_allowed) amenities.push("Cho phép thú cưng")
-
-            return {
-              ...post,
-              image: imageUrl,
-              amenities,
-              isFavorite: false,
-              status: post.status || "Còn trống",
-              publishedDate: new Date(post.post_date).toLocaleDateString("vi-VN"),
-              address: {
-                district: post.district,
-                city: post.province,
-              },
+        // Tiện ích và ảnh đại diện đã được backend trả về cùng bài đăng
+        const enrichedPosts = res.posts.map((post: any) => {
+          const convenience = post.convenience || {}
+
+          let imageUrl = "/placeholder.svg"
+          if (post.cover_image) {
+            // Xử lý URL ảnh
+            if (post.cover_image.startsWith('http')) {
+              // URL từ trang web khác
+              imageUrl = post.cover_image
+            } else if (post.cover_image.startsWith('/uploads')) {
+              // URL từ web của chúng ta
+              imageUrl = `http://localhost:3000${post.cover_image}`
             }
-          })
-        )
-
-        setSearchResults(enrichedPosts.filter(Boolean)) // Lọc bỏ null
+          }
+
+          const amenities: string[] = []
+          if (convenience.wifi) amenities.push("Wi-Fi")
+          if (convenience.air_conditioner) amenities.push("Điều hòa")
+          if (convenience.fridge) amenities.push("Tủ lạnh")
+          if (convenience.washing_machine) amenities.push("Máy giặt")
+          if (convenience.parking_lot) amenities.push("Chỗ để xe")
+          if (convenience.security) amenities.push("An ninh 24/7")
+          if (convenience.kitchen) amenities.push("Nhà bếp")
+          if (convenience.private_bathroom) amenities.push("Nhà vệ sinh riêng")
+          if (convenience.furniture) amenities.push("Nội thất")
+          if (convenience.bacony) amenities.push("Ban công")
+          if (convenience.elevator) amenities.push("Thang máy")
+          if (convenience.pet_allowed) amenities.push("Cho phép thú cưng")
+
+          return {
+            ...post,
+            image: imageUrl,
+            amenities,
+            isFavorite: false,
+            status: post.status || "Còn trống",
+            publishedDate: new Date(post.post_date).toLocaleDateString("vi-VN"),
+            address: {
+              district: post.district,
+              city: post.province,
+            },
+          }
+        })
+
+        setSearchResults(enrichedPosts)
       }
     } catch (err) {
       console.error("Lỗi khi gọi API:", err)
@@ -259,28 +252,8 @@ export default function SearchPage() {
 
   const handleSort = (value: string) => {
     setCurrentSort(value)
-    setIsLoading(true)
-
-    // Giả lập sắp xếp
-    setTimeout(() => {
-      const sortedResults = [...searchResults]
-      switch (value) {
-        case "price-asc":
-          sortedResults.sort((a, b) => a.price - b.price)
-          break
-        case "price-desc":
-          sortedResults.sort((a, b) => b.price - a.price)
-          break
-        case "area":
-          sortedResults.sort((a, b) => b.area - a.area)
-          break
-        case "newest":
-          sortedResults.sort((a, b) => new Date(b.publishedDate).getTime() - new Date(a.publishedDate).getTime())
-          break
-      }
-      setSearchResults(sortedResults)
-      setIsLoading(false)
-    }, 500)
+    // Backend sắp xếp toàn bộ kết quả, không chỉ trang đang hiển thị
+    if (hasSearched) handleSearch(value)
   }
 
   const formatPrice = (price: number) => {
@@ -320,7 +293,7 @@ export default function SearchPage() {
                 </SelectContent>
               </Select>
               <div className="flex gap-2">
-                <Button className="flex-1" onClick={handleSearch}>
+                <Button className="flex-1" onClick={() => handleSearch()}>
                   <Search className="mr-2 h-4 w-4" /> Tìm kiếm
                 </Button>
               </div>
@@ -85,8 +85,17 @@ export const addToFavorites = async (userId: number, postId: number) => {
   return res.data
 }
 
-export const getUserFavorites = async (userId: number) => {
-  const res = await axios.get(`http://localhost:8000/get-user-favourites/${userId}`)
+// Danh sách yêu thích dạng thẻ bài đăng, phân trang bằng next_cursor
+export const getUserFavorites = async (userId: number, limit = 20, cursor?: string) => {
+  const res = await axios.get(`http://localhost:8000/get-user-favourites/${userId}`, {
+    params: { limit, cursor }
+  })
+  return res.data
+}
+
+// Chỉ id các bài đã yêu thích, dùng để đánh dấu nút yêu thích
+export const getUserFavoriteIds = async (userId: number) => {
+  const res = await axios.get(`http://localhost:8000/get-user-favourite-ids/${userId}`)
   return res.data
 }
 
@@ -143,9 +152,14 @@ export const addToHistory = async (userId: number, postId: number) => {
   return res.data
 }
 
-export const getUserHistory = async (userId: number, limit = 10) => {
+export const addView = async (postId: number) => {
+  const res = await axios.post(`http://localhost:8000/add-view/${postId}`)
+  return res.data
+}
+
+export const getUserHistory = async (userId: number, limit = 10, cursor?: string) => {
   const res = await axios.get(`http://localhost:8000/get-user-history/${userId}`, {
-    params: { limit }
+    params: { limit, cursor }
   })
   return res.data
 }
@@ -195,8 +209,8 @@ export const searchPosts = async (params: {
   district?: string
   min_price: number
   max_price: number
-  area_min?: number
-  area_max?: number
+  min_area?: number
+  max_area?: number
   type?: string
   limit?: number
   offset?: number
@@ -208,4 +222,27 @@ export const searchPosts = async (params: {
   })
 
   return res.data
-}
\ No newline at end of file
+}
+
+export const searchPostsWithDetails = async (params: {
+  district?: string
+  min_price: number
+  max_price: number
+  min_area?: number
+  max_area?: number
+  type?: string
+  amenities?: string[]
+  // newest, oldest, price_asc, price_desc, area_asc, area_desc, rating
+  sort?: string
+  limit?: number
+  offset?: number
+  cursor?: string
+}) => {
+  const res = await axios.get("http://localhost:8000/search-posts-with-details", {
+    params,
+    // FastAPI đọc danh sách dạng amenities=wifi&amenities=fridge
+    paramsSerializer: { indexes: null },
+  })
+
+  return res.data
+}